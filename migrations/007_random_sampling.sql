@@ -0,0 +1,13 @@
+-- Migration 007: Index-backed random sampling of unsolved sentences
+
+-- Stored random key: sampling seeks to a random point in this index instead of
+-- sorting the whole table with ORDER BY RANDOM()
+ALTER TABLE italian_sentences
+    ADD COLUMN IF NOT EXISTS random_key DOUBLE PRECISION NOT NULL DEFAULT random();
+
+CREATE INDEX IF NOT EXISTS idx_sentences_random_key ON italian_sentences(random_key);
+
+-- Partial index for the "already solved by this user" anti-join probe
+CREATE INDEX IF NOT EXISTS idx_results_user_sentence_success
+    ON italian_sentences_results(user_id, italian_sentence_id)
+    WHERE is_success;
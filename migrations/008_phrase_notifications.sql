@@ -0,0 +1,23 @@
+-- Migration 008: Notify the bot when phrase tables change so it can reload its in-memory cache
+
+CREATE OR REPLACE FUNCTION notify_phrases_changed() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('phrases_changed', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_encouraging_phrases_changed ON encouraging_phrases;
+CREATE TRIGGER trg_encouraging_phrases_changed
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON encouraging_phrases
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_phrases_changed();
+
+DROP TRIGGER IF EXISTS trg_error_phrases_changed ON error_phrases;
+CREATE TRIGGER trg_error_phrases_changed
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON error_phrases
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_phrases_changed();
+
+DROP TRIGGER IF EXISTS trg_exercise_prompts_changed ON exercise_prompts;
+CREATE TRIGGER trg_exercise_prompts_changed
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON exercise_prompts
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_phrases_changed();
@@ -0,0 +1,26 @@
+-- Migration 009: Daily statistics rollup maintained together with result writes
+-- user_id 0 holds the totals over all users for the day and exercise type
+
+CREATE TABLE IF NOT EXISTS daily_stats (
+    day DATE NOT NULL,
+    exercise_type TEXT NOT NULL,
+    user_id BIGINT NOT NULL,
+    attempts BIGINT NOT NULL DEFAULT 0,
+    successes BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, exercise_type, user_id)
+);
+
+-- Per-user lookups read every day of one user
+CREATE INDEX IF NOT EXISTS idx_daily_stats_user_day ON daily_stats(user_id, day);
+
+-- Backfill from existing results
+INSERT INTO daily_stats (day, exercise_type, user_id, attempts, successes)
+SELECT r.timestamp::date, r.exercise_type, k.user_id, COUNT(*), COUNT(*) FILTER (WHERE r.is_success)
+FROM (
+    SELECT 'sentence_ordering' AS exercise_type, user_id, is_success, timestamp FROM italian_sentences_results
+    UNION ALL
+    SELECT 'missing_word' AS exercise_type, user_id, is_success, timestamp FROM missing_word_results
+) r
+CROSS JOIN LATERAL (VALUES (r.user_id), (0::bigint)) AS k(user_id)
+GROUP BY 1, 2, 3
+ON CONFLICT (day, exercise_type, user_id) DO NOTHING;
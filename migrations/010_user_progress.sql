@@ -0,0 +1,36 @@
+-- Migration 010: Per-user progress counters maintained together with result writes
+-- today_attempts and today_successes refer to the day stored in "today"
+
+CREATE TABLE IF NOT EXISTS user_progress (
+    user_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    exercise_type TEXT NOT NULL,
+    attempts BIGINT NOT NULL DEFAULT 0,
+    successes BIGINT NOT NULL DEFAULT 0,
+    solved_count BIGINT NOT NULL DEFAULT 0,
+    today DATE NOT NULL DEFAULT CURRENT_DATE,
+    today_attempts BIGINT NOT NULL DEFAULT 0,
+    today_successes BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, exercise_type)
+);
+
+-- Backfill from existing results
+INSERT INTO user_progress (
+    user_id, exercise_type, attempts, successes, solved_count,
+    today, today_attempts, today_successes
+)
+SELECT
+    r.user_id,
+    r.exercise_type,
+    COUNT(*),
+    COUNT(*) FILTER (WHERE r.is_success),
+    COUNT(DISTINCT r.italian_sentence_id) FILTER (WHERE r.is_success),
+    CURRENT_DATE,
+    COUNT(*) FILTER (WHERE r.timestamp::date = CURRENT_DATE),
+    COUNT(*) FILTER (WHERE r.timestamp::date = CURRENT_DATE AND r.is_success)
+FROM (
+    SELECT 'sentence_ordering' AS exercise_type, user_id, italian_sentence_id, is_success, timestamp FROM italian_sentences_results
+    UNION ALL
+    SELECT 'missing_word' AS exercise_type, user_id, italian_sentence_id, is_success, timestamp FROM missing_word_results
+) r
+GROUP BY r.user_id, r.exercise_type
+ON CONFLICT (user_id, exercise_type) DO NOTHING;
@@ -0,0 +1,15 @@
+-- Migration 011: Time-range indexes on both results tables
+-- "Today" is queried as a half-open range [midnight, next midnight) in the session time zone,
+-- which these indexes can serve; DATE(timestamp) = CURRENT_DATE could not use any index.
+
+-- Results are appended in time order, so a BRIN index stays tiny and prunes by range
+CREATE INDEX IF NOT EXISTS idx_results_timestamp_brin ON italian_sentences_results USING BRIN (timestamp);
+CREATE INDEX IF NOT EXISTS idx_missing_word_results_timestamp_brin ON missing_word_results USING BRIN (timestamp);
+
+-- Per-user time ranges and "latest attempt" lookups
+CREATE INDEX IF NOT EXISTS idx_results_user_time ON italian_sentences_results(user_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_missing_word_results_user_time ON missing_word_results(user_id, timestamp);
+
+-- The (user_id, timestamp) indexes cover every user_id lookup, drop the single-column ones
+DROP INDEX IF EXISTS idx_results_user_id;
+DROP INDEX IF EXISTS idx_missing_word_results_user_id;
@@ -0,0 +1,20 @@
+-- Migration 012: Pointer to the latest attempted sentence per user, across exercise types
+-- Maintained together with result writes so /rus never scans the results tables
+
+CREATE TABLE IF NOT EXISTS user_last_attempt (
+    user_id BIGINT PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+    italian_sentence_id INT NOT NULL REFERENCES italian_sentences(id) ON DELETE CASCADE,
+    exercise_type TEXT NOT NULL,
+    attempted_at TIMESTAMPTZ NOT NULL
+);
+
+-- Backfill from existing results
+INSERT INTO user_last_attempt (user_id, italian_sentence_id, exercise_type, attempted_at)
+SELECT DISTINCT ON (r.user_id) r.user_id, r.italian_sentence_id, r.exercise_type, r.timestamp
+FROM (
+    SELECT 'sentence_ordering' AS exercise_type, user_id, italian_sentence_id, timestamp FROM italian_sentences_results
+    UNION ALL
+    SELECT 'missing_word' AS exercise_type, user_id, italian_sentence_id, timestamp FROM missing_word_results
+) r
+ORDER BY r.user_id, r.timestamp DESC
+ON CONFLICT (user_id) DO NOTHING;
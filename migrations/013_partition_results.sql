@@ -0,0 +1,119 @@
+-- Migration 013: Monthly range partitioning of both results tables
+-- Rows are copied into partitioned tables with the same columns; the tables keep their
+-- names so application queries are unchanged. Partitions are named <table>_yYYYYmMM and
+-- cover calendar months in UTC. Old partitions are summarized into results_archive and
+-- detached or dropped by the maintenance job in src/database/partitions.py.
+-- Stop the bot while this runs: it locks and rewrites both tables.
+
+\set ON_ERROR_STOP on
+
+BEGIN;
+
+-- Create the monthly partition of `parent` starting at `month` unless it exists
+CREATE OR REPLACE FUNCTION ensure_results_partition(parent TEXT, month DATE) RETURNS TEXT AS $$
+DECLARE
+    partition_name TEXT := format('%s_%s', parent, to_char(month, '"y"YYYY"m"MM'));
+BEGIN
+    IF to_regclass(partition_name) IS NULL THEN
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+            partition_name, parent,
+            date_trunc('month', month)::timestamp AT TIME ZONE 'UTC',
+            (date_trunc('month', month) + INTERVAL '1 month')::timestamp AT TIME ZONE 'UTC'
+        );
+    END IF;
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Per (user, sentence) summary of results whose partitions were archived, so
+-- "already solved" checks keep working after raw rows are gone
+CREATE TABLE IF NOT EXISTS results_archive (
+    user_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    italian_sentence_id INT NOT NULL REFERENCES italian_sentences(id) ON DELETE CASCADE,
+    exercise_type TEXT NOT NULL,
+    attempts BIGINT NOT NULL,
+    successes BIGINT NOT NULL,
+    first_attempt_at TIMESTAMPTZ NOT NULL,
+    last_attempt_at TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (user_id, italian_sentence_id, exercise_type)
+);
+
+-- Detached partitions are kept here when archival keeps them
+CREATE SCHEMA IF NOT EXISTS archive;
+
+-- italian_sentences_results
+
+ALTER TABLE italian_sentences_results RENAME TO italian_sentences_results_legacy;
+
+CREATE TABLE italian_sentences_results (
+    id INT NOT NULL DEFAULT nextval('italian_sentences_results_id_seq'),
+    user_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    italian_sentence_id INT NOT NULL REFERENCES italian_sentences(id) ON DELETE CASCADE,
+    is_success BOOLEAN NOT NULL,
+    timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+ALTER SEQUENCE italian_sentences_results_id_seq OWNED BY italian_sentences_results.id;
+
+-- Rows outside every monthly partition; stays empty while partitions are created ahead
+CREATE TABLE italian_sentences_results_default PARTITION OF italian_sentences_results DEFAULT;
+
+SELECT ensure_results_partition('italian_sentences_results', m::date)
+FROM generate_series(
+    date_trunc('month', COALESCE((SELECT MIN(timestamp) FROM italian_sentences_results_legacy), NOW()) AT TIME ZONE 'UTC'),
+    date_trunc('month', NOW() AT TIME ZONE 'UTC') + INTERVAL '3 months',
+    INTERVAL '1 month'
+) AS m;
+
+INSERT INTO italian_sentences_results (id, user_id, italian_sentence_id, is_success, timestamp)
+SELECT id, user_id, italian_sentence_id, is_success, timestamp FROM italian_sentences_results_legacy;
+
+DROP TABLE italian_sentences_results_legacy;
+
+CREATE INDEX idx_results_sentence_id ON italian_sentences_results(italian_sentence_id);
+CREATE INDEX idx_results_user_sentence_time ON italian_sentences_results(user_id, italian_sentence_id, timestamp);
+CREATE INDEX idx_results_user_sentence_success ON italian_sentences_results(user_id, italian_sentence_id) WHERE is_success;
+CREATE INDEX idx_results_user_time ON italian_sentences_results(user_id, timestamp);
+CREATE INDEX idx_results_timestamp_brin ON italian_sentences_results USING BRIN (timestamp);
+
+-- missing_word_results
+
+ALTER TABLE missing_word_results RENAME TO missing_word_results_legacy;
+
+CREATE TABLE missing_word_results (
+    id INT NOT NULL DEFAULT nextval('missing_word_results_id_seq'),
+    user_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    italian_sentence_id INT NOT NULL REFERENCES italian_sentences(id) ON DELETE CASCADE,
+    is_success BOOLEAN NOT NULL,
+    timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+ALTER SEQUENCE missing_word_results_id_seq OWNED BY missing_word_results.id;
+
+CREATE TABLE missing_word_results_default PARTITION OF missing_word_results DEFAULT;
+
+SELECT ensure_results_partition('missing_word_results', m::date)
+FROM generate_series(
+    date_trunc('month', COALESCE((SELECT MIN(timestamp) FROM missing_word_results_legacy), NOW()) AT TIME ZONE 'UTC'),
+    date_trunc('month', NOW() AT TIME ZONE 'UTC') + INTERVAL '3 months',
+    INTERVAL '1 month'
+) AS m;
+
+INSERT INTO missing_word_results (id, user_id, italian_sentence_id, is_success, timestamp)
+SELECT id, user_id, italian_sentence_id, is_success, timestamp FROM missing_word_results_legacy;
+
+DROP TABLE missing_word_results_legacy;
+
+CREATE INDEX idx_missing_word_results_sentence_id ON missing_word_results(italian_sentence_id);
+CREATE INDEX idx_missing_word_results_user_sentence_time ON missing_word_results(user_id, italian_sentence_id, timestamp);
+CREATE INDEX idx_missing_word_results_user_sentence_success ON missing_word_results(user_id, italian_sentence_id) WHERE is_success;
+CREATE INDEX idx_missing_word_results_user_time ON missing_word_results(user_id, timestamp);
+CREATE INDEX idx_missing_word_results_timestamp_brin ON missing_word_results USING BRIN (timestamp);
+
+COMMIT;
+
+ANALYZE italian_sentences_results;
+ANALYZE missing_word_results;
@@ -0,0 +1,24 @@
+-- Migration 014: Deduplicate sentences by a normalized-text hash
+-- Replenishment inserts batches with ON CONFLICT (sentence_hash) DO NOTHING instead of
+-- checking every sentence with a separate unindexed lookup.
+
+-- Case- and whitespace-insensitive key of a sentence
+CREATE OR REPLACE FUNCTION normalized_sentence_hash(sentence TEXT) RETURNS TEXT AS $$
+    SELECT md5(lower(regexp_replace(btrim(sentence), '\s+', ' ', 'g')))
+$$ LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE;
+
+ALTER TABLE italian_sentences ADD COLUMN IF NOT EXISTS sentence_hash TEXT;
+
+-- Existing duplicates keep their rows (results may reference them); only the
+-- oldest copy of each sentence gets the hash, the others stay NULL.
+-- Keepers are found in one sorted pass, hashing each sentence once.
+UPDATE italian_sentences s
+SET sentence_hash = k.sentence_hash
+FROM (
+    SELECT DISTINCT ON (h.sentence_hash) h.id, h.sentence_hash
+    FROM (SELECT id, normalized_sentence_hash(sentence) AS sentence_hash FROM italian_sentences) h
+    ORDER BY h.sentence_hash, h.id
+) k
+WHERE s.id = k.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_sentences_sentence_hash ON italian_sentences(sentence_hash);
@@ -0,0 +1,12 @@
+-- Migration 015: Support the resumable missing-word backfill
+-- (python -m src.database.missing_words backfill)
+
+-- Keyset pages over sentences still lacking missing-word data stay cheap as the table grows
+CREATE INDEX IF NOT EXISTS idx_sentences_missing_word ON italian_sentences(id) WHERE word_to_replace = '';
+
+-- Last sentence id up to which a backfill has processed every row
+CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+    name TEXT PRIMARY KEY,
+    last_id INT NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
@@ -0,0 +1,6 @@
+-- Migration 016: daily_stats only keeps the all-users rows (user_id 0)
+-- Personal numbers are read from user_progress and the results tables, so the per-user rows were never read
+
+DELETE FROM daily_stats WHERE user_id <> 0;
+
+DROP INDEX IF EXISTS idx_daily_stats_user_day;
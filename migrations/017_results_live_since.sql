@@ -0,0 +1,53 @@
+-- Migration 017: Bound per-user results probes to the partitions still attached
+-- results_retention.live_since is the start of the oldest month whose raw rows are still in
+-- the results table; everything older is summarized in results_archive. "Already solved"
+-- probes compare timestamp against it, so runtime partition pruning skips archived months
+-- and the default partition is only scanned for rows that really fall into it.
+
+CREATE TABLE IF NOT EXISTS results_retention (
+    table_name TEXT PRIMARY KEY,
+    live_since TIMESTAMPTZ NOT NULL DEFAULT '-infinity'
+);
+
+INSERT INTO results_retention (table_name) VALUES
+    ('italian_sentences_results'),
+    ('missing_word_results')
+ON CONFLICT (table_name) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION results_live_since(parent TEXT) RETURNS TIMESTAMPTZ AS $$
+    SELECT COALESCE((SELECT live_since FROM results_retention WHERE table_name = parent), '-infinity'::timestamptz)
+$$ LANGUAGE sql STABLE;
+
+-- Create the monthly partition of `parent` starting at `month` unless it exists.
+-- Rows of that month already sitting in the default partition would make
+-- CREATE ... PARTITION OF fail, so they are moved into the new table before it is attached.
+CREATE OR REPLACE FUNCTION ensure_results_partition(parent TEXT, month DATE) RETURNS TEXT AS $$
+DECLARE
+    partition_name TEXT := format('%s_%s', parent, to_char(month, '"y"YYYY"m"MM'));
+    default_name TEXT := format('%s_default', parent);
+    range_start TIMESTAMPTZ := date_trunc('month', month)::timestamp AT TIME ZONE 'UTC';
+    range_end TIMESTAMPTZ := (date_trunc('month', month) + INTERVAL '1 month')::timestamp AT TIME ZONE 'UTC';
+    moved BIGINT;
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+    EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_name, parent);
+    IF to_regclass(default_name) IS NOT NULL THEN
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM %I WHERE timestamp >= %L AND timestamp < %L RETURNING *) '
+            'INSERT INTO %I SELECT * FROM moved',
+            default_name, range_start, range_end, partition_name
+        );
+        GET DIAGNOSTICS moved = ROW_COUNT;
+        IF moved > 0 THEN
+            RAISE NOTICE 'Moved % rows from % into %', moved, default_name, partition_name;
+        END IF;
+    END IF;
+    EXECUTE format(
+        'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        parent, partition_name, range_start, range_end
+    );
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
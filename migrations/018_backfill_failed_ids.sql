@@ -0,0 +1,6 @@
+-- Migration 018: Remember rows a backfill failed on instead of holding its checkpoint back
+-- One failed row used to pin last_id for the rest of the run, so every later row was redone
+-- by the next run. The checkpoint now moves past failures; their ids are kept here and
+-- retried in a separate pass at the start of the next run.
+
+ALTER TABLE backfill_checkpoints ADD COLUMN IF NOT EXISTS failed_ids INT[] NOT NULL DEFAULT '{}';
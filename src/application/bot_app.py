@@ -22,16 +22,66 @@ project_root = os.path.dirname(os.path.dirname(current_dir))
 sys.path.insert(0, project_root)
 
 try:
-    from config import get_bot_config, get_logging_config
-    from database import get_schema_migrations, get_table_counts
+    from config import get_bot_config, get_logging_config, get_exercise_config, get_result_buffer_config, get_users_config, get_phrases_config, get_stats_config, get_partitions_config, get_replenishment_config, get_inventory_config, get_journal_config, get_near_duplicates_config
+    from database import (
+        get_startup_diagnostics,
+        init_pool,
+        close_pool,
+        add_new_sentences_listener,
+        start_result_buffer,
+        stop_result_buffer,
+        start_access_flusher,
+        stop_access_flusher,
+        start_phrase_cache,
+        stop_phrase_cache,
+        start_global_stats_cache,
+        stop_global_stats_cache,
+        start_partition_maintenance,
+        stop_partition_maintenance,
+        start_replenishment_coordinator,
+        stop_replenishment_coordinator,
+        close_llm_client,
+        start_inventory_worker,
+        stop_inventory_worker,
+        open_generation_journal,
+        close_generation_journal,
+        start_near_duplicate_index,
+        stop_near_duplicate_index
+    )
     from state.learning_state import LearningState
+    from state.sentence_deck import SentenceDeck
     from exercises.sentence_ordering import SentenceOrderingExercise
     from bot_commands import create_start_command_handler, create_echo_handler, create_help_command_handler, create_stats_command_handler, create_rus_command_handler
 except ImportError:
     # Fallback for Docker environment
-    from src.config import get_bot_config, get_logging_config
-    from src.database import get_schema_migrations, get_table_counts
+    from src.config import get_bot_config, get_logging_config, get_exercise_config, get_result_buffer_config, get_users_config, get_phrases_config, get_stats_config, get_partitions_config, get_replenishment_config, get_inventory_config, get_journal_config, get_near_duplicates_config
+    from src.database import (
+        get_startup_diagnostics,
+        init_pool,
+        close_pool,
+        add_new_sentences_listener,
+        start_result_buffer,
+        stop_result_buffer,
+        start_access_flusher,
+        stop_access_flusher,
+        start_phrase_cache,
+        stop_phrase_cache,
+        start_global_stats_cache,
+        stop_global_stats_cache,
+        start_partition_maintenance,
+        stop_partition_maintenance,
+        start_replenishment_coordinator,
+        stop_replenishment_coordinator,
+        close_llm_client,
+        start_inventory_worker,
+        stop_inventory_worker,
+        open_generation_journal,
+        close_generation_journal,
+        start_near_duplicate_index,
+        stop_near_duplicate_index
+    )
     from src.state.learning_state import LearningState
+    from src.state.sentence_deck import SentenceDeck
     from src.exercises.sentence_ordering import SentenceOrderingExercise
     from src.bot_commands import create_start_command_handler, create_echo_handler, create_help_command_handler, create_rus_command_handler
 
@@ -56,7 +106,16 @@ class ParlaItalianoBot:
         
         # Initialize application components
         self.learning_state = LearningState()
-        self.sentence_exercise = SentenceOrderingExercise(self.learning_state)
+        exercise_config = get_exercise_config()
+        self.sentence_deck = SentenceDeck(
+            deck_size=exercise_config.deck_size,
+            low_water_mark=exercise_config.deck_low_water_mark,
+            max_users=exercise_config.max_cached_users
+        )
+        # New sentences must reach users who ran out of sentences, also while a generation is still streaming
+        add_new_sentences_listener(self.sentence_deck.refresh_waiting)
+        self.sentence_exercise = SentenceOrderingExercise(self.learning_state, self.sentence_deck,
+                                                          exercise_config.max_cached_users)
         
         # Initialize command handlers
         self._setup_command_handlers()
@@ -81,7 +140,7 @@ class ParlaItalianoBot:
         self.router.message(Command("stats"))(stats_handler)
         
         # Create and register /rus command handler
-        rus_handler = create_rus_command_handler(self.learning_state, self.bot)
+        rus_handler = create_rus_command_handler(self.learning_state, self.bot, self.sentence_exercise)
         self.router.message(Command("rus"))(rus_handler)
     
     def _setup_callback_handlers(self) -> None:
@@ -110,33 +169,108 @@ class ParlaItalianoBot:
         )
     
     async def _log_initialization_info(self) -> None:
-        """Log application initialization information."""
-        logging.info("-"*80)
-        logging.info("Bot is starting...")
-        logging.info("Connecting to database for init logging...")
+        """Log application initialization information without delaying startup on failure."""
+        logging_config = get_logging_config()
+        try:
+            diagnostics = await asyncio.wait_for(
+                get_startup_diagnostics(exact_counts=logging_config.startup_exact_counts),
+                logging_config.startup_diagnostics_timeout
+            )
+        except asyncio.TimeoutError:
+            logging.warning(f"Startup diagnostics timed out after {logging_config.startup_diagnostics_timeout} seconds")
+            return
+        except Exception as e:
+            logging.warning(f"Startup diagnostics failed: {e}")
+            return
         
         # Log schema migrations
-        migrations = await get_schema_migrations()
-        for migration in migrations:
+        for migration in diagnostics['migrations']:
             logging.info(f"Schema migration: {migration}")
         
-        # Log table counts
-        counts = await get_table_counts()
-        for table, count in counts.items():
-            logging.info(f"Table {table}: {count} rows")
-        
-        logging.info("Starting polling...")
+        # Log table sizes
+        for table, count in diagnostics['table_counts'].items():
+            if count is None:
+                logging.info(f"Table {table}: row count unknown (not analyzed yet)")
+            elif logging_config.startup_exact_counts:
+                logging.info(f"Table {table}: {count} rows")
+            else:
+                logging.info(f"Table {table}: ~{count} rows (estimate)")
+    
+    async def _start_background_services(self) -> None:
+        """Start background services that cache database reads and batch database writes."""
+        await start_phrase_cache(get_phrases_config().cache_ttl)
+        start_global_stats_cache(get_stats_config().global_cache_ttl)
+        result_buffer_config = get_result_buffer_config()
+        start_result_buffer(
+            batch_size=result_buffer_config.batch_size,
+            flush_interval=result_buffer_config.flush_interval,
+            max_pending=result_buffer_config.max_pending
+        )
+        start_access_flusher(get_users_config().access_flush_interval, get_exercise_config().max_cached_users)
+        partitions_config = get_partitions_config()
+        start_partition_maintenance(
+            interval=partitions_config.maintenance_interval,
+            months_ahead=partitions_config.months_ahead,
+            retention_months=partitions_config.retention_months,
+            keep_detached=partitions_config.keep_detached
+        )
+        journal_config = get_journal_config()
+        if journal_config.enabled:
+            open_generation_journal(journal_config.path, journal_config.max_bytes, journal_config.backup_count)
+        near_duplicates_config = get_near_duplicates_config()
+        if near_duplicates_config.enabled:
+            start_near_duplicate_index(near_duplicates_config.threshold)
+        start_replenishment_coordinator(get_replenishment_config().max_concurrent)
+        inventory_config = get_inventory_config()
+        start_inventory_worker(
+            interval=inventory_config.check_interval,
+            safety_stock=inventory_config.safety_stock,
+            active_window_hours=inventory_config.active_window_hours,
+            sentences_per_batch=inventory_config.sentences_per_batch,
+            max_batches=inventory_config.max_batches
+        )
+    
+    async def _stop_background_services(self) -> None:
+        """Stop background services, flushing everything they still hold."""
+        await stop_inventory_worker()
+        await stop_replenishment_coordinator()
+        await close_llm_client()
+        close_generation_journal()
+        await stop_near_duplicate_index()
+        await stop_partition_maintenance()
+        await stop_access_flusher()
+        await stop_result_buffer()
+        await stop_phrase_cache()
+        stop_global_stats_cache()
     
     async def start(self) -> None:
         """
         Start the bot application.
         
-        This method sets up logging, logs initialization information,
-        and starts the bot polling.
+        This method sets up logging, creates the shared database pool,
+        starts background services and starts the bot polling while
+        initialization information is logged concurrently. Buffered writes
+        are flushed and the pool is closed when polling stops.
         """
         await self._setup_logging()
-        await self._log_initialization_info()
-        await self.dp.start_polling(self.bot)
+        await init_pool()
+        try:
+            await self._start_background_services()
+            try:
+                logging.info("-"*80)
+                logging.info("Bot is starting...")
+                # Diagnostics are informational only, polling does not wait for them
+                diagnostics_task = asyncio.create_task(self._log_initialization_info())
+                logging.info("Starting polling...")
+                try:
+                    await self.dp.start_polling(self.bot)
+                finally:
+                    if not diagnostics_task.done():
+                        diagnostics_task.cancel()
+            finally:
+                await self._stop_background_services()
+        finally:
+            await close_pool()
     
     def get_dispatcher(self) -> Dispatcher:
         """
@@ -25,13 +25,14 @@ except ImportError:
     from state.learning_state import LearningState
 
 
-def create_rus_command_handler(learning_state: LearningState, bot):
+def create_rus_command_handler(learning_state: LearningState, bot, sentence_exercise=None):
     """
     Create a Russian translation command handler.
 
     Args:
         learning_state: LearningState instance for managing user progress
         bot: Bot instance for deleting messages
+        sentence_exercise: SentenceOrderingExercise whose in-memory last attempts are used, if given
 
     Returns:
         Async function that handles the /rus command
@@ -61,7 +62,10 @@ def create_rus_command_handler(learning_state: LearningState, bot):
                 pass
         
         # Get the last attempted sentence for this user
-        last_sentence = await get_last_attempted_sentence(user_id)
+        if sentence_exercise is not None:
+            last_sentence = await sentence_exercise.get_last_attempted_sentence(user_id)
+        else:
+            last_sentence = await get_last_attempted_sentence(user_id)
         
         if last_sentence:
             italian_sentence = last_sentence['italian']
@@ -23,6 +23,11 @@ class DatabaseConfig(BaseModel):
     name: str = Field(..., description="Database name")
     user: str = Field(..., description="Database user")
     password: str = Field(..., description="Database password")
+    pool_min_size: int = Field(1, ge=0, description="Minimum number of pooled connections")
+    pool_max_size: int = Field(5, ge=1, description="Maximum number of pooled connections")
+    pool_acquire_timeout: float = Field(10.0, gt=0, description="Seconds to wait for a free pooled connection")
+    pool_max_inactive_lifetime: float = Field(300.0, ge=0, description="Seconds after which an idle pooled connection is closed")
+    timezone: str = Field("UTC", description="Session time zone (IANA name) that defines day boundaries for statistics")
 
     model_config = {'env_prefix': 'DB_'}
 
@@ -32,6 +37,16 @@ class LLMConfig(BaseModel):
     api_url: str = Field(..., description="LLM API base URL")
     api_key: str = Field(..., description="LLM API key")
     model_name: str = Field(..., description="LLM model identifier")
+    max_connections: int = Field(10, ge=1, description="Maximum number of pooled HTTP connections to the LLM API")
+    keepalive_expiry: float = Field(60.0, ge=0, description="Seconds an idle LLM API connection is kept open for reuse")
+    request_timeout: float = Field(120.0, gt=0, description="Seconds allowed for one LLM API request")
+    http2: bool = Field(True, description="Use HTTP/2 for the LLM API when the h2 package is installed")
+    requests_per_minute: float = Field(20.0, gt=0, description="LLM API requests allowed per minute across the process")
+    tokens_per_minute: float = Field(100000.0, gt=0, description="LLM API tokens allowed per minute across the process")
+    estimated_tokens: int = Field(3000, ge=1, description="Tokens reserved per LLM call until its actual usage is known")
+    breaker_failure_threshold: int = Field(5, ge=1, description="Consecutive LLM call failures that open the circuit breaker")
+    breaker_reset_timeout: float = Field(60.0, gt=0, description="Seconds the circuit breaker stays open before a probe call")
+    streaming: bool = Field(True, description="Stream generations and store each sentence pair as soon as its line is complete")
 
 
 class BotConfig(BaseModel):
@@ -48,6 +63,73 @@ class ValidationConfig(BaseModel):
 class LoggingConfig(BaseModel):
     """Logging configuration"""
     log_dir: str = Field(..., description="Log directory path")
+    startup_exact_counts: bool = Field(False, description="Log exact table row counts at startup instead of catalog estimates")
+    startup_diagnostics_timeout: float = Field(10.0, gt=0, description="Seconds allowed for startup diagnostics")
+
+
+class ExerciseConfig(BaseModel):
+    """Exercise configuration"""
+    deck_size: int = Field(20, ge=1, description="Number of unsolved sentences prefetched per user")
+    deck_low_water_mark: int = Field(5, ge=0, description="Deck size below which a background refill starts")
+    max_cached_users: int = Field(10000, ge=1, description="Most recently active users whose deck, last attempt and profile are kept in memory")
+
+
+class ResultBufferConfig(BaseModel):
+    """Exercise result write-behind buffer configuration"""
+    batch_size: int = Field(500, ge=1, description="Buffered results that trigger an immediate flush")
+    flush_interval: float = Field(1.0, gt=0, description="Maximum seconds a result waits before being flushed")
+    max_pending: int = Field(10000, ge=1, description="Buffer capacity before writers are made to wait")
+
+
+class UsersConfig(BaseModel):
+    """User tracking configuration"""
+    access_flush_interval: float = Field(60.0, gt=0, description="Seconds between batched last_access_at writes")
+
+
+class PhrasesConfig(BaseModel):
+    """Phrase cache configuration"""
+    cache_ttl: float = Field(3600.0, gt=0, description="Seconds after which cached phrases are reloaded")
+
+
+class StatsConfig(BaseModel):
+    """/stats configuration"""
+    global_cache_ttl: float = Field(30.0, gt=0, description="Seconds the global /stats numbers are shared between requests")
+
+
+class PartitionsConfig(BaseModel):
+    """Results partition maintenance configuration"""
+    maintenance_interval: float = Field(86400.0, gt=0, description="Seconds between partition maintenance runs")
+    months_ahead: int = Field(3, ge=1, description="Number of future monthly partitions kept created")
+    retention_months: int = Field(12, ge=0, description="Months of raw results kept before archival, 0 keeps everything")
+    keep_detached: bool = Field(True, description="Move archived partitions to the archive schema instead of dropping them")
+
+
+class ReplenishmentConfig(BaseModel):
+    """Sentence replenishment configuration"""
+    max_concurrent: int = Field(1, ge=1, description="Maximum number of LLM sentence generations running at the same time")
+
+
+class InventoryConfig(BaseModel):
+    """Sentence inventory worker configuration"""
+    check_interval: float = Field(300.0, gt=0, description="Seconds between sentence demand checks")
+    safety_stock: int = Field(100, ge=0, description="Unsolved sentences kept ahead of the most advanced active user")
+    active_window_hours: float = Field(24.0, gt=0, description="Hours since the last attempt within which a user counts as active")
+    sentences_per_batch: int = Field(30, ge=1, description="Expected number of new sentences per generation")
+    max_batches: int = Field(3, ge=1, description="Maximum number of generations requested per check")
+
+
+class JournalConfig(BaseModel):
+    """LLM generation journal configuration"""
+    enabled: bool = Field(True, description="Append every raw LLM response to the journal before parsing it")
+    path: str = Field("./logs/llm_journal.jsonl", description="Journal file path")
+    max_bytes: int = Field(50 * 1024 * 1024, ge=0, description="Journal size at which it is rotated, 0 never rotates")
+    backup_count: int = Field(5, ge=0, description="Number of rotated journal files kept")
+
+
+class NearDuplicatesConfig(BaseModel):
+    """Near-duplicate sentence index configuration"""
+    enabled: bool = Field(True, description="Reject generated sentences too similar to stored ones")
+    threshold: float = Field(0.7, gt=0, le=1, description="Word-set Jaccard similarity at or above which a sentence is a near-duplicate")
 
 
 class ApplicationConfig(BaseModel):
@@ -57,6 +139,16 @@ class ApplicationConfig(BaseModel):
     bot: BotConfig
     validation: ValidationConfig
     logging: LoggingConfig = LoggingConfig(log_dir='./logs')
+    exercises: ExerciseConfig = ExerciseConfig()
+    result_buffer: ResultBufferConfig = ResultBufferConfig()
+    users: UsersConfig = UsersConfig()
+    phrases: PhrasesConfig = PhrasesConfig()
+    stats: StatsConfig = StatsConfig()
+    partitions: PartitionsConfig = PartitionsConfig()
+    replenishment: ReplenishmentConfig = ReplenishmentConfig()
+    inventory: InventoryConfig = InventoryConfig()
+    journal: JournalConfig = JournalConfig()
+    near_duplicates: NearDuplicatesConfig = NearDuplicatesConfig()
 
 
 def load_config_from_env():
@@ -98,14 +190,29 @@ def load_config_from_ini(config_file: str = 'config.ini') -> dict:
             'host': config['Database'].get('DB_HOST', 'localhost'),
             'port': int(config['Database'].get('DB_PORT', 5432)),
             'name': config['Database'].get('DB_NAME', 'parla_italiano'),
-            'user': config['Database'].get('DB_USER', 'parla_user')
+            'user': config['Database'].get('DB_USER', 'parla_user'),
+            'pool_min_size': int(config['Database'].get('DB_POOL_MIN_SIZE', 1)),
+            'pool_max_size': int(config['Database'].get('DB_POOL_MAX_SIZE', 5)),
+            'pool_acquire_timeout': float(config['Database'].get('DB_POOL_ACQUIRE_TIMEOUT', 10.0)),
+            'pool_max_inactive_lifetime': float(config['Database'].get('DB_POOL_MAX_INACTIVE_LIFETIME', 300.0)),
+            'timezone': config['Database'].get('DB_TIMEZONE', 'UTC')
         }
     
     # Load LLM configuration  
     if 'LLM' in config:
         ini_config['llm'] = {
             'api_url': config['LLM'].get('LLM_API_URL', 'https://openrouter.ai/api/v1'),
-            'model_name': config['LLM'].get('LLM_MODEL_NAME', 'qwen/qwen3-235b-a22b:free')
+            'model_name': config['LLM'].get('LLM_MODEL_NAME', 'qwen/qwen3-235b-a22b:free'),
+            'max_connections': int(config['LLM'].get('LLM_MAX_CONNECTIONS', 10)),
+            'keepalive_expiry': float(config['LLM'].get('LLM_KEEPALIVE_EXPIRY', 60.0)),
+            'request_timeout': float(config['LLM'].get('LLM_REQUEST_TIMEOUT', 120.0)),
+            'http2': config['LLM'].getboolean('LLM_HTTP2', True),
+            'requests_per_minute': float(config['LLM'].get('LLM_REQUESTS_PER_MINUTE', 20.0)),
+            'tokens_per_minute': float(config['LLM'].get('LLM_TOKENS_PER_MINUTE', 100000.0)),
+            'estimated_tokens': int(config['LLM'].get('LLM_ESTIMATED_TOKENS', 3000)),
+            'breaker_failure_threshold': int(config['LLM'].get('LLM_BREAKER_FAILURE_THRESHOLD', 5)),
+            'breaker_reset_timeout': float(config['LLM'].get('LLM_BREAKER_RESET_TIMEOUT', 60.0)),
+            'streaming': config['LLM'].getboolean('LLM_STREAMING', True)
         }
     
     # Load validation configuration
@@ -122,7 +229,84 @@ def load_config_from_ini(config_file: str = 'config.ini') -> dict:
     # Load logging configuration
     if 'Logging' in config:
         ini_config['logging'] = {
-            'log_dir': config['Logging'].get('LOG_DIR', './logs')
+            'log_dir': config['Logging'].get('LOG_DIR', './logs'),
+            'startup_exact_counts': config['Logging'].getboolean('STARTUP_EXACT_COUNTS', False),
+            'startup_diagnostics_timeout': float(config['Logging'].get('STARTUP_DIAGNOSTICS_TIMEOUT', 10.0))
+        }
+    
+    # Load exercise configuration
+    if 'Exercises' in config:
+        ini_config['exercises'] = {
+            'deck_size': int(config['Exercises'].get('DECK_SIZE', 20)),
+            'deck_low_water_mark': int(config['Exercises'].get('DECK_LOW_WATER_MARK', 5)),
+            'max_cached_users': int(config['Exercises'].get('MAX_CACHED_USERS', 10000))
+        }
+    
+    # Load result buffer configuration
+    if 'ResultBuffer' in config:
+        ini_config['result_buffer'] = {
+            'batch_size': int(config['ResultBuffer'].get('BATCH_SIZE', 500)),
+            'flush_interval': float(config['ResultBuffer'].get('FLUSH_INTERVAL', 1.0)),
+            'max_pending': int(config['ResultBuffer'].get('MAX_PENDING', 10000))
+        }
+    
+    # Load user tracking configuration
+    if 'Users' in config:
+        ini_config['users'] = {
+            'access_flush_interval': float(config['Users'].get('ACCESS_FLUSH_INTERVAL', 60.0))
+        }
+    
+    # Load phrase cache configuration
+    if 'Phrases' in config:
+        ini_config['phrases'] = {
+            'cache_ttl': float(config['Phrases'].get('CACHE_TTL', 3600.0))
+        }
+    
+    # Load stats configuration
+    if 'Stats' in config:
+        ini_config['stats'] = {
+            'global_cache_ttl': float(config['Stats'].get('GLOBAL_CACHE_TTL', 30.0))
+        }
+    
+    # Load partition maintenance configuration
+    if 'Partitions' in config:
+        ini_config['partitions'] = {
+            'maintenance_interval': float(config['Partitions'].get('MAINTENANCE_INTERVAL', 86400.0)),
+            'months_ahead': int(config['Partitions'].get('MONTHS_AHEAD', 3)),
+            'retention_months': int(config['Partitions'].get('RETENTION_MONTHS', 12)),
+            'keep_detached': config['Partitions'].getboolean('KEEP_DETACHED', True)
+        }
+    
+    # Load sentence replenishment configuration
+    if 'Replenishment' in config:
+        ini_config['replenishment'] = {
+            'max_concurrent': int(config['Replenishment'].get('MAX_CONCURRENT', 1))
+        }
+    
+    # Load sentence inventory configuration
+    if 'Inventory' in config:
+        ini_config['inventory'] = {
+            'check_interval': float(config['Inventory'].get('CHECK_INTERVAL', 300.0)),
+            'safety_stock': int(config['Inventory'].get('SAFETY_STOCK', 100)),
+            'active_window_hours': float(config['Inventory'].get('ACTIVE_WINDOW_HOURS', 24.0)),
+            'sentences_per_batch': int(config['Inventory'].get('SENTENCES_PER_BATCH', 30)),
+            'max_batches': int(config['Inventory'].get('MAX_BATCHES', 3))
+        }
+    
+    # Load LLM generation journal configuration
+    if 'Journal' in config:
+        ini_config['journal'] = {
+            'enabled': config['Journal'].getboolean('ENABLED', True),
+            'path': config['Journal'].get('PATH', './logs/llm_journal.jsonl'),
+            'max_bytes': int(config['Journal'].get('MAX_BYTES', 50 * 1024 * 1024)),
+            'backup_count': int(config['Journal'].get('BACKUP_COUNT', 5))
+        }
+    
+    # Load near-duplicate index configuration
+    if 'NearDuplicates' in config:
+        ini_config['near_duplicates'] = {
+            'enabled': config['NearDuplicates'].getboolean('ENABLED', True),
+            'threshold': float(config['NearDuplicates'].get('THRESHOLD', 0.7))
         }
     
     return ini_config
@@ -151,6 +335,46 @@ def merge_configurations(env_config: dict, ini_config: dict) -> dict:
     elif 'logging' in ini_config:
         merged['logging'] = ini_config['logging']
     
+    # Add exercise config from INI
+    if 'exercises' in ini_config:
+        merged['exercises'] = ini_config['exercises']
+    
+    # Add result buffer config from INI
+    if 'result_buffer' in ini_config:
+        merged['result_buffer'] = ini_config['result_buffer']
+    
+    # Add user tracking config from INI
+    if 'users' in ini_config:
+        merged['users'] = ini_config['users']
+    
+    # Add phrase cache config from INI
+    if 'phrases' in ini_config:
+        merged['phrases'] = ini_config['phrases']
+    
+    # Add stats config from INI
+    if 'stats' in ini_config:
+        merged['stats'] = ini_config['stats']
+    
+    # Add partition maintenance config from INI
+    if 'partitions' in ini_config:
+        merged['partitions'] = ini_config['partitions']
+    
+    # Add sentence replenishment config from INI
+    if 'replenishment' in ini_config:
+        merged['replenishment'] = ini_config['replenishment']
+    
+    # Add sentence inventory config from INI
+    if 'inventory' in ini_config:
+        merged['inventory'] = ini_config['inventory']
+    
+    # Add LLM generation journal config from INI
+    if 'journal' in ini_config:
+        merged['journal'] = ini_config['journal']
+    
+    # Add near-duplicate index config from INI
+    if 'near_duplicates' in ini_config:
+        merged['near_duplicates'] = ini_config['near_duplicates']
+    
     return merged
 
 
@@ -215,4 +439,54 @@ def get_validation_config() -> ValidationConfig:
 
 def get_logging_config() -> LoggingConfig:
     """Get logging configuration"""
-    return get_config().logging
\ No newline at end of file
+    return get_config().logging
+
+
+def get_exercise_config() -> ExerciseConfig:
+    """Get exercise configuration"""
+    return get_config().exercises
+
+
+def get_result_buffer_config() -> ResultBufferConfig:
+    """Get result buffer configuration"""
+    return get_config().result_buffer
+
+
+def get_users_config() -> UsersConfig:
+    """Get user tracking configuration"""
+    return get_config().users
+
+
+def get_phrases_config() -> PhrasesConfig:
+    """Get phrase cache configuration"""
+    return get_config().phrases
+
+
+def get_stats_config() -> StatsConfig:
+    """Get /stats configuration"""
+    return get_config().stats
+
+
+def get_partitions_config() -> PartitionsConfig:
+    """Get results partition maintenance configuration"""
+    return get_config().partitions
+
+
+def get_replenishment_config() -> ReplenishmentConfig:
+    """Get sentence replenishment configuration"""
+    return get_config().replenishment
+
+
+def get_inventory_config() -> InventoryConfig:
+    """Get sentence inventory worker configuration"""
+    return get_config().inventory
+
+
+def get_journal_config() -> JournalConfig:
+    """Get LLM generation journal configuration"""
+    return get_config().journal
+
+
+def get_near_duplicates_config() -> NearDuplicatesConfig:
+    """Get near-duplicate sentence index configuration"""
+    return get_config().near_duplicates
\ No newline at end of file
@@ -10,11 +10,85 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import all functions from submodules to maintain backward compatibility
-from .connection import get_schema_migrations, get_table_counts, get_stats_data, get_last_attempted_sentence
-from .users import get_or_create_user
+from .connection import (
+    init_pool,
+    close_pool,
+    get_pool,
+    acquire_connection,
+    get_schema_migrations,
+    get_table_counts,
+    get_startup_diagnostics,
+    get_stats_data,
+    get_last_attempted_sentence,
+    get_sentence_translation,
+    start_global_stats_cache,
+    stop_global_stats_cache,
+    get_global_stats_cache
+)
+from .cache import SingleFlightCache
+from .users import get_or_create_user, flush_user_access, start_access_flusher, stop_access_flusher
+from .results import ResultWriteBuffer, start_result_buffer, stop_result_buffer, get_result_buffer
+from .daily_stats import update_daily_stats
+from .user_progress import update_user_progress, get_user_progress
+from .last_attempts import update_last_attempts
+from .partitions import (
+    ensure_partitions,
+    list_partitions,
+    archive_partition,
+    maintain_results_partitions,
+    start_partition_maintenance,
+    stop_partition_maintenance
+)
+from .replenishment import (
+    ReplenishmentCoordinator,
+    start_replenishment_coordinator,
+    stop_replenishment_coordinator,
+    get_replenishment_coordinator
+)
+from .inventory import (
+    InventoryWorker,
+    get_sentence_demand,
+    start_inventory_worker,
+    stop_inventory_worker,
+    get_inventory_worker
+)
+from .journal import (
+    GenerationJournal,
+    open_generation_journal,
+    close_generation_journal,
+    get_generation_journal,
+    replay_journal
+)
+from .llm_limits import (
+    CircuitOpenError,
+    TokenBucket,
+    CircuitBreaker,
+    LLMCallGuard,
+    get_llm_call_guard,
+    get_llm_call_metrics
+)
+from .validation import SentenceValidator, BatchValidationResult, get_sentence_validator
+from .missing_words import MissingWordBackfill, validate_missing_word_data
+from .near_duplicates import (
+    NearDuplicateIndex,
+    start_near_duplicate_index,
+    stop_near_duplicate_index,
+    get_near_duplicate_index
+)
+from .base import LLMClient, get_llm_client, close_llm_client
+from .phrases import PhraseCache, start_phrase_cache, stop_phrase_cache, get_phrase_cache
 from .sentences import (
+    get_corpus_size,
     get_random_sentence,
+    get_unsolved_sentences,
+    request_replenishment,
+    add_new_sentences_listener,
+    remove_new_sentences_listener,
     store_sentence_result,
+    store_sentence_pairs,
+    validate_sentence_pairs,
+    parse_journal_entry,
+    stream_and_store_sentences,
     get_random_encouraging_phrase,
     get_random_error_phrase,
     get_random_exercise_prompt
@@ -28,17 +102,119 @@ import asyncpg
 
 __all__ = [
     # Connection functions
+    'init_pool',
+    'close_pool',
+    'get_pool',
+    'acquire_connection',
     'get_schema_migrations',
     'get_table_counts',
+    'get_startup_diagnostics',
     'get_stats_data',
     'get_last_attempted_sentence',
+    'get_sentence_translation',
+    
+    # Global stats cache
+    'SingleFlightCache',
+    'start_global_stats_cache',
+    'stop_global_stats_cache',
+    'get_global_stats_cache',
     
     # User functions
     'get_or_create_user',
+    'flush_user_access',
+    'start_access_flusher',
+    'stop_access_flusher',
+    
+    # Result buffer
+    'ResultWriteBuffer',
+    'start_result_buffer',
+    'stop_result_buffer',
+    'get_result_buffer',
+    
+    # Daily statistics rollup
+    'update_daily_stats',
+    
+    # Per-user progress counters
+    'update_user_progress',
+    'get_user_progress',
+    
+    # Last attempted sentence pointers
+    'update_last_attempts',
+    
+    # Results partition maintenance
+    'ensure_partitions',
+    'list_partitions',
+    'archive_partition',
+    'maintain_results_partitions',
+    'start_partition_maintenance',
+    'stop_partition_maintenance',
+    
+    # Replenishment coordinator
+    'ReplenishmentCoordinator',
+    'start_replenishment_coordinator',
+    'stop_replenishment_coordinator',
+    'get_replenishment_coordinator',
+    
+    # Sentence inventory worker
+    'InventoryWorker',
+    'get_sentence_demand',
+    'start_inventory_worker',
+    'stop_inventory_worker',
+    'get_inventory_worker',
+    
+    # LLM generation journal
+    'GenerationJournal',
+    'open_generation_journal',
+    'close_generation_journal',
+    'get_generation_journal',
+    'replay_journal',
+    
+    # Shared LLM client
+    'LLMClient',
+    'get_llm_client',
+    'close_llm_client',
+    
+    # LLM call limits
+    'CircuitOpenError',
+    'TokenBucket',
+    'CircuitBreaker',
+    'LLMCallGuard',
+    'get_llm_call_guard',
+    'get_llm_call_metrics',
+    
+    # Sentence validation
+    'SentenceValidator',
+    'BatchValidationResult',
+    'get_sentence_validator',
+    
+    # Missing-word backfill
+    'MissingWordBackfill',
+    'validate_missing_word_data',
+    
+    # Near-duplicate index
+    'NearDuplicateIndex',
+    'start_near_duplicate_index',
+    'stop_near_duplicate_index',
+    'get_near_duplicate_index',
+    
+    # Phrase cache
+    'PhraseCache',
+    'start_phrase_cache',
+    'stop_phrase_cache',
+    'get_phrase_cache',
     
     # Sentence functions
+    'get_corpus_size',
     'get_random_sentence',
+    'get_unsolved_sentences',
+    'request_replenishment',
+    'add_new_sentences_listener',
+    'remove_new_sentences_listener',
     'store_sentence_result',
+    'store_sentence_pairs',
+    'validate_sentence_pairs',
+    'stream_and_store_sentences',
+    'parse_journal_entry',
     'get_random_encouraging_phrase',
     'get_random_error_phrase',
     'get_random_exercise_prompt',
@@ -5,18 +5,22 @@ This module provides common utilities including validation, LLM integration,
 and data processing functions used across different database modules.
 """
 
+import importlib.util
 import logging
 import random
 import asyncio
-import time
+import httpx
 import pydantic
 from typing import List, Optional
-from openai import OpenAI
+from openai import AsyncOpenAI
 import instructor
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from .llm_limits import CircuitOpenError
+from .validation import get_sentence_validator
+
 # Mock config for testing if config.ini doesn't exist
 class MockValidationConfig:
     italian_characters: set = set('abcdefghiklmnopqrstuvzàèéìíîòóùú .,;:!?\'-')
@@ -46,6 +50,16 @@ def get_llm_config():
             api_key = "test-key"
             api_url = "https://test.api"
             model_name = "test-model"
+            max_connections = 10
+            keepalive_expiry = 60.0
+            request_timeout = 120.0
+            http2 = True
+            requests_per_minute = 20.0
+            tokens_per_minute = 100000.0
+            estimated_tokens = 3000
+            breaker_failure_threshold = 5
+            breaker_reset_timeout = 60.0
+            streaming = True
         return MockLLMConfig()
 
 
@@ -61,6 +75,11 @@ class SentenceWithTranslation(pydantic.BaseModel):
 class SentenceTranslationList(pydantic.BaseModel):
     sentences: List[SentenceWithTranslation]
 
+# Pydantic model for missing word exercise data
+class MissingWordResult(pydantic.BaseModel):
+    word_to_replace: str
+    word_suggestions: List[str]
+
 
 def is_valid_italian_sentence(sentence: str) -> bool:
     """
@@ -69,44 +88,14 @@ def is_valid_italian_sentence(sentence: str) -> bool:
     2. Has between 3 and 10 words
     3. Does not contain duplicate words
     """
-    validation_config = get_validation_config()
-    
-    # Check word count
-    word_count = len(sentence.split())
-    if word_count < 3 or word_count > 10:
-        return False
-    
-    # Check for duplicate words
-    words = sentence.lower().split()
-    if len(words) != len(set(words)):
-        return False
-    
-    # Check character set
-    sentence_lower = sentence.lower()
-    for char in sentence_lower:
-        if char not in validation_config.italian_characters:
-            return False
-    
-    return True
+    return not get_sentence_validator().italian_errors(sentence)
 
 
 def is_valid_russian_sentence(sentence: str) -> bool:
     """
-    Validate that a Russian sentence:
-    1. Contains only Russian letters (including accented characters)
-    2. Has between 3 and 10 words
-    3. Does not contain duplicate words
-    4. Uses only Russian alphabet and punctuation
+    Validate that a Russian sentence contains only Russian letters and punctuation
     """
-    validation_config = get_validation_config()
-    
-    # Check character set
-    sentence_lower = sentence.lower()
-    for char in sentence_lower:
-        if char not in validation_config.russian_characters:
-            return False
-    
-    return True
+    return not get_sentence_validator().russian_errors(sentence)
 
 
 def clean_sentence(sentence: str) -> str:
@@ -115,15 +104,75 @@ def clean_sentence(sentence: str) -> str:
     return ' '.join(sentence.strip().split())
 
 
-async def get_llm_client():
-    """Get configured LLM client"""
-    llm_config = get_llm_config()
-    
-    # Check if API key is available
-    if not llm_config.api_key:
-        raise ValueError("LLM_API_KEY not found in environment variables")
-    
-    return instructor.patch(OpenAI(base_url=llm_config.api_url, api_key=llm_config.api_key))
+class LLMClient:
+    """
+    Long-lived async LLM client with pooled keep-alive HTTP connections.
+    """
+
+    def __init__(self, api_url: str, api_key: str, max_connections: int = 10,
+                 keepalive_expiry: float = 60.0, request_timeout: float = 120.0, http2: bool = True):
+        """
+        Create the HTTP connection pool and the OpenAI clients on top of it.
+
+        Args:
+            api_url: LLM API base URL
+            api_key: LLM API key
+            max_connections: Maximum number of open connections to the API
+            keepalive_expiry: Seconds an idle connection is kept open for reuse
+            request_timeout: Seconds allowed for one API request
+            http2: Use HTTP/2 when the h2 package is installed
+        """
+        self.http2 = http2 and importlib.util.find_spec('h2') is not None
+        self._http_client = httpx.AsyncClient(
+            http2=self.http2,
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections,
+                                keepalive_expiry=keepalive_expiry),
+            timeout=request_timeout
+        )
+        # Retries are handled by execute_with_retry, not inside the SDK
+        self.openai = AsyncOpenAI(base_url=api_url, api_key=api_key,
+                                  http_client=self._http_client, max_retries=0)
+        self.instructor = instructor.from_openai(self.openai)
+
+    async def close(self) -> None:
+        """Close the pooled HTTP connections."""
+        await self.openai.close()
+
+
+# Process-wide client, created on first use by get_llm_client()
+_llm_client: Optional[LLMClient] = None
+
+
+def get_llm_client() -> LLMClient:
+    """Get the shared LLM client, creating it on first use"""
+    global _llm_client
+    if _llm_client is None:
+        llm_config = get_llm_config()
+
+        # Check if API key is available
+        if not llm_config.api_key:
+            raise ValueError("LLM_API_KEY not found in environment variables")
+
+        _llm_client = LLMClient(
+            api_url=llm_config.api_url,
+            api_key=llm_config.api_key,
+            max_connections=llm_config.max_connections,
+            keepalive_expiry=llm_config.keepalive_expiry,
+            request_timeout=llm_config.request_timeout,
+            http2=llm_config.http2
+        )
+        logging.info(f"LLM client created (http2={_llm_client.http2}, max_connections={llm_config.max_connections})")
+    return _llm_client
+
+
+async def close_llm_client() -> None:
+    """Close the shared LLM client if it was created"""
+    global _llm_client
+    if _llm_client is None:
+        return
+    client, _llm_client = _llm_client, None
+    await client.close()
 
 
 async def execute_with_retry(func, max_retries: int = 5, base_delay: int = 3):
@@ -144,6 +193,9 @@ async def execute_with_retry(func, max_retries: int = 5, base_delay: int = 3):
     for attempt in range(max_retries):
         try:
             return await func()
+        except CircuitOpenError:
+            # The breaker decides when to probe again, retrying here would only spin
+            raise
         except Exception as e:
             # Check if it's a rate limit error (429)
             if hasattr(e, 'status_code') and e.status_code == 429:
@@ -166,45 +218,3 @@ async def execute_with_retry(func, max_retries: int = 5, base_delay: int = 3):
                 else:
                     logging.error(f"Failed after {max_retries} attempts: {e}")
                     raise
-
-
-def execute_with_retry_sync(func, max_retries: int = 5, base_delay: int = 3):
-    """
-    Execute a synchronous function with retry logic for handling transient errors.
-    
-    Args:
-        func: Synchronous function to execute
-        max_retries: Maximum number of retry attempts
-        base_delay: Base delay in seconds for exponential backoff
-    
-    Returns:
-        Result of the executed function
-    
-    Raises:
-        Exception: If all retry attempts fail
-    """
-    for attempt in range(max_retries):
-        try:
-            return func()
-        except Exception as e:
-            # Check if it's a rate limit error (429)
-            if hasattr(e, 'status_code') and e.status_code == 429:
-                if attempt < max_retries - 1:  # Don't wait on the last attempt
-                    # Wait a random amount of time between base_delay and base_delay * 2^attempt
-                    wait_time = random.uniform(base_delay, base_delay * (2 ** attempt))
-                    logging.info(f"Rate limited. Waiting {wait_time:.2f} seconds before retry...")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    logging.error(f"Rate limit exceeded after {max_retries} attempts")
-                    raise
-            else:
-                if attempt < max_retries - 1:  # Don't wait on the last attempt
-                    # Wait before retrying for other types of errors
-                    wait_time = random.uniform(base_delay, base_delay * (2 ** attempt))
-                    logging.info(f"Waiting {wait_time:.2f} seconds before retry...")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    logging.error(f"Failed after {max_retries} attempts: {e}")
-                    raise
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""
+Shared cache helpers for Parla Italiano Bot.
+
+This module provides a small TTL cache whose refresh is single-flight: when the
+value expires, the first caller starts one load and every concurrent caller
+awaits that same load instead of running its own query.
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+
+class SingleFlightCache:
+    """
+    Process-level value with a TTL and one refresh in flight at a time.
+    """
+
+    def __init__(self, loader: Callable[[], Awaitable[Any]], ttl: float):
+        """
+        Initialize an empty cache.
+
+        Args:
+            loader: Coroutine function computing a fresh value
+            ttl: Seconds a loaded value is served before it is refreshed
+        """
+        self.loader = loader
+        self.ttl = ttl
+        self._value: Any = None
+        self._loaded_at: Optional[float] = None
+        self._refresh: Optional[asyncio.Task] = None
+
+    async def get(self) -> Any:
+        """
+        Get the cached value, loading it if it is missing or expired.
+
+        Returns:
+            Value returned by the loader
+        """
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return self._value
+        if self._refresh is None:
+            self._refresh = asyncio.create_task(self._load())
+        # Shielded so that one cancelled caller does not cancel the load shared by the others
+        return await asyncio.shield(self._refresh)
+
+    def invalidate(self) -> None:
+        """Force the next get() to load a fresh value."""
+        self._loaded_at = None
+
+    def close(self) -> None:
+        """Cancel an in-flight load."""
+        if self._refresh is not None and not self._refresh.done():
+            self._refresh.cancel()
+        self._refresh = None
+
+    async def _load(self) -> Any:
+        """Run the loader once and store its result."""
+        try:
+            value = await self.loader()
+            self._value = value
+            self._loaded_at = time.monotonic()
+            return value
+        finally:
+            self._refresh = None
@@ -5,10 +5,15 @@ This module handles database connections, migrations, and basic database operati
 """
 
 import asyncpg
+import logging
 import sys
 import os
+from contextlib import asynccontextmanager
+from typing import Optional
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from .cache import SingleFlightCache
+
 # Mock config for testing if config.ini doesn't exist
 class MockDatabaseConfig:
     host = "localhost"
@@ -16,6 +21,11 @@ class MockDatabaseConfig:
     name = "parla_italiano"
     user = "parla_user"
     password = ""
+    pool_min_size = 1
+    pool_max_size = 5
+    pool_acquire_timeout = 10.0
+    pool_max_inactive_lifetime = 300.0
+    timezone = "UTC"
 
 def get_database_config():
     """Get database configuration, with fallback for testing"""
@@ -27,119 +37,177 @@ def get_database_config():
         return MockDatabaseConfig()
 
 
-async def get_schema_migrations():
-    """Get all schema migrations for logging"""
+# Process-wide connection pool, created by init_pool() on application startup
+_pool: Optional[asyncpg.Pool] = None
+
+
+def _server_settings(db_config) -> dict:
+    """Session settings for every connection; TimeZone fixes where CURRENT_DATE and ::date put midnight"""
+    return {'TimeZone': db_config.timezone}
+
+
+async def init_pool() -> asyncpg.Pool:
+    """Create the shared connection pool used by all database helpers"""
+    global _pool
+    if _pool is not None:
+        return _pool
     db_config = get_database_config()
-    conn = await asyncpg.connect(
+    _pool = await asyncpg.create_pool(
         host=db_config.host, port=db_config.port, database=db_config.name,
-        user=db_config.user, password=db_config.password
+        user=db_config.user, password=db_config.password,
+        min_size=db_config.pool_min_size,
+        max_size=db_config.pool_max_size,
+        max_inactive_connection_lifetime=db_config.pool_max_inactive_lifetime,
+        server_settings=_server_settings(db_config)
     )
-    try:
-        rows = await conn.fetch("SELECT version, applied_at FROM schema_migrations ORDER BY applied_at")
-        return [f"{row['version']} applied at {row['applied_at']}" for row in rows]
-    finally:
-        await conn.close()
+    logging.info(f"Database pool created (min_size={db_config.pool_min_size}, max_size={db_config.pool_max_size})")
+    return _pool
 
 
-async def get_stats_data(user_id: int):
-    """Get comprehensive statistics for /stats command"""
+async def close_pool() -> None:
+    """Close the shared connection pool, waiting for acquired connections to be released"""
+    global _pool
+    if _pool is None:
+        return
+    pool, _pool = _pool, None
+    await pool.close()
+    logging.info("Database pool closed")
+
+
+def get_pool() -> Optional[asyncpg.Pool]:
+    """Get the shared connection pool, or None if it has not been created"""
+    return _pool
+
+
+async def open_connection() -> asyncpg.Connection:
+    """Open a dedicated connection outside the pool (e.g. for LISTEN); the caller must close it"""
     db_config = get_database_config()
-    conn = await asyncpg.connect(
+    return await asyncpg.connect(
         host=db_config.host, port=db_config.port, database=db_config.name,
-        user=db_config.user, password=db_config.password
+        user=db_config.user, password=db_config.password,
+        server_settings=_server_settings(db_config)
     )
+
+
+@asynccontextmanager
+async def acquire_connection():
+    """
+    Acquire a database connection.
+
+    Uses the shared pool when it has been initialized, otherwise opens a
+    dedicated connection that is closed on exit (tests, one-off scripts).
+    """
+    if _pool is not None:
+        async with _pool.acquire(timeout=get_database_config().pool_acquire_timeout) as conn:
+            yield conn
+        return
+    conn = await open_connection()
     try:
-        # Get total users
-        users_row = await conn.fetchrow("SELECT COUNT(*) as count FROM users")
-        total_users = users_row['count']
-        
-        # Get total sentences
-        sentences_row = await conn.fetchrow("SELECT COUNT(*) as count FROM italian_sentences")
-        total_sentences = sentences_row['count']
-        
-        # Get total attempts (results)
-        attempts_row = await conn.fetchrow("SELECT COUNT(*) as count FROM italian_sentences_results")
-        total_attempts = attempts_row['count']
-        
-        # Get global success rate
-        global_success_row = await conn.fetchrow("""
-            SELECT
-                COUNT(*) as total,
-                SUM(CASE WHEN is_success = true THEN 1 ELSE 0 END) as successes
-            FROM italian_sentences_results
-        """)
-        global_success_rate = 0.0
-        if global_success_row and global_success_row['total'] > 0:
-            global_success_rate = (global_success_row['successes'] / global_success_row['total']) * 100
-        
-        # Get user's success rate
-        user_success_row = await conn.fetchrow("""
+        yield conn
+    finally:
+        await conn.close()
+
+
+async def get_schema_migrations():
+    """Get all schema migrations for logging"""
+    async with acquire_connection() as conn:
+        rows = await conn.fetch("SELECT version, applied_at FROM schema_migrations ORDER BY applied_at")
+        return [f"{row['version']} applied at {row['applied_at']}" for row in rows]
+
+
+def _success_rate(successes: int, total: int) -> float:
+    """Percentage of successful attempts, 0.0 when there are none"""
+    return (successes / total) * 100 if total else 0.0
+
+
+async def _fetch_global_stats(conn) -> dict:
+    """Compute the part of /stats that is the same for every user"""
+    row = await conn.fetchrow("""
+        SELECT
+            (SELECT COUNT(*) FROM users) AS total_users,
+            (SELECT COUNT(*) FROM italian_sentences) AS total_sentences,
+            COALESCE(SUM(attempts), 0)::bigint AS total_attempts,
+            COALESCE(SUM(successes), 0)::bigint AS total_successes,
+            COALESCE(SUM(attempts) FILTER (WHERE day = CURRENT_DATE), 0)::bigint AS today_global_attempts,
+            COALESCE(SUM(successes) FILTER (WHERE day = CURRENT_DATE), 0)::bigint AS today_global_successes
+        FROM daily_stats
+        WHERE user_id = 0
+    """)
+    return {
+        'total_users': row['total_users'],
+        'total_sentences': row['total_sentences'],
+        'total_attempts': row['total_attempts'],
+        'global_success_rate': _success_rate(row['total_successes'], row['total_attempts']),
+        'today_global_attempts': row['today_global_attempts'],
+        'today_global_success_rate': _success_rate(row['today_global_successes'], row['today_global_attempts'])
+    }
+
+
+async def _load_global_stats() -> dict:
+    """Loader for the shared global stats cache"""
+    async with acquire_connection() as conn:
+        return await _fetch_global_stats(conn)
+
+
+# Process-wide cache of the global /stats section, created by start_global_stats_cache()
+_global_stats_cache: Optional[SingleFlightCache] = None
+
+
+def start_global_stats_cache(ttl: float = 30.0) -> SingleFlightCache:
+    """Create the shared cache so concurrent /stats calls share one global computation"""
+    global _global_stats_cache
+    if _global_stats_cache is None:
+        _global_stats_cache = SingleFlightCache(_load_global_stats, ttl)
+        logging.info(f"Global stats cache started (ttl={ttl}s)")
+    return _global_stats_cache
+
+
+def stop_global_stats_cache() -> None:
+    """Drop the shared global stats cache"""
+    global _global_stats_cache
+    if _global_stats_cache is None:
+        return
+    cache, _global_stats_cache = _global_stats_cache, None
+    cache.close()
+
+
+def get_global_stats_cache() -> Optional[SingleFlightCache]:
+    """Get the shared global stats cache, or None if it has not been started"""
+    return _global_stats_cache
+
+
+async def get_stats_data(user_id: int):
+    """Get comprehensive statistics for /stats command: global numbers from the shared cache when it is running, personal numbers from user_progress"""
+    global_stats = await _global_stats_cache.get() if _global_stats_cache is not None else None
+    async with acquire_connection() as conn:
+        if global_stats is None:
+            global_stats = await _fetch_global_stats(conn)
+        row = await conn.fetchrow("""
             SELECT
-                COUNT(*) as total,
-                SUM(CASE WHEN is_success = true THEN 1 ELSE 0 END) as successes
-            FROM italian_sentences_results
+                COALESCE(SUM(attempts), 0)::bigint AS user_attempts,
+                COALESCE(SUM(successes), 0)::bigint AS user_successes,
+                COALESCE(SUM(today_attempts) FILTER (WHERE today = CURRENT_DATE), 0)::bigint AS today_user_attempts,
+                COALESCE(SUM(today_successes) FILTER (WHERE today = CURRENT_DATE), 0)::bigint AS today_user_successes
+            FROM user_progress
             WHERE user_id = $1
         """, user_id)
-        user_success_rate = 0.0
-        if user_success_row and user_success_row['total'] > 0:
-            user_success_rate = (user_success_row['successes'] / user_success_row['total']) * 100
-        
-        # Get today's global stats
-        today_global_row = await conn.fetchrow("""
-            SELECT
-                COUNT(*) as total,
-                SUM(CASE WHEN is_success = true THEN 1 ELSE 0 END) as successes
-            FROM italian_sentences_results
-            WHERE DATE(timestamp) = CURRENT_DATE
-        """)
-        today_global_attempts = today_global_row['total'] if today_global_row else 0
-        today_global_success_rate = 0.0
-        if today_global_row and today_global_attempts > 0:
-            today_global_success_rate = (today_global_row['successes'] / today_global_attempts) * 100
-        
-        # Get today's user stats
-        today_user_row = await conn.fetchrow("""
-            SELECT
-                COUNT(*) as total,
-                SUM(CASE WHEN is_success = true THEN 1 ELSE 0 END) as successes
-            FROM italian_sentences_results
-            WHERE user_id = $1 AND DATE(timestamp) = CURRENT_DATE
-        """, user_id)
-        today_user_attempts = today_user_row['total'] if today_user_row else 0
-        today_user_success_rate = 0.0
-        if today_user_row and today_user_attempts > 0:
-            today_user_success_rate = (today_user_row['successes'] / today_user_attempts) * 100
         
         return {
-            'total_users': total_users,
-            'total_sentences': total_sentences,
-            'total_attempts': total_attempts,
-            'global_success_rate': global_success_rate,
-            'user_success_rate': user_success_rate,
-            'today_global_attempts': today_global_attempts,
-            'today_global_success_rate': today_global_success_rate,
-            'today_user_attempts': today_user_attempts,
-            'today_user_success_rate': today_user_success_rate
+            **global_stats,
+            'user_success_rate': _success_rate(row['user_successes'], row['user_attempts']),
+            'today_user_attempts': row['today_user_attempts'],
+            'today_user_success_rate': _success_rate(row['today_user_successes'], row['today_user_attempts'])
         }
-    finally:
-        await conn.close()
 
 
 async def get_last_attempted_sentence(user_id: int):
-    """Get the last attempted Italian sentence and its Russian translation for a user"""
-    db_config = get_database_config()
-    conn = await asyncpg.connect(
-        host=db_config.host, port=db_config.port, database=db_config.name,
-        user=db_config.user, password=db_config.password
-    )
-    try:
+    """Get the last attempted Italian sentence (any exercise) and its Russian translation for a user"""
+    async with acquire_connection() as conn:
         row = await conn.fetchrow("""
             SELECT s.sentence, s.sentence_rus
-            FROM italian_sentences_results r
-            JOIN italian_sentences s ON r.italian_sentence_id = s.id
-            WHERE r.user_id = $1
-            ORDER BY r.timestamp DESC
-            LIMIT 1
+            FROM user_last_attempt l
+            JOIN italian_sentences s ON l.italian_sentence_id = s.id
+            WHERE l.user_id = $1
         """, user_id)
         
         if row:
@@ -148,23 +216,65 @@ async def get_last_attempted_sentence(user_id: int):
                 'russian': row['sentence_rus'] or ''
             }
         return None
-    finally:
-        await conn.close()
+
+
+async def get_sentence_translation(sentence_id: int):
+    """Get an Italian sentence and its Russian translation by ID"""
+    async with acquire_connection() as conn:
+        row = await conn.fetchrow("SELECT sentence, sentence_rus FROM italian_sentences WHERE id = $1", sentence_id)
+        
+        if row:
+            return {
+                'italian': row['sentence'],
+                'russian': row['sentence_rus'] or ''
+            }
+        return None
+
+
+# Tables whose sizes are logged at startup
+DIAGNOSTIC_TABLES = [
+    'italian_sentences', 'encouraging_phrases', 'error_phrases', 'users',
+    'italian_sentences_results', 'missing_word_results'
+]
+
+
+async def get_startup_diagnostics(exact_counts: bool = False):
+    """Get applied migrations and table sizes over one connection; sizes are pg_class estimates unless exact_counts is set"""
+    async with acquire_connection() as conn:
+        rows = await conn.fetch("SELECT version, applied_at FROM schema_migrations ORDER BY applied_at")
+        migrations = [f"{row['version']} applied at {row['applied_at']}" for row in rows]
+        
+        counts = {}
+        if exact_counts:
+            for table in DIAGNOSTIC_TABLES:
+                counts[table] = await conn.fetchval(f"SELECT COUNT(*) FROM {table}")
+        else:
+            # Partitioned tables have no rows of their own, their estimate is the sum over partitions
+            rows = await conn.fetch("""
+                SELECT p.relname,
+                       CASE WHEN bool_and(c.reltuples < 0) THEN -1
+                            ELSE SUM(GREATEST(c.reltuples, 0)) END::bigint AS estimate
+                FROM pg_class p
+                LEFT JOIN pg_inherits i ON i.inhparent = p.oid
+                JOIN pg_class c ON c.oid = COALESCE(i.inhrelid, p.oid)
+                WHERE p.oid = ANY($1::text[]::regclass[])
+                GROUP BY p.relname
+            """, DIAGNOSTIC_TABLES)
+            # reltuples is -1 for tables that were never vacuumed or analyzed
+            estimates = {row['relname']: row['estimate'] for row in rows}
+            for table in DIAGNOSTIC_TABLES:
+                estimate = estimates.get(table)
+                counts[table] = estimate if estimate is not None and estimate >= 0 else None
+        
+        return {'migrations': migrations, 'table_counts': counts}
 
 
 async def get_table_counts():
     """Get row counts for all content tables"""
-    db_config = get_database_config()
-    conn = await asyncpg.connect(
-        host=db_config.host, port=db_config.port, database=db_config.name,
-        user=db_config.user, password=db_config.password
-    )
-    try:
+    async with acquire_connection() as conn:
         counts = {}
         tables = ['italian_sentences', 'encouraging_phrases', 'error_phrases', 'users', 'italian_sentences_results']
         for table in tables:
             row = await conn.fetchrow(f"SELECT COUNT(*) as count FROM {table}")
             counts[table] = row['count']
         return counts
-    finally:
-        await conn.close()
\ No newline at end of file
@@ -0,0 +1,80 @@
+"""
+Daily statistics rollup module for Parla Italiano Bot.
+
+This module keeps the daily_stats table (see migrations/009_daily_stats.sql) in
+step with result writes. Every write adds its attempts and successes to the
+all-users row of its day and exercise type, stored under user_id 0, so /stats
+reads a handful of rows per day instead of scanning every result. Per-user
+numbers come from user_progress and the results tables, so no per-user rows
+are written.
+"""
+
+import sys
+import os
+from typing import Iterable, Tuple
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# user_id under which the totals over all users are stored
+GLOBAL_STATS_USER_ID = 0
+
+# Exercise type recorded in daily_stats for each results table
+EXERCISE_TYPES = {
+    'italian_sentences_results': 'sentence_ordering',
+    'missing_word_results': 'missing_word',
+}
+
+# Rows are locked in day order so concurrent writers cannot deadlock
+_UPSERT_TEMPLATE = """
+    INSERT INTO daily_stats (day, exercise_type, user_id, attempts, successes)
+    SELECT v.timestamp::date, {exercise_type}, {global_user_id}::bigint, COUNT(*), COUNT(*) FILTER (WHERE v.is_success)
+    FROM {source}
+    GROUP BY 1
+    ORDER BY 1
+    ON CONFLICT (day, exercise_type, user_id) DO UPDATE SET
+        attempts = daily_stats.attempts + EXCLUDED.attempts,
+        successes = daily_stats.successes + EXCLUDED.successes
+"""
+
+
+def daily_stats_upsert(source: str, exercise_type: str) -> str:
+    """
+    Build the rollup upsert for rows selected from `source`.
+
+    Args:
+        source: Relation aliased as v with user_id, is_success and timestamp columns
+        exercise_type: SQL expression for the exercise type
+
+    Returns:
+        SQL statement adding the source rows to daily_stats
+    """
+    return _UPSERT_TEMPLATE.format(source=source, exercise_type=exercise_type,
+                                   global_user_id=GLOBAL_STATS_USER_ID)
+
+
+_BATCH_UPSERT = daily_stats_upsert(
+    "unnest($2::bigint[], $3::boolean[], $4::timestamptz[]) AS v(user_id, is_success, timestamp)",
+    "$1::text"
+)
+
+
+async def update_daily_stats(conn, table: str, records: Iterable[Tuple[int, int, bool, datetime]]) -> None:
+    """
+    Add a batch of result rows to the rollup.
+
+    Args:
+        conn: Connection, normally inside the transaction that wrote the results
+        table: Results table the rows were written to
+        records: (user_id, sentence_id, is_success, timestamp) tuples
+    """
+    records = list(records)
+    if not records:
+        return
+    await conn.execute(
+        _BATCH_UPSERT,
+        EXERCISE_TYPES[table],
+        [record[0] for record in records],
+        [record[2] for record in records],
+        [record[3] for record in records]
+    )
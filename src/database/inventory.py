@@ -0,0 +1,227 @@
+"""
+Sentence inventory worker for Parla Italiano Bot.
+
+Replenishment triggered by users starts only when someone is already running
+out of unsolved sentences. This module runs a background worker that watches
+demand instead: the headroom of the most advanced active user (corpus size
+minus their solved count) and how fast that user solves sentences. When the
+headroom falls below a safety stock plus the sentences expected to be solved
+while a generation is running, the worker requests batches ahead of time
+through the replenishment coordinator. Its last observations are kept in
+state() and logged after every check for monitoring.
+"""
+
+import asyncio
+import logging
+import math
+import time
+import sys
+import os
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from .connection import acquire_connection
+from .replenishment import get_replenishment_coordinator
+from .sentences import get_corpus_size, request_replenishment
+
+# User id the worker's generations are logged under (no real user asked for them)
+INVENTORY_USER_ID = 0
+
+
+async def get_sentence_demand(conn, active_window_hours: float) -> Dict[str, int]:
+    """
+    Get the solved count of the most advanced recently active user.
+
+    Args:
+        conn: Database connection
+        active_window_hours: Users who attempted an exercise within this many hours are active
+
+    Returns:
+        Dictionary with active_users and max_solved
+    """
+    row = await conn.fetchrow("""
+        SELECT COUNT(*) AS active_users, COALESCE(MAX(p.solved_count), 0) AS max_solved
+        FROM user_last_attempt l
+        JOIN user_progress p ON p.user_id = l.user_id AND p.exercise_type = 'sentence_ordering'
+        WHERE l.attempted_at >= NOW() - make_interval(secs => $1)
+    """, active_window_hours * 3600)
+    return {'active_users': row['active_users'], 'max_solved': row['max_solved']}
+
+
+class InventoryWorker:
+    """
+    Background job keeping unsolved-sentence headroom above a safety stock.
+    """
+
+    def __init__(self, interval: float = 300.0, safety_stock: int = 100,
+                 active_window_hours: float = 24.0, sentences_per_batch: int = 30,
+                 max_batches: int = 3):
+        """
+        Initialize the worker.
+
+        Args:
+            interval: Seconds between demand checks
+            safety_stock: Unsolved sentences to keep ahead of the most advanced active user
+            active_window_hours: Hours since the last attempt within which a user counts as active
+            sentences_per_batch: Expected number of new sentences per generation
+            max_batches: Maximum number of generations requested per check
+        """
+        self.interval = interval
+        self.safety_stock = safety_stock
+        self.active_window_hours = active_window_hours
+        self.sentences_per_batch = sentences_per_batch
+        self.max_batches = max_batches
+        self._task: Optional[asyncio.Task] = None
+        # (monotonic time, max_solved) samples within the active window, for the solve rate
+        self._samples: Deque[Tuple[float, int]] = deque()
+        # Seconds one generation took in the last run, an estimate of replenishment lead time
+        self._lead_time = 60.0
+        self._state: Dict[str, Any] = {
+            'corpus_size': None,
+            'active_users': None,
+            'max_solved': None,
+            'headroom': None,
+            'solve_rate_per_hour': 0.0,
+            'target_headroom': safety_stock,
+            'lead_time_seconds': self._lead_time,
+            'batches_requested': 0,
+            'last_check_at': None,
+            'last_error': None,
+        }
+
+    def start(self) -> None:
+        """Start the background checking task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background checking task."""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def state(self) -> Dict[str, Any]:
+        """
+        Get the worker's latest observations.
+
+        Returns:
+            Dictionary with corpus size, demand, headroom, target and generation counters
+        """
+        return dict(self._state, running=self._task is not None and not self._task.done())
+
+    async def check(self) -> int:
+        """
+        Measure demand once and request generations if headroom is below target.
+
+        Returns:
+            Number of generations requested
+        """
+        async with acquire_connection() as conn:
+            # Counted on every check: other processes may have added sentences since the cached count
+            corpus_size = await get_corpus_size(conn, max_age=0)
+            demand = await get_sentence_demand(conn, self.active_window_hours)
+
+        solve_rate = self._record_sample(demand['max_solved'])
+        headroom = corpus_size - demand['max_solved']
+        target = self.safety_stock + math.ceil(solve_rate * self._lead_time / 3600)
+        batches = 0
+        if demand['active_users'] and headroom < target:
+            batches = min(self.max_batches, math.ceil((target - headroom) / self.sentences_per_batch))
+
+        self._state.update(
+            corpus_size=corpus_size,
+            active_users=demand['active_users'],
+            max_solved=demand['max_solved'],
+            headroom=headroom,
+            solve_rate_per_hour=round(solve_rate, 2),
+            target_headroom=target,
+            last_check_at=datetime.now(timezone.utc),
+        )
+        logging.info(f"📦 Sentence inventory: corpus {corpus_size}, headroom {headroom}, target {target}, "
+                     f"{demand['active_users']} active users, {solve_rate:.1f} solves/hour, "
+                     f"lead time {self._lead_time:.1f}s, {self._state['batches_requested']} generations requested so far")
+        if batches:
+            logging.info(f"📦 Sentence headroom {headroom} below target {target}, requesting {batches} generations")
+            await self._generate(batches)
+        return batches
+
+    def _record_sample(self, max_solved: int) -> float:
+        """Store a max_solved sample and return the solve rate per hour over the active window."""
+        now = time.monotonic()
+        self._samples.append((now, max_solved))
+        while self._samples and now - self._samples[0][0] > self.active_window_hours * 3600:
+            self._samples.popleft()
+        first_at, first_solved = self._samples[0]
+        if now - first_at <= 0:
+            return 0.0
+        return max(0, max_solved - first_solved) * 3600 / (now - first_at)
+
+    async def _generate(self, batches: int) -> None:
+        """Request generations and wait for them, measuring their duration."""
+        started = time.monotonic()
+        coordinator = get_replenishment_coordinator()
+        if coordinator is None:
+            request_replenishment(INVENTORY_USER_ID)
+            self._state['batches_requested'] += 1
+            return
+        # The first batch joins a user-triggered generation if one is already running
+        tasks = {coordinator.request(INVENTORY_USER_ID, coalesce=i == 0) for i in range(batches)}
+        self._state['batches_requested'] += batches
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Batches beyond the coordinator's slots wait for each other; lead time is one batch
+        rounds = math.ceil(len(tasks) / coordinator.max_concurrent)
+        self._lead_time = (time.monotonic() - started) / rounds
+        self._state['lead_time_seconds'] = round(self._lead_time, 1)
+
+    async def _run(self) -> None:
+        """Check demand now and then every `interval` seconds."""
+        while True:
+            try:
+                await self.check()
+                self._state['last_error'] = None
+            except Exception as e:
+                self._state['last_error'] = str(e)
+                logging.error(f"Sentence inventory check failed: {e}")
+            await asyncio.sleep(self.interval)
+
+
+# Process-wide worker, created by start_inventory_worker() on application startup
+_inventory_worker: Optional[InventoryWorker] = None
+
+
+def start_inventory_worker(interval: float = 300.0, safety_stock: int = 100,
+                           active_window_hours: float = 24.0, sentences_per_batch: int = 30,
+                           max_batches: int = 3) -> InventoryWorker:
+    """Create and start the shared sentence inventory worker"""
+    global _inventory_worker
+    if _inventory_worker is None:
+        _inventory_worker = InventoryWorker(interval=interval, safety_stock=safety_stock,
+                                            active_window_hours=active_window_hours,
+                                            sentences_per_batch=sentences_per_batch,
+                                            max_batches=max_batches)
+        _inventory_worker.start()
+        logging.info(f"Sentence inventory worker started (interval={interval}s, safety_stock={safety_stock})")
+    return _inventory_worker
+
+
+async def stop_inventory_worker() -> None:
+    """Stop the shared sentence inventory worker"""
+    global _inventory_worker
+    if _inventory_worker is None:
+        return
+    worker, _inventory_worker = _inventory_worker, None
+    await worker.stop()
+    logging.info(f"Sentence inventory worker stopped ({worker.state()['batches_requested']} generations requested)")
+
+
+def get_inventory_worker() -> Optional[InventoryWorker]:
+    """Get the shared inventory worker, or None if it has not been started"""
+    return _inventory_worker
@@ -0,0 +1,298 @@
+"""
+LLM generation journal for Parla Italiano Bot.
+
+Every raw LLM response received by sentence_replenishment is appended to a
+local JSON lines file before it is parsed, with a SHA-256 checksum per entry.
+A failure after the API call (parsing, validation or the database) therefore
+no longer loses a paid generation: the journal can be replayed through the
+current validation rules and inserted again, e.g.
+
+    python -m src.database.journal replay --since 2026-01-01T00:00:00+00:00
+
+Entries are handed to a dedicated writer thread, which appends and fsyncs
+whatever has queued up in one go, so generations never wait for the disk on
+the event loop. The file is rotated by size like a logging handler
+(journal.jsonl.1, .2, ...), and replay reads the rotated files too.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Sentinel queued by close() to end the writer thread
+_STOP = object()
+
+
+def _checksum(entry: Dict[str, Any]) -> str:
+    """SHA-256 of an entry's canonical JSON, without its checksum field"""
+    body = {key: value for key, value in entry.items() if key != 'sha256'}
+    return hashlib.sha256(json.dumps(body, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class GenerationJournal:
+    """
+    Append-only, checksummed JSON lines file of raw LLM responses.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 50 * 1024 * 1024, backup_count: int = 5):
+        """
+        Initialize the journal.
+
+        Args:
+            path: Journal file, created with its directory on first write
+            max_bytes: Size at which the file is rotated, 0 never rotates
+            backup_count: Number of rotated files kept
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._queue: queue.Queue = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+
+    def append(self, kind: str, response: Any, user_id: Optional[int] = None,
+               model: Optional[str] = None) -> str:
+        """
+        Queue one raw response for the writer thread, which appends and fsyncs it.
+
+        Args:
+            kind: 'completion' for a chat completion object, 'text' for plain message content
+            response: JSON-serializable response
+            user_id: Telegram user ID the generation ran for
+            model: LLM model identifier
+
+        Returns:
+            ID of the new entry
+        """
+        entry = {
+            'id': uuid.uuid4().hex,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'user_id': user_id,
+            'model': model,
+            'kind': kind,
+            'response': response,
+        }
+        entry['sha256'] = _checksum(entry)
+        self._start_writer()
+        self._queue.put(entry)
+        return entry['id']
+
+    def flush(self) -> None:
+        """Block until every queued entry has been written and fsynced."""
+        self._queue.join()
+
+    def close(self, timeout: float = 10.0) -> None:
+        """
+        Write every queued entry and stop the writer thread.
+
+        Args:
+            timeout: Maximum seconds to wait for the writer
+        """
+        with self._writer_lock:
+            writer, self._writer = self._writer, None
+        if writer is None:
+            return
+        self._queue.put(_STOP)
+        writer.join(timeout)
+        if writer.is_alive():
+            logging.error(f"Generation journal writer did not finish within {timeout} seconds")
+
+    def _start_writer(self) -> None:
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name='generation-journal', daemon=True)
+                self._writer.start()
+
+    def _write_loop(self) -> None:
+        """Write queued entries in groups, one fsync per group, until the stop sentinel."""
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            entries = [entry for entry in batch if entry is not _STOP]
+            stopping = len(entries) < len(batch)
+            try:
+                if entries:
+                    self._write(entries)
+            except Exception as e:
+                logging.error(f"Failed to write {len(entries)} generation journal entries: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, entries: List[Dict[str, Any]]) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._rotate_if_needed()
+        with open(self.path, 'a', encoding='utf-8') as journal_file:
+            journal_file.write(''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in entries))
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+
+    def _rotate_if_needed(self) -> None:
+        """Shift journal.jsonl to journal.jsonl.1 (and older files up by one) once it reaches max_bytes."""
+        if self.max_bytes <= 0:
+            return
+        try:
+            if os.path.getsize(self.path) < self.max_bytes:
+                return
+        except FileNotFoundError:
+            return
+        if self.backup_count <= 0:
+            os.remove(self.path)
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def files(self) -> List[str]:
+        """Existing journal files, oldest first."""
+        paths = [f"{self.path}.{index}" for index in range(self.backup_count, 0, -1)] + [self.path]
+        return [path for path in paths if os.path.exists(path)]
+
+    def entries(self, since: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Read valid entries in write order, rotated files first, skipping corrupt or truncated lines.
+
+        Args:
+            since: Only entries created at or after this time
+
+        Yields:
+            Journal entries
+        """
+        for path in self.files():
+            with open(path, encoding='utf-8') as journal_file:
+                for line_number, line in enumerate(journal_file, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        logging.warning(f"Skipping unreadable journal line {path}:{line_number}")
+                        continue
+                    if entry.get('sha256') != _checksum(entry):
+                        logging.warning(f"Skipping journal line {path}:{line_number}: checksum mismatch")
+                        continue
+                    if since is not None and datetime.fromisoformat(entry['created_at']) < since:
+                        continue
+                    yield entry
+
+
+# Process-wide journal, opened by open_generation_journal() on application startup
+_journal: Optional[GenerationJournal] = None
+
+
+def open_generation_journal(path: str, max_bytes: int = 50 * 1024 * 1024,
+                            backup_count: int = 5) -> GenerationJournal:
+    """Open the shared journal that sentence_replenishment writes raw responses to"""
+    global _journal
+    if _journal is None:
+        _journal = GenerationJournal(path, max_bytes=max_bytes, backup_count=backup_count)
+        logging.info(f"LLM generation journal: {path}")
+    return _journal
+
+
+def close_generation_journal() -> None:
+    """Write the queued entries and stop journaling LLM responses"""
+    global _journal
+    journal, _journal = _journal, None
+    if journal is not None:
+        journal.close()
+
+
+def get_generation_journal() -> Optional[GenerationJournal]:
+    """Get the shared journal, or None if journaling is disabled"""
+    return _journal
+
+
+async def replay_journal(journal: GenerationJournal, since: Optional[datetime] = None,
+                         dry_run: bool = False) -> Dict[str, int]:
+    """
+    Re-run parsing, validation and insertion for journaled responses.
+
+    Args:
+        journal: Journal to read
+        since: Only entries created at or after this time
+        dry_run: Validate without inserting
+
+    Returns:
+        Dictionary with entries, valid, inserted, duplicates and failed counts
+    """
+    # Imported here: sentences imports this module to write the journal
+    from .sentences import parse_journal_entry, validate_sentence_pairs, store_sentence_pairs, _notify_new_sentences
+
+    totals = {'entries': 0, 'valid': 0, 'inserted': 0, 'duplicates': 0, 'failed': 0}
+    for entry in journal.entries(since):
+        totals['entries'] += 1
+        try:
+            pairs = parse_journal_entry(entry)
+        except Exception as e:
+            totals['failed'] += 1
+            logging.warning(f"Journal entry {entry['id']} could not be parsed: {e}")
+            continue
+        valid_pairs = validate_sentence_pairs(pairs, entry.get('user_id'))
+        totals['valid'] += len(valid_pairs)
+        if dry_run or not valid_pairs:
+            continue
+        inserted, duplicates = await store_sentence_pairs(valid_pairs)
+        totals['inserted'] += inserted
+        totals['duplicates'] += duplicates
+    if totals['inserted']:
+        _notify_new_sentences()
+    return totals
+
+
+def _parse_since(value: str) -> datetime:
+    """ISO timestamp argument, UTC when no offset is given"""
+    since = datetime.fromisoformat(value)
+    return since if since.tzinfo else since.replace(tzinfo=timezone.utc)
+
+
+def _journal_config():
+    """[Journal] configuration, the same the bot writes the journal with"""
+    try:
+        from config import get_journal_config
+    except ImportError:
+        from src.config import get_journal_config
+    return get_journal_config()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="LLM generation journal tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    replay = subparsers.add_parser('replay', help="Validate and insert journaled sentences again")
+    replay.add_argument('--path', help="Journal file (defaults to [Journal] PATH)")
+    replay.add_argument('--since', type=_parse_since,
+                        help="Only entries created at or after this ISO timestamp")
+    replay.add_argument('--dry-run', action='store_true', help="Validate without inserting")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    journal_config = _journal_config()
+    # The bot's rotation settings, so replay reads every rotated file it kept
+    journal = GenerationJournal(args.path or journal_config.path, journal_config.max_bytes, journal_config.backup_count)
+    totals = await replay_journal(journal, since=args.since, dry_run=args.dry_run)
+    print(", ".join(f"{key}={value}" for key, value in totals.items()))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
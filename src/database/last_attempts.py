@@ -0,0 +1,70 @@
+"""
+Last attempted sentence module for Parla Italiano Bot.
+
+This module keeps the user_last_attempt table (see migrations/012_user_last_attempt.sql)
+in step with result writes, so the latest sentence a user attempted in any
+exercise is a primary-key lookup instead of a sort over the results tables.
+"""
+
+import sys
+import os
+from typing import Iterable, Tuple
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from .daily_stats import EXERCISE_TYPES
+
+# Out-of-order writes (e.g. a retried batch) never move the pointer backwards
+_UPSERT_TEMPLATE = """
+    INSERT INTO user_last_attempt (user_id, italian_sentence_id, exercise_type, attempted_at)
+    SELECT DISTINCT ON (v.user_id) v.user_id, v.italian_sentence_id, {exercise_type}, v.timestamp
+    FROM {source}
+    ORDER BY v.user_id, v.timestamp DESC
+    ON CONFLICT (user_id) DO UPDATE SET
+        italian_sentence_id = EXCLUDED.italian_sentence_id,
+        exercise_type = EXCLUDED.exercise_type,
+        attempted_at = EXCLUDED.attempted_at
+    WHERE user_last_attempt.attempted_at <= EXCLUDED.attempted_at
+"""
+
+
+def last_attempt_upsert(source: str, exercise_type: str) -> str:
+    """
+    Build the last-attempt upsert for rows selected from `source`.
+
+    Args:
+        source: Relation aliased as v with user_id, italian_sentence_id and timestamp columns
+        exercise_type: SQL expression for the exercise type
+
+    Returns:
+        SQL statement moving each user's pointer to their latest source row
+    """
+    return _UPSERT_TEMPLATE.format(source=source, exercise_type=exercise_type)
+
+
+_BATCH_UPSERT = last_attempt_upsert(
+    "unnest($2::bigint[], $3::int[], $4::timestamptz[]) AS v(user_id, italian_sentence_id, timestamp)",
+    "$1::text"
+)
+
+
+async def update_last_attempts(conn, table: str, records: Iterable[Tuple[int, int, bool, datetime]]) -> None:
+    """
+    Move the last-attempt pointers for a batch of result rows.
+
+    Args:
+        conn: Connection, normally inside the transaction that wrote the results
+        table: Results table the rows were written to
+        records: (user_id, sentence_id, is_success, timestamp) tuples
+    """
+    records = list(records)
+    if not records:
+        return
+    await conn.execute(
+        _BATCH_UPSERT,
+        EXERCISE_TYPES[table],
+        [record[0] for record in records],
+        [record[1] for record in records],
+        [record[3] for record in records]
+    )
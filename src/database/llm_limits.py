@@ -0,0 +1,296 @@
+"""
+LLM call limits for Parla Italiano Bot.
+
+Every LLM API call goes through one process-wide guard that combines token
+buckets for requests per minute and tokens per minute with a circuit breaker.
+Concurrent generations therefore share the provider quota instead of all
+sending requests at once, a 429 slows down every caller together, and after
+repeated failures calls are rejected immediately until a single probe call
+succeeds again.
+"""
+
+import asyncio
+import logging
+import time
+import sys
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the LLM API while the circuit breaker is open."""
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at a per-minute rate.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        """
+        Initialize a full bucket.
+
+        Args:
+            per_minute: Tokens added per minute
+            capacity: Maximum burst, defaults to one minute worth of tokens
+        """
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        # Waiters are served in arrival order
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        """Add the tokens accumulated since the last update."""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self) -> float:
+        """Get the number of tokens that can be taken right now."""
+        self._refill()
+        return self._tokens
+
+    async def acquire(self, amount: float) -> float:
+        """
+        Take tokens, waiting until enough have accumulated.
+
+        Args:
+            amount: Number of tokens, capped at the bucket capacity
+
+        Returns:
+            Seconds spent waiting
+        """
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+    def adjust(self, amount: float) -> None:
+        """
+        Give back (positive) or take (negative) tokens without waiting; the balance may go negative.
+
+        Args:
+            amount: Number of tokens
+        """
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens + amount)
+
+    def drain(self) -> None:
+        """Empty the bucket so that every caller waits for a refill."""
+        self._refill()
+        self._tokens = min(self._tokens, 0.0)
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker counting consecutive failures.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        """
+        Initialize a closed breaker.
+
+        Args:
+            failure_threshold: Consecutive failures that open the breaker
+            reset_timeout: Seconds the breaker stays open before letting one probe call through
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.times_opened = 0
+        self.rejected_calls = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def before_call(self) -> None:
+        """
+        Check whether a call may start.
+
+        Raises:
+            CircuitOpenError: If the breaker is open, or half-open with a probe already running
+        """
+        if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            logging.info("LLM circuit breaker half-open, probing the API")
+        if self.state == self.OPEN or (self.state == self.HALF_OPEN and self._probe_in_flight):
+            self.rejected_calls += 1
+            raise CircuitOpenError(f"LLM circuit breaker is {self.state} after {self.consecutive_failures} failures")
+        if self.state == self.HALF_OPEN:
+            self._probe_in_flight = True
+
+    def release_probe(self) -> None:
+        """Let another probe through after a call that ended without an outcome (e.g. cancelled)."""
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        """Close the breaker and reset the failure count."""
+        if self.state != self.CLOSED:
+            logging.info("LLM circuit breaker closed")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """Count a failure, opening the breaker at the threshold or when a probe fails."""
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+                logging.warning(f"LLM circuit breaker opened after {self.consecutive_failures} consecutive failures")
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+
+class LLMCallGuard:
+    """
+    Process-wide request/token rate limits and circuit breaker for LLM API calls.
+    """
+
+    def __init__(self, requests_per_minute: float = 20, tokens_per_minute: float = 100000,
+                 estimated_tokens: int = 3000, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        """
+        Initialize the limiter and the breaker.
+
+        Args:
+            requests_per_minute: Provider request quota
+            tokens_per_minute: Provider token quota
+            estimated_tokens: Tokens reserved per call until its actual usage is known
+            failure_threshold: Consecutive failures that open the breaker
+            reset_timeout: Seconds before an open breaker lets a probe through
+        """
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.estimated_tokens = estimated_tokens
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.calls = 0
+        self.rate_limited = 0
+        self.wait_seconds = 0.0
+
+    @asynccontextmanager
+    async def call(self, estimated_tokens: Optional[int] = None) -> AsyncIterator['LLMCallUsage']:
+        """
+        Wrap one LLM API call: check the breaker, wait for quota, then record the outcome.
+
+        Args:
+            estimated_tokens: Tokens reserved for the call, defaults to the configured estimate
+
+        Yields:
+            LLMCallUsage to report the call's actual token usage on
+        """
+        self.breaker.before_call()
+        usage = LLMCallUsage(estimated_tokens or self.estimated_tokens)
+        try:
+            self.wait_seconds += await self.requests.acquire(1)
+            self.wait_seconds += await self.tokens.acquire(usage.estimated)
+        except BaseException:
+            # Cancelled while waiting: neither a success nor a failure
+            self.breaker.release_probe()
+            raise
+        self.calls += 1
+        try:
+            yield usage
+        except Exception as e:
+            if getattr(e, 'status_code', None) == 429:
+                self.record_rate_limited(e)
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.release_probe()
+            raise
+        self.breaker.record_success()
+        if usage.actual is not None:
+            self.tokens.adjust(usage.estimated - usage.actual)
+
+    def record_rate_limited(self, error: Optional[BaseException] = None) -> None:
+        """Count a 429 and empty both buckets: the provider disagrees with them, so every caller waits for a refill. An error already reported (by a retry hook, then again when it leaves call()) is counted once."""
+        if error is not None:
+            if getattr(error, '_rate_limit_recorded', False):
+                return
+            try:
+                error._rate_limit_recorded = True
+            except AttributeError:
+                pass
+        self.rate_limited += 1
+        self.requests.drain()
+        self.tokens.drain()
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Get the limiter and breaker state.
+
+        Returns:
+            Dictionary of counters and current bucket levels
+        """
+        return {
+            'calls': self.calls,
+            'rate_limited': self.rate_limited,
+            'wait_seconds': round(self.wait_seconds, 2),
+            'requests_available': round(self.requests.available(), 2),
+            'tokens_available': round(self.tokens.available()),
+            'breaker_state': self.breaker.state,
+            'consecutive_failures': self.breaker.consecutive_failures,
+            'breaker_opened': self.breaker.times_opened,
+            'breaker_rejected': self.breaker.rejected_calls,
+        }
+
+
+class LLMCallUsage:
+    """
+    Token usage of one guarded call, reported by the caller once the response arrives.
+    """
+
+    def __init__(self, estimated: int):
+        self.estimated = estimated
+        self.actual: Optional[int] = None
+
+    def record(self, response: Any) -> None:
+        """Take the total token count from a chat completion's usage, if the provider reported it."""
+        usage = getattr(response, 'usage', None)
+        total_tokens = getattr(usage, 'total_tokens', None)
+        if isinstance(total_tokens, int):
+            self.actual = total_tokens
+
+
+# Process-wide guard, created on first use by get_llm_call_guard()
+_llm_call_guard: Optional[LLMCallGuard] = None
+
+
+def get_llm_call_guard() -> LLMCallGuard:
+    """Get the shared LLM call guard, creating it from the LLM configuration on first use"""
+    global _llm_call_guard
+    if _llm_call_guard is None:
+        from .base import get_llm_config
+        llm_config = get_llm_config()
+        _llm_call_guard = LLMCallGuard(
+            requests_per_minute=llm_config.requests_per_minute,
+            tokens_per_minute=llm_config.tokens_per_minute,
+            estimated_tokens=llm_config.estimated_tokens,
+            failure_threshold=llm_config.breaker_failure_threshold,
+            reset_timeout=llm_config.breaker_reset_timeout
+        )
+        logging.info(f"LLM call limits: {llm_config.requests_per_minute} requests/min, "
+                     f"{llm_config.tokens_per_minute} tokens/min")
+    return _llm_call_guard
+
+
+def get_llm_call_metrics() -> Optional[Dict[str, Any]]:
+    """Get the shared guard's metrics, or None if no LLM call was made yet"""
+    return _llm_call_guard.metrics() if _llm_call_guard is not None else None
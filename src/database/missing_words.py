@@ -0,0 +1,389 @@
+"""
+Missing-word data backfill for Parla Italiano Bot.
+
+Sentences stored before the missing word exercise existed (and sentences
+generated without its data) have an empty word_to_replace. This module asks
+the LLM for a target word and wrong alternatives for each of them, validates
+the answer and writes it back:
+
+    python -m src.database.missing_words backfill --concurrency 4
+
+Rows are read from italian_sentences in keyset-paginated batches (see
+migrations/015_missing_word_backfill.sql), a bounded number of LLM requests
+run at the same time through the shared call guard, and results are written
+in bulk UPDATE ... FROM unnest(...) statements. After every write the highest
+id below which every row has been handled is saved in backfill_checkpoints,
+so a crash or Ctrl-C loses at most the rows still in flight and the next run
+resumes from there. Rows whose generation failed do not hold the checkpoint
+back: their ids are saved next to it (migrations/018_backfill_failed_ids.sql)
+and retried in a separate pass before the next run continues. Updates only touch rows whose word_to_replace is still
+empty, and a Postgres advisory lock keeps two backfills from running at once,
+so the command is safe to run while the bot is live.
+"""
+
+import argparse
+import asyncio
+import logging
+import re
+import sys
+import os
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+import pydantic
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from .connection import acquire_connection, open_connection, init_pool, close_pool
+from .base import MissingWordResult, execute_with_retry, get_llm_client, get_llm_config, close_llm_client
+from .llm_limits import CircuitOpenError, get_llm_call_guard
+from .validation import SentenceValidator, get_sentence_validator
+
+CHECKPOINT_NAME = 'missing_words'
+
+# Arbitrary key of the session-level advisory lock held while a backfill runs
+BACKFILL_LOCK_KEY = 7_150_015
+
+# Suggestions the LLM is asked not to repeat, so alternatives vary across sentences
+RECENT_SUGGESTIONS = 200
+
+MISSING_WORD_PROMPT = """You are generating missing word exercise data for Italian sentences.
+Given the Italian sentence, select a single target word to replace and propose 2 to 5 alternative words.
+
+Rules:
+- The target word must be in Italian.
+- The target word must appear exactly once in the sentence.
+- The target word must be a single word (no spaces).
+- Provide 2 to 5 alternative words in Italian.
+- Alternatives must be unique, not present in the original sentence, and not equal to the target word.
+- An alternative word can be any part of speech: a noun, an adjective, a verb, and so on.
+- **Important validation**: If any of the alternative words are inserted into a sentence instead of the target word, the sentence MUST become grammatically incorrect, absurd, or illogical.
+- Avoid using any of these recent suggestions: {recent}
+- Output only valid JSON with keys: word_to_replace (string) and word_suggestions (array of strings).
+"""
+
+
+def normalize_word(word: str) -> str:
+    return word.strip().lower()
+
+
+def extract_words(sentence: str) -> List[str]:
+    """Lowercased words of a sentence, keeping elided articles attached (e.g. "l'acqua")"""
+    return re.findall(r"[A-Za-zÀ-ÖØ-öø-ÿ']+", sentence.lower())
+
+
+def _strip_elision(word: str) -> str:
+    parts = word.split("'", 1)
+    return parts[1] if len(parts) == 2 else ""
+
+
+def validate_missing_word_data(sentence: str, word_to_replace: str, suggestions: List[str],
+                               validator: Optional[SentenceValidator] = None) -> bool:
+    """Check that the target word occurs exactly once and the 2-5 alternatives are distinct Italian words absent from the sentence"""
+    validator = validator or get_sentence_validator()
+    sentence_words = extract_words(sentence)
+    target = normalize_word(word_to_replace)
+    stripped_words = [_strip_elision(word) for word in sentence_words]
+    target_matches = sum(1 for word, stripped in zip(sentence_words, stripped_words)
+                         if word == target or (stripped and stripped == target))
+    if not target or target_matches != 1:
+        return False
+    if not validator.is_italian_text(word_to_replace):
+        return False
+
+    if not 2 <= len(suggestions) <= 5:
+        return False
+    normalized_suggestions = [normalize_word(suggestion) for suggestion in suggestions]
+    if len(normalized_suggestions) != len(set(normalized_suggestions)) or target in normalized_suggestions:
+        return False
+    for suggestion in normalized_suggestions:
+        if not suggestion or not validator.is_italian_text(suggestion):
+            return False
+        if suggestion in sentence_words or suggestion in stripped_words:
+            return False
+    return True
+
+
+async def generate_missing_word_data(sentence: str, recent_suggestions: List[str],
+                                     model: Optional[str] = None) -> MissingWordResult:
+    """Ask the LLM for the target word and alternatives of one sentence"""
+    llm_config = get_llm_config()
+    client = get_llm_client()
+    async with get_llm_call_guard().call() as usage:
+        response = await client.openai.chat.completions.create(
+            model=model or llm_config.model_name,
+            messages=[
+                {"role": "system", "content": MISSING_WORD_PROMPT.format(recent=", ".join(recent_suggestions))},
+                {"role": "user", "content": f"Sentence: {sentence}"}
+            ]
+        )
+        usage.record(response)
+    content = (response.choices[0].message.content or '').strip()
+    # JSON possibly inside a Markdown code block
+    content = re.sub(r'^```(?:json)?\s*|\s*```$', '', content, flags=re.IGNORECASE)
+    return MissingWordResult.model_validate_json(content)
+
+
+async def fetch_sentences_missing_words(after_id: int, limit: int) -> List[Tuple[int, str]]:
+    """Next keyset page of sentences without missing-word data"""
+    async with acquire_connection() as conn:
+        rows = await conn.fetch("""
+            SELECT id, sentence FROM italian_sentences
+            WHERE word_to_replace = '' AND id > $1
+            ORDER BY id
+            LIMIT $2
+        """, after_id, limit)
+    return [(row['id'], row['sentence']) for row in rows]
+
+
+async def fetch_sentences_by_ids(ids: List[int]) -> List[Tuple[int, str]]:
+    """Sentences with the given ids that still lack missing-word data"""
+    async with acquire_connection() as conn:
+        rows = await conn.fetch("""
+            SELECT id, sentence FROM italian_sentences
+            WHERE id = ANY($1::int[]) AND word_to_replace = ''
+            ORDER BY id
+        """, ids)
+    return [(row['id'], row['sentence']) for row in rows]
+
+
+async def store_missing_words(results: List[Tuple[int, str, str]]) -> int:
+    """Write (id, word_to_replace, word_suggestions) rows in one statement, leaving rows that got data meanwhile untouched. Returns the number of updated rows."""
+    if not results:
+        return 0
+    async with acquire_connection() as conn:
+        status = await conn.execute("""
+            UPDATE italian_sentences AS s
+            SET word_to_replace = v.word_to_replace, word_suggestions = v.word_suggestions
+            FROM unnest($1::int[], $2::text[], $3::text[]) AS v(id, word_to_replace, word_suggestions)
+            WHERE s.id = v.id AND s.word_to_replace = ''
+        """, [row[0] for row in results], [row[1] for row in results], [row[2] for row in results])
+    # Status is "UPDATE <count>"
+    return int(status.split()[-1])
+
+
+async def load_checkpoint(name: str) -> Tuple[int, List[int]]:
+    """Last id a backfill has processed (0 if it never ran) and the ids at or before it that failed"""
+    async with acquire_connection() as conn:
+        row = await conn.fetchrow("SELECT last_id, failed_ids FROM backfill_checkpoints WHERE name = $1", name)
+    if row is None:
+        return 0, []
+    return row['last_id'], list(row['failed_ids'])
+
+
+async def save_checkpoint(name: str, last_id: int, failed_ids: List[int]) -> None:
+    async with acquire_connection() as conn:
+        await conn.execute("""
+            INSERT INTO backfill_checkpoints (name, last_id, failed_ids, updated_at) VALUES ($1, $2, $3, NOW())
+            ON CONFLICT (name) DO UPDATE SET
+                last_id = EXCLUDED.last_id, failed_ids = EXCLUDED.failed_ids, updated_at = EXCLUDED.updated_at
+        """, name, last_id, failed_ids)
+
+
+class MissingWordBackfill:
+    """
+    Resumable, concurrent backfill of word_to_replace/word_suggestions.
+    """
+
+    def __init__(self, concurrency: int = 4, page_size: int = 100, flush_size: int = 25,
+                 limit: Optional[int] = None, model: Optional[str] = None, dry_run: bool = False,
+                 checkpoint_name: str = CHECKPOINT_NAME):
+        """
+        Initialize the backfill.
+
+        Args:
+            concurrency: LLM requests in flight at the same time
+            page_size: Rows read per keyset page
+            flush_size: Valid results collected before a bulk update
+            limit: Maximum number of rows to process in this run
+            model: LLM model identifier, defaults to the configured model
+            dry_run: Generate and validate without writing results or checkpoints
+            checkpoint_name: Row in backfill_checkpoints holding this backfill's progress
+        """
+        self.concurrency = concurrency
+        self.page_size = page_size
+        self.flush_size = flush_size
+        self.limit = limit
+        self.model = model
+        self.dry_run = dry_run
+        self.checkpoint_name = checkpoint_name
+        self.totals = {'processed': 0, 'valid': 0, 'invalid': 0, 'failed': 0, 'updated': 0}
+        self.checkpoint = 0
+        self._recent: Deque[str] = deque(maxlen=RECENT_SUGGESTIONS)
+        # Ids fetched past the checkpoint but not finished: queued, being generated or waiting for the bulk update
+        self._outstanding: Set[int] = set()
+        # Ids that failed in an earlier run and are not finished yet, and ids that failed in this one.
+        # Both are saved with the checkpoint so that the next run retries them.
+        self._retrying: Set[int] = set()
+        self._failed: Set[int] = set()
+        self._saved_failed: List[int] = []
+        self._pending: List[Tuple[int, str, str]] = []
+        self._last_fetched = 0
+        self._flush_lock = asyncio.Lock()
+        self._validator = get_sentence_validator()
+
+    async def run(self, restart: bool = False) -> Dict[str, Any]:
+        """
+        Process every sentence without missing-word data after the checkpoint.
+
+        Args:
+            restart: Ignore the checkpoint, also retrying rows whose earlier results were invalid
+
+        Returns:
+            Dictionary with processed, valid, invalid, failed and updated counts
+        """
+        if not restart:
+            self.checkpoint, self._saved_failed = await load_checkpoint(self.checkpoint_name)
+        self._retrying = set(self._saved_failed)
+        self._last_fetched = self.checkpoint
+        logging.info(f"Missing-word backfill starting after sentence {self.checkpoint}, retrying "
+                     f"{len(self._retrying)} failed rows first "
+                     f"(concurrency {self.concurrency}{', dry run' if self.dry_run else ''})")
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        pager = asyncio.create_task(self._page(queue))
+        workers = [asyncio.create_task(self._work(queue)) for _ in range(self.concurrency)]
+        try:
+            await asyncio.gather(pager, *workers)
+        finally:
+            for task in [pager, *workers]:
+                task.cancel()
+            await asyncio.gather(pager, *workers, return_exceptions=True)
+            # Keep whatever finished before a crash, Ctrl-C or an open circuit breaker
+            await self._flush()
+        logging.info("Missing-word backfill finished: " + ", ".join(f"{key}={value}" for key, value in self.totals.items()))
+        return self.totals
+
+    async def _page(self, queue: asyncio.Queue) -> None:
+        """Feed earlier failures, then rows past the checkpoint in keyset order, then one stop marker per worker."""
+        if self._retrying:
+            rows = await fetch_sentences_by_ids(sorted(self._retrying))
+            # Rows filled by someone else meanwhile need no retry
+            self._retrying.intersection_update(sentence_id for sentence_id, _ in rows)
+            for row in rows:
+                await queue.put(row)
+        fetched = 0
+        while self.limit is None or fetched < self.limit:
+            page_size = self.page_size if self.limit is None else min(self.page_size, self.limit - fetched)
+            rows = await fetch_sentences_missing_words(self._last_fetched, page_size)
+            for sentence_id, sentence in rows:
+                self._outstanding.add(sentence_id)
+                self._last_fetched = sentence_id
+                await queue.put((sentence_id, sentence))
+            fetched += len(rows)
+            if len(rows) < page_size:
+                break
+        for _ in range(self.concurrency):
+            await queue.put(None)
+
+    async def _work(self, queue: asyncio.Queue) -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            sentence_id, sentence = item
+            try:
+                result = await execute_with_retry(
+                    lambda: generate_missing_word_data(sentence, list(self._recent), self.model), max_retries=3)
+            except CircuitOpenError:
+                raise
+            except pydantic.ValidationError as e:
+                # Answers kept failing to parse: same treatment as invalid data
+                self.totals['processed'] += 1
+                self.totals['invalid'] += 1
+                self._finish(sentence_id)
+                logging.info(f"Unparsable missing-word data for sentence {sentence_id}: {e}")
+                continue
+            except Exception as e:
+                self.totals['failed'] += 1
+                self._finish(sentence_id)
+                self._failed.add(sentence_id)
+                logging.error(f"Missing-word generation failed for sentence {sentence_id}: {e}")
+                continue
+            self.totals['processed'] += 1
+            self._handle_result(sentence_id, sentence, result)
+            if len(self._pending) >= self.flush_size:
+                await self._flush()
+
+    def _handle_result(self, sentence_id: int, sentence: str, result: MissingWordResult) -> None:
+        word_to_replace = result.word_to_replace.strip()
+        suggestions = [suggestion.strip() for suggestion in result.word_suggestions]
+        for suggestion in suggestions:
+            normalized = normalize_word(suggestion)
+            if normalized not in self._recent:
+                self._recent.append(normalized)
+        if validate_missing_word_data(sentence, word_to_replace, suggestions, self._validator):
+            self.totals['valid'] += 1
+            self._pending.append((sentence_id, word_to_replace, ",".join(suggestions)))
+        else:
+            # Left empty and behind the checkpoint: retried only with --restart
+            self.totals['invalid'] += 1
+            self._finish(sentence_id)
+            logging.info(f"Invalid missing-word data for sentence {sentence_id}: '{word_to_replace}' | {suggestions}")
+
+    def _finish(self, sentence_id: int) -> None:
+        """Stop tracking a row as in flight, whichever pass it came from."""
+        self._outstanding.discard(sentence_id)
+        self._retrying.discard(sentence_id)
+
+    def _watermark(self) -> int:
+        """Highest id such that every fetched row up to it has been handled."""
+        return min(self._outstanding) - 1 if self._outstanding else self._last_fetched
+
+    async def _flush(self) -> None:
+        """Write collected results in one statement and advance the checkpoint."""
+        async with self._flush_lock:
+            batch, self._pending = self._pending, []
+            if self.dry_run:
+                return
+            if batch:
+                self.totals['updated'] += await store_missing_words(batch)
+                for sentence_id, _, _ in batch:
+                    self._finish(sentence_id)
+            watermark = max(self._watermark(), self.checkpoint)
+            failed = sorted(self._retrying | self._failed)
+            if watermark > self.checkpoint or failed != self._saved_failed:
+                await save_checkpoint(self.checkpoint_name, watermark, failed)
+                self.checkpoint, self._saved_failed = watermark, failed
+                logging.info(f"Missing-word backfill checkpoint at sentence {watermark}: "
+                             + ", ".join(f"{key}={value}" for key, value in self.totals.items()))
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Missing-word exercise data tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    backfill = subparsers.add_parser('backfill', help="Generate word_to_replace/word_suggestions for sentences lacking them")
+    backfill.add_argument('--concurrency', type=int, default=4, help="LLM requests in flight at the same time")
+    backfill.add_argument('--page-size', type=int, default=100, help="Rows read per keyset page")
+    backfill.add_argument('--flush-size', type=int, default=25, help="Results written per bulk update")
+    backfill.add_argument('--limit', type=int, help="Process at most this many rows")
+    backfill.add_argument('--model', help="LLM model (defaults to [LLM] LLM_MODEL_NAME)")
+    backfill.add_argument('--restart', action='store_true', help="Ignore the checkpoint and rescan from the first sentence")
+    backfill.add_argument('--dry-run', action='store_true', help="Generate and validate without writing")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    lock_conn = None
+    try:
+        lock_conn = await open_connection()
+        await init_pool()
+        if not await lock_conn.fetchval("SELECT pg_try_advisory_lock($1)", BACKFILL_LOCK_KEY):
+            print("Another missing-word backfill is already running")
+            return
+        job = MissingWordBackfill(concurrency=args.concurrency, page_size=args.page_size, flush_size=args.flush_size,
+                                  limit=args.limit, model=args.model, dry_run=args.dry_run)
+        try:
+            totals = await job.run(restart=args.restart)
+        except CircuitOpenError as e:
+            print(f"Stopped: {e}. Progress is checkpointed at sentence {job.checkpoint}, run again to resume")
+            return
+        print(", ".join(f"{key}={value}" for key, value in totals.items()))
+    finally:
+        await close_llm_client()
+        await close_pool()
+        # Closing the session releases the advisory lock
+        if lock_conn is not None:
+            await lock_conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,338 @@
+"""
+Near-duplicate sentence index for Parla Italiano Bot.
+
+The database only rejects sentences whose normalized text is identical
+(migrations/014_sentence_hash.sql), so paraphrases that differ by one word
+or by punctuation still get inserted. This module keeps an in-memory index
+of the word sets of all Italian sentences and rejects generated sentences
+whose Jaccard similarity to a stored sentence (or to an earlier sentence of
+the same batch) reaches a threshold.
+
+Similarity is exact, not estimated: candidates are found with prefix
+filtering. Words are ordered globally from rarest to most frequent, and two
+word sets with Jaccard similarity >= t always share a word among the first
+|x| - ceil(t * |x|) + 1 words of each set, so only those prefix words are put
+in the inverted index. Common words ("il", "di", "è") are therefore almost
+never posted, which keeps posting lists short and memory small: a sentence
+costs one tuple of integer word ranks plus a few 4-byte posting entries,
+under 20 MB for 100k sentences. Word order is ignored.
+
+The index is loaded once at startup in the background and updated with
+every sentence stored by this process. Sentences inserted by other processes
+are picked up on the next start; the exact-hash check in the database still
+applies to them.
+"""
+
+import asyncio
+import logging
+import math
+import re
+import time
+import sys
+import os
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from .connection import acquire_connection
+
+# Words of a sentence: letters/digits runs, so punctuation and apostrophes separate words
+WORD_PATTERN = re.compile(r"\w+")
+
+# Rows fetched per round trip while loading the corpus
+LOAD_BATCH_SIZE = 5000
+
+
+def sentence_words(sentence: str) -> frozenset:
+    """Get the set of lowercased words of a sentence, ignoring punctuation."""
+    return frozenset(WORD_PATTERN.findall(sentence.lower()))
+
+
+def jaccard(first: Iterable, second: Iterable) -> float:
+    """Jaccard similarity of two word collections."""
+    first, second = set(first), set(second)
+    if not first and not second:
+        return 1.0
+    return len(first & second) / len(first | second)
+
+
+class NearDuplicateIndex:
+    """
+    Inverted index over sentence word sets with prefix filtering for Jaccard similarity.
+    """
+
+    def __init__(self, threshold: float = 0.7):
+        """
+        Initialize an empty index.
+
+        Args:
+            threshold: Jaccard similarity at or above which a sentence counts as a near-duplicate
+        """
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+        self.threshold = threshold
+        # Word -> rank; lower ranks are rarer words. Words of sentences added after the load get
+        # negative ranks, making them rarer than every loaded word. Words only seen in lookups
+        # are not ranked.
+        self._ranks: Dict[str, int] = {}
+        self._next_new_rank = -1
+        # Per sentence: sorted tuple of word ranks, and its database id
+        self._records: List[Tuple[int, ...]] = []
+        self._ids = array('q')
+        # Rank -> positions in _records of sentences having that word in their prefix
+        self._postings: Dict[int, array] = {}
+        self._pending: List[Tuple[int, str]] = []
+        self.ready = False
+        self.checked = 0
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def _prefix_length(self, size: int) -> int:
+        """Number of leading (rarest) words that must be indexed/probed for a set of this size."""
+        return size - math.ceil(self.threshold * size - 1e-9) + 1
+
+    def _rank(self, word: str) -> int:
+        rank = self._ranks.get(word)
+        if rank is None:
+            rank = self._ranks[word] = self._next_new_rank
+            self._next_new_rank -= 1
+        return rank
+
+    def _record(self, words: Iterable[str]) -> Tuple[int, ...]:
+        return tuple(sorted(self._rank(word) for word in words))
+
+    def _query_record(self, words: Iterable[str]) -> Tuple[int, ...]:
+        """Record of a sentence that is only looked up: unknown words get temporary ranks below every
+        stored rank (rarest, and in no indexed sentence) instead of growing the vocabulary."""
+        ranks, temporary = [], self._next_new_rank
+        for word in words:
+            rank = self._ranks.get(word)
+            if rank is None:
+                rank, temporary = temporary, temporary - 1
+            ranks.append(rank)
+        return tuple(sorted(ranks))
+
+    def _insert(self, sentence_id: int, record: Tuple[int, ...]) -> None:
+        position = len(self._records)
+        self._records.append(record)
+        self._ids.append(sentence_id)
+        for rank in record[:self._prefix_length(len(record))]:
+            postings = self._postings.get(rank)
+            if postings is None:
+                postings = self._postings[rank] = array('I')
+            postings.append(position)
+
+    def _best_match(self, record: Tuple[int, ...]) -> Tuple[float, Optional[int]]:
+        """Highest similarity to an indexed sentence at or above the threshold, with its position."""
+        size = len(record)
+        if not size:
+            return 0.0, None
+        min_size = self.threshold * size
+        max_size = size / self.threshold
+        words = set(record)
+        seen = set()
+        best, best_position = 0.0, None
+        for rank in record[:self._prefix_length(size)]:
+            for position in self._postings.get(rank, ()):
+                if position in seen:
+                    continue
+                seen.add(position)
+                candidate = self._records[position]
+                if not min_size <= len(candidate) <= max_size:
+                    continue
+                common = len(words.intersection(candidate))
+                similarity = common / (size + len(candidate) - common)
+                if similarity > best:
+                    best, best_position = similarity, position
+        if best >= self.threshold:
+            return best, best_position
+        return best, None
+
+    def build(self, rows: Iterable[Tuple[int, str]]) -> Tuple[Dict[str, int], List[Tuple[int, ...]], array, Dict[int, array]]:
+        """
+        Compute index structures from (id, sentence) rows without touching the index, so it can run in a thread.
+
+        Words are ranked by how many sentences contain them, rarest first.
+
+        Args:
+            rows: Every stored sentence
+
+        Returns:
+            Word ranks, records, ids and postings to pass to install()
+        """
+        # Tuples instead of frozensets keep the peak memory of a 100k-sentence build low
+        parsed = [(sentence_id, tuple(sentence_words(sentence))) for sentence_id, sentence in rows]
+        frequency = Counter(word for _, words in parsed for word in words)
+        ranks = {word: rank for rank, (word, _) in enumerate(
+            sorted(frequency.items(), key=lambda item: (item[1], item[0])))}
+        records, ids, postings = [], array('q'), {}
+        for sentence_id, words in parsed:
+            record = tuple(sorted(ranks[word] for word in words))
+            position = len(records)
+            records.append(record)
+            ids.append(sentence_id)
+            for rank in record[:self._prefix_length(len(record))]:
+                postings.setdefault(rank, array('I')).append(position)
+        return ranks, records, ids, postings
+
+    def install(self, built: Tuple[Dict[str, int], List[Tuple[int, ...]], array, Dict[int, array]]) -> None:
+        """
+        Replace the index contents with the output of build() and index sentences added meanwhile.
+
+        Args:
+            built: Result of build()
+        """
+        self._ranks, self._records, self._ids, self._postings = built
+        self._next_new_rank = -1
+        self.ready = True
+        pending, self._pending = self._pending, []
+        for sentence_id, sentence in pending:
+            self.add(sentence_id, sentence)
+
+    def load(self, rows: Iterable[Tuple[int, str]]) -> None:
+        """
+        Build the index from (id, sentence) rows.
+
+        Args:
+            rows: Every stored sentence
+        """
+        self.install(self.build(rows))
+
+    def add(self, sentence_id: int, sentence: str) -> None:
+        """
+        Index a newly stored sentence.
+
+        Args:
+            sentence_id: Database id
+            sentence: Italian sentence
+        """
+        if not self.ready:
+            self._pending.append((sentence_id, sentence))
+            return
+        self._insert(sentence_id, self._record(sentence_words(sentence)))
+
+    def find(self, sentence: str) -> Optional[Tuple[int, float]]:
+        """
+        Find a stored near-duplicate of a sentence.
+
+        Args:
+            sentence: Italian sentence
+
+        Returns:
+            (database id, similarity) of the most similar stored sentence, or None if none reaches the threshold
+        """
+        similarity, position = self._best_match(self._query_record(sentence_words(sentence)))
+        if position is None:
+            return None
+        return self._ids[position], similarity
+
+    def filter_pairs(self, pairs: List[Dict[str, str]]) -> Tuple[List[Dict[str, str]], List[Tuple[Dict[str, str], Optional[int], float]]]:
+        """
+        Drop pairs whose Italian sentence is a near-duplicate of a stored sentence or of an earlier pair.
+
+        Args:
+            pairs: Sentence pairs with 'italian' and 'russian' keys
+
+        Returns:
+            (kept pairs, rejected (pair, matched sentence id, similarity) tuples); the id is None
+            when the match is an earlier pair of the same batch.
+            Everything is kept while the index is still loading.
+        """
+        if not self.ready:
+            return list(pairs), []
+        kept, kept_words, rejected = [], [], []
+        for pair in pairs:
+            self.checked += 1
+            words = sentence_words(pair['italian'])
+            similarity, position = self._best_match(self._query_record(words))
+            if position is not None:
+                rejected.append((pair, self._ids[position], similarity))
+                continue
+            batch_similarity = max((jaccard(words, other) for other in kept_words), default=0.0)
+            if batch_similarity >= self.threshold:
+                rejected.append((pair, None, batch_similarity))
+                continue
+            kept.append(pair)
+            kept_words.append(words)
+        self.rejected += len(rejected)
+        return kept, rejected
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the index size and counters.
+
+        Returns:
+            Dictionary with sentence, vocabulary and posting counts and the checked/rejected totals
+        """
+        return {
+            'ready': self.ready,
+            'sentences': len(self._records),
+            'words': len(self._ranks),
+            'postings': sum(len(postings) for postings in self._postings.values()),
+            'checked': self.checked,
+            'rejected': self.rejected,
+        }
+
+
+async def load_near_duplicate_index(index: NearDuplicateIndex) -> None:
+    """Read every Italian sentence in keyset-paginated batches and build the index"""
+    start_time = time.monotonic()
+    rows, last_id = [], 0
+    async with acquire_connection() as conn:
+        while True:
+            batch = await conn.fetch(
+                "SELECT id, sentence FROM italian_sentences WHERE id > $1 ORDER BY id LIMIT $2",
+                last_id, LOAD_BATCH_SIZE
+            )
+            rows.extend((row['id'], row['sentence']) for row in batch)
+            if len(batch) < LOAD_BATCH_SIZE:
+                break
+            last_id = batch[-1]['id']
+    # Tokenizing 100k sentences takes about a second; keep the event loop responsive meanwhile
+    built = await asyncio.to_thread(index.build, rows)
+    index.install(built)
+    stats = index.stats()
+    logging.info(f"Near-duplicate index loaded in {time.monotonic() - start_time:.2f} seconds: "
+                 f"{stats['sentences']} sentences, {stats['words']} words, {stats['postings']} postings")
+
+
+# Process-wide index, created by start_near_duplicate_index() on application startup
+_index: Optional[NearDuplicateIndex] = None
+_load_task: Optional[asyncio.Task] = None
+
+
+async def _load_in_background(index: NearDuplicateIndex) -> None:
+    try:
+        await load_near_duplicate_index(index)
+    except Exception as e:
+        logging.error(f"Failed to load near-duplicate index, near-duplicates will not be filtered: {e}")
+
+
+def start_near_duplicate_index(threshold: float = 0.7) -> NearDuplicateIndex:
+    """Create the shared index and start loading the corpus into it in the background"""
+    global _index, _load_task
+    if _index is None:
+        _index = NearDuplicateIndex(threshold)
+        _load_task = asyncio.create_task(_load_in_background(_index))
+    return _index
+
+
+async def stop_near_duplicate_index() -> None:
+    """Cancel a running load and drop the shared index"""
+    global _index, _load_task
+    task, _load_task, _index = _load_task, None, None
+    if task is not None and not task.done():
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+def get_near_duplicate_index() -> Optional[NearDuplicateIndex]:
+    """Get the shared index, or None if it has not been started"""
+    return _index
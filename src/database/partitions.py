@@ -0,0 +1,210 @@
+"""
+Results partition maintenance module for Parla Italiano Bot.
+
+Both results tables are partitioned by month on timestamp (see
+migrations/013_partition_results.sql). This module keeps partitions created
+ahead of time and applies retention: partitions older than the retention
+period are summarized per (user, sentence) into results_archive, so "already
+solved" checks keep working, and are then detached into the archive schema or
+dropped. Each month is vacuumed and indexed on its own, so maintenance cost
+stays proportional to recent traffic rather than to total history. Archival
+also advances results_retention.live_since, which bounds the per-user results
+probes to the attached months (migrations/017_results_live_since.sql).
+"""
+
+import asyncio
+import logging
+import re
+import sys
+import os
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from .connection import acquire_connection
+from .daily_stats import EXERCISE_TYPES
+
+# Partitioned results tables
+PARTITIONED_TABLES = list(EXERCISE_TYPES)
+
+# Schema that detached partitions are moved to
+ARCHIVE_SCHEMA = 'archive'
+
+
+def _add_months(month: date, months: int) -> date:
+    """First day of the month `months` after `month`"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _current_month() -> date:
+    """First day of the current month in UTC, the time zone partition bounds use"""
+    today = datetime.now(timezone.utc).date()
+    return today.replace(day=1)
+
+
+def _parse_partition_month(table: str, partition: str) -> Optional[date]:
+    """Month covered by a partition named <table>_yYYYYmMM, or None for other partitions"""
+    match = re.fullmatch(re.escape(table) + r'_y(\d{4})m(\d{2})', partition)
+    if not match:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+async def ensure_partitions(conn, months_ahead: int = 3) -> List[str]:
+    """
+    Create the partitions for the current month and the next `months_ahead` months.
+
+    Args:
+        conn: Database connection
+        months_ahead: Number of future months to create
+
+    Returns:
+        Names of all partitions ensured
+    """
+    current = _current_month()
+    names = []
+    for table in PARTITIONED_TABLES:
+        for offset in range(months_ahead + 1):
+            month = _add_months(current, offset)
+            try:
+                names.append(await conn.fetchval("SELECT ensure_results_partition($1, $2)", table, month))
+            except Exception as e:
+                # One month that cannot be created must not keep the other months and archival from running
+                logging.error(f"Failed to create the {month:%Y-%m} partition of {table}: {e}")
+    return names
+
+
+async def list_partitions(conn, table: str) -> List[Tuple[str, date]]:
+    """
+    List the monthly partitions of a results table, oldest first.
+
+    Args:
+        conn: Database connection
+        table: Partitioned results table
+
+    Returns:
+        (partition name, first day of month) tuples
+    """
+    rows = await conn.fetch("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = $1::regclass
+    """, table)
+    partitions = []
+    for row in rows:
+        month = _parse_partition_month(table, row['relname'])
+        if month is not None:
+            partitions.append((row['relname'], month))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+async def archive_partition(conn, table: str, partition: str, keep_detached: bool = True) -> None:
+    """
+    Summarize a partition into results_archive, then detach it.
+
+    Args:
+        conn: Database connection
+        table: Partitioned results table
+        partition: Monthly partition of `table` (validated against the naming scheme)
+        keep_detached: Move the detached partition to the archive schema instead of dropping it
+    """
+    if _parse_partition_month(table, partition) is None:
+        raise ValueError(f"{partition} is not a monthly partition of {table}")
+    async with conn.transaction():
+        await conn.execute(f"""
+            INSERT INTO results_archive (
+                user_id, italian_sentence_id, exercise_type, attempts, successes,
+                first_attempt_at, last_attempt_at
+            )
+            SELECT user_id, italian_sentence_id, $1, COUNT(*), COUNT(*) FILTER (WHERE is_success),
+                   MIN(timestamp), MAX(timestamp)
+            FROM {partition}
+            GROUP BY user_id, italian_sentence_id
+            ON CONFLICT (user_id, italian_sentence_id, exercise_type) DO UPDATE SET
+                attempts = results_archive.attempts + EXCLUDED.attempts,
+                successes = results_archive.successes + EXCLUDED.successes,
+                first_attempt_at = LEAST(results_archive.first_attempt_at, EXCLUDED.first_attempt_at),
+                last_attempt_at = GREATEST(results_archive.last_attempt_at, EXCLUDED.last_attempt_at)
+        """, EXERCISE_TYPES[table])
+        await conn.execute(f"ALTER TABLE {table} DETACH PARTITION {partition}")
+        # Results probes no longer need to look before the end of this month
+        month_end = _add_months(_parse_partition_month(table, partition), 1)
+        await conn.execute("""
+            INSERT INTO results_retention (table_name, live_since)
+            VALUES ($1, $2::date::timestamp AT TIME ZONE 'UTC')
+            ON CONFLICT (table_name) DO UPDATE SET live_since = GREATEST(results_retention.live_since, EXCLUDED.live_since)
+        """, table, month_end)
+        if keep_detached:
+            await conn.execute(f"ALTER TABLE {partition} SET SCHEMA {ARCHIVE_SCHEMA}")
+        else:
+            await conn.execute(f"DROP TABLE {partition}")
+
+
+async def maintain_results_partitions(months_ahead: int = 3, retention_months: int = 12,
+                                      keep_detached: bool = True) -> Dict[str, List[str]]:
+    """
+    Create upcoming partitions and archive those past the retention period.
+
+    Args:
+        months_ahead: Number of future months to keep created
+        retention_months: Months of raw results to keep, including the current one; 0 keeps everything
+        keep_detached: Keep archived partitions in the archive schema instead of dropping them
+
+    Returns:
+        Dictionary with the 'ensured' and 'archived' partition names
+    """
+    archived = []
+    async with acquire_connection() as conn:
+        ensured = await ensure_partitions(conn, months_ahead)
+        if retention_months > 0:
+            cutoff = _add_months(_current_month(), -(retention_months - 1))
+            for table in PARTITIONED_TABLES:
+                for partition, month in await list_partitions(conn, table):
+                    if month >= cutoff:
+                        break
+                    await archive_partition(conn, table, partition, keep_detached)
+                    archived.append(partition)
+                    logging.info(f"Archived results partition {partition} ({'detached' if keep_detached else 'dropped'})")
+    return {'ensured': ensured, 'archived': archived}
+
+
+async def _maintain_periodically(interval: float, months_ahead: int, retention_months: int,
+                                 keep_detached: bool) -> None:
+    """Run partition maintenance now and then every `interval` seconds."""
+    while True:
+        try:
+            await maintain_results_partitions(months_ahead, retention_months, keep_detached)
+        except Exception as e:
+            logging.error(f"Results partition maintenance failed: {e}")
+        await asyncio.sleep(interval)
+
+
+# Background maintenance task, created by start_partition_maintenance()
+_maintenance_task: Optional[asyncio.Task] = None
+
+
+def start_partition_maintenance(interval: float = 86400.0, months_ahead: int = 3,
+                                retention_months: int = 12, keep_detached: bool = True) -> None:
+    """Start the periodic results partition maintenance job"""
+    global _maintenance_task
+    if _maintenance_task is None:
+        _maintenance_task = asyncio.create_task(
+            _maintain_periodically(interval, months_ahead, retention_months, keep_detached)
+        )
+        logging.info(f"Partition maintenance started (interval={interval}s, retention_months={retention_months})")
+
+
+async def stop_partition_maintenance() -> None:
+    """Stop the periodic results partition maintenance job"""
+    global _maintenance_task
+    if _maintenance_task is None:
+        return
+    task, _maintenance_task = _maintenance_task, None
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
@@ -0,0 +1,148 @@
+"""
+Phrase cache module for Parla Italiano Bot.
+
+This module keeps the small, almost static phrase tables (encouraging phrases,
+error phrases and exercise prompts) in memory and serves random choices from
+there. The cache is reloaded when Postgres sends a notification on the
+phrases_changed channel (see migrations/008_phrase_notifications.sql) and,
+as a safety net, when its TTL expires.
+"""
+
+import asyncio
+import logging
+import random
+import time
+import sys
+import os
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from .connection import acquire_connection, open_connection
+
+NOTIFY_CHANNEL = 'phrases_changed'
+
+PHRASE_QUERIES = {
+    'encouraging_phrases': "SELECT phrase FROM encouraging_phrases",
+    'error_phrases': "SELECT phrase FROM error_phrases",
+    'exercise_prompts': "SELECT prompt FROM exercise_prompts",
+}
+
+
+class PhraseCache:
+    """
+    In-memory copy of the phrase and prompt tables.
+    """
+
+    def __init__(self, ttl: float = 3600.0):
+        """
+        Initialize an empty cache.
+
+        Args:
+            ttl: Seconds after which the cache is reloaded even without a notification
+        """
+        self.ttl = ttl
+        self._phrases: Dict[str, List[str]] = {}
+        self._loaded_at: Optional[float] = None
+        self._reload_task: Optional[asyncio.Task] = None
+        self._listener_conn = None
+
+    async def load(self) -> None:
+        """Load every phrase table in one connection."""
+        phrases = {}
+        async with acquire_connection() as conn:
+            for table, query in PHRASE_QUERIES.items():
+                rows = await conn.fetch(query)
+                phrases[table] = [row[0] for row in rows]
+        self._phrases = phrases
+        self._loaded_at = time.monotonic()
+        logging.info("Phrase cache loaded: " + ", ".join(f"{table}={len(rows)}" for table, rows in phrases.items()))
+
+    def choice(self, table: str) -> Optional[str]:
+        """
+        Get a random phrase from a cached table.
+
+        Args:
+            table: One of the PHRASE_QUERIES table names
+
+        Returns:
+            Random phrase, or None if the table is empty
+        """
+        if self.is_stale():
+            self.schedule_reload()
+        phrases = self._phrases.get(table)
+        return random.choice(phrases) if phrases else None
+
+    def is_stale(self) -> bool:
+        """Check whether the TTL has expired."""
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def schedule_reload(self) -> None:
+        """Reload in the background unless a reload is already running."""
+        if self._reload_task is None or self._reload_task.done():
+            self._reload_task = asyncio.create_task(self._reload())
+
+    async def _reload(self) -> None:
+        """Background reload wrapper that keeps the old phrases on failure."""
+        try:
+            await self.load()
+        except Exception as e:
+            logging.error(f"Failed to reload phrase cache: {e}")
+
+    async def listen(self) -> None:
+        """Subscribe to change notifications on a dedicated connection."""
+        try:
+            self._listener_conn = await open_connection()
+            await self._listener_conn.add_listener(NOTIFY_CHANNEL, self._on_notification)
+        except Exception as e:
+            logging.warning(f"Phrase change notifications unavailable, relying on TTL: {e}")
+            await self._close_listener()
+
+    def _on_notification(self, connection, pid, channel, payload) -> None:
+        """asyncpg listener callback for phrases_changed."""
+        logging.info(f"Phrase table {payload} changed, reloading phrase cache")
+        self.schedule_reload()
+
+    async def close(self) -> None:
+        """Stop listening and cancel any running reload."""
+        await self._close_listener()
+        if self._reload_task is not None and not self._reload_task.done():
+            self._reload_task.cancel()
+
+    async def _close_listener(self) -> None:
+        """Close the notification connection if it is open."""
+        conn, self._listener_conn = self._listener_conn, None
+        if conn is not None:
+            try:
+                await conn.close()
+            except Exception as e:
+                logging.warning(f"Failed to close phrase listener connection: {e}")
+
+
+# Process-wide cache, created by start_phrase_cache() on application startup
+_phrase_cache: Optional[PhraseCache] = None
+
+
+async def start_phrase_cache(ttl: float = 3600.0) -> PhraseCache:
+    """Load the shared phrase cache and subscribe to change notifications"""
+    global _phrase_cache
+    if _phrase_cache is None:
+        cache = PhraseCache(ttl=ttl)
+        await cache.load()
+        await cache.listen()
+        _phrase_cache = cache
+    return _phrase_cache
+
+
+async def stop_phrase_cache() -> None:
+    """Stop listening for changes and drop the shared phrase cache"""
+    global _phrase_cache
+    if _phrase_cache is None:
+        return
+    cache, _phrase_cache = _phrase_cache, None
+    await cache.close()
+
+
+def get_phrase_cache() -> Optional[PhraseCache]:
+    """Get the shared phrase cache, or None if it has not been started"""
+    return _phrase_cache
@@ -0,0 +1,131 @@
+"""
+Sentence replenishment coordinator for Parla Italiano Bot.
+
+Generated sentences are shared by every user, so a user running low does not
+need a generation of their own. The coordinator coalesces replenishment
+requests from all users into the generation already in flight and caps how
+many LLM generations run at the same time.
+"""
+
+import asyncio
+import logging
+import sys
+import os
+from typing import Awaitable, Callable, Optional, Set
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+async def _default_generate(user_id: int) -> None:
+    """Run sentence_replenishment, looked up at call time to avoid a circular import"""
+    from .sentences import sentence_replenishment
+    await sentence_replenishment(user_id)
+
+
+class ReplenishmentCoordinator:
+    """
+    Single-flight, globally coalesced sentence generation.
+    """
+
+    def __init__(self, generate: Callable[[int], Awaitable[None]] = _default_generate,
+                 max_concurrent: int = 1):
+        """
+        Initialize the coordinator.
+
+        Args:
+            generate: Coroutine function generating and storing one batch of sentences
+            max_concurrent: Maximum number of generations running at the same time
+        """
+        self.generate = generate
+        self.max_concurrent = max_concurrent
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._current: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.requested = 0
+        self.coalesced = 0
+        self.generations = 0
+
+    def request(self, user_id: int, coalesce: bool = True) -> asyncio.Task:
+        """
+        Request a replenishment, attaching to the generation in flight if there is one.
+
+        Args:
+            user_id: Telegram user ID the request is made for (used for logging)
+            coalesce: Start a new generation even if one is in flight when False;
+                it waits for a free slot before calling the LLM
+
+        Returns:
+            Task of the generation serving the request
+        """
+        self.requested += 1
+        if coalesce and self._current is not None and not self._current.done():
+            self.coalesced += 1
+            logging.debug(f"Replenishment for user {user_id} attached to the generation in flight")
+            return self._current
+        task = asyncio.create_task(self._run(user_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self._current = task
+        return task
+
+    async def wait(self, user_id: int) -> None:
+        """
+        Request a replenishment and wait until the serving generation finishes.
+
+        Args:
+            user_id: Telegram user ID the request is made for
+        """
+        # Shielded so that one cancelled waiter does not cancel the generation shared by the others
+        await asyncio.shield(self.request(user_id))
+
+    def in_flight(self) -> int:
+        """Get the number of generations running or waiting for a slot."""
+        return len(self._tasks)
+
+    async def close(self) -> None:
+        """Cancel every generation and wait for them to finish."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._current = None
+
+    async def _run(self, user_id: int) -> None:
+        """Run one generation once a slot is free, logging instead of raising."""
+        async with self._slots:
+            self.generations += 1
+            try:
+                await self.generate(user_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Sentence replenishment failed: {e}")
+
+
+# Process-wide coordinator, created by start_replenishment_coordinator() on application startup
+_coordinator: Optional[ReplenishmentCoordinator] = None
+
+
+def start_replenishment_coordinator(max_concurrent: int = 1) -> ReplenishmentCoordinator:
+    """Create the shared coordinator used to schedule sentence replenishment"""
+    global _coordinator
+    if _coordinator is None:
+        _coordinator = ReplenishmentCoordinator(max_concurrent=max_concurrent)
+        logging.info(f"Replenishment coordinator started (max_concurrent={max_concurrent})")
+    return _coordinator
+
+
+async def stop_replenishment_coordinator() -> None:
+    """Cancel running generations and drop the shared coordinator"""
+    global _coordinator
+    if _coordinator is None:
+        return
+    coordinator, _coordinator = _coordinator, None
+    await coordinator.close()
+    logging.info(f"Replenishment coordinator stopped ({coordinator.requested} requests, "
+                 f"{coordinator.coalesced} coalesced, {coordinator.generations} generations)")
+
+
+def get_replenishment_coordinator() -> Optional[ReplenishmentCoordinator]:
+    """Get the shared coordinator, or None if it has not been started"""
+    return _coordinator
@@ -0,0 +1,224 @@
+"""
+Exercise result write-behind module for Parla Italiano Bot.
+
+This module buffers exercise results in memory and writes them to the database
+in bulk with COPY, off the user's callback path, together with the daily_stats
+rollup, the user_progress counters and the user_last_attempt pointers. The buffer is flushed when it
+reaches a batch size or a time interval elapses, applies backpressure when full,
+and is drained on shutdown.
+"""
+
+import asyncio
+import logging
+import sys
+import os
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+import asyncpg
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from .connection import acquire_connection
+from .daily_stats import update_daily_stats
+from .user_progress import update_user_progress
+from .last_attempts import update_last_attempts
+
+ResultRecord = Tuple[int, int, bool, datetime]
+
+RESULT_COLUMNS = ['user_id', 'italian_sentence_id', 'is_success', 'timestamp']
+
+# Sentinel queued by stop() to wake the flusher and end the run loop
+_STOP = object()
+
+
+class ResultWriteBuffer:
+    """
+    Bounded write-behind queue for exercise results.
+    """
+
+    def __init__(self, batch_size: int = 500, flush_interval: float = 1.0,
+                 max_pending: int = 10000, table: str = 'italian_sentences_results'):
+        """
+        Initialize the buffer.
+
+        Args:
+            batch_size: Number of rows that triggers an immediate flush
+            flush_interval: Maximum seconds a row waits before being flushed
+            max_pending: Queue capacity; put() waits when it is full
+            table: Results table the rows are copied into
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.table = table
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.flushed_rows = 0
+        self.dropped_rows = 0
+
+    def start(self) -> None:
+        """Start the background flusher task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def put(self, user_id: int, sentence_id: int, is_success: bool,
+                  timestamp: Optional[datetime] = None) -> None:
+        """
+        Queue a result row, waiting while the buffer is full.
+
+        Args:
+            user_id: Telegram user ID
+            sentence_id: Italian sentence ID
+            is_success: Whether the exercise was solved
+            timestamp: Attempt time, defaults to now
+        """
+        if self._closing:
+            raise RuntimeError("Result buffer is closed")
+        await self._queue.put((user_id, sentence_id, is_success, timestamp or datetime.now(timezone.utc)))
+
+    def pending(self) -> int:
+        """Get the number of rows waiting to be flushed."""
+        return self._queue.qsize()
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """
+        Flush every queued row and stop the flusher.
+
+        Args:
+            timeout: Maximum seconds to wait for the final flush
+        """
+        if self._task is None or self._closing:
+            return
+        self._closing = True
+        try:
+            await asyncio.wait_for(self._drain(), timeout)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+            logging.error(f"Result buffer did not flush within {timeout} seconds, {self._queue.qsize()} rows lost")
+        finally:
+            self._task = None
+
+    async def _drain(self) -> None:
+        """Queue the stop sentinel behind every pending row and wait for the flusher to exit."""
+        await self._queue.put(_STOP)
+        await self._task
+
+    async def _run(self) -> None:
+        """Collect rows into batches and flush them until stopped."""
+        while True:
+            batch, stopping = await self._collect()
+            if batch:
+                try:
+                    await self._flush(batch)
+                except Exception as e:
+                    # Never let one batch end the flusher: put() would block forever once the queue fills
+                    self.dropped_rows += len(batch)
+                    logging.error(f"Dropping {len(batch)} buffered results after an unexpected flush error: {e}")
+            if stopping:
+                return
+
+    async def _collect(self) -> Tuple[List[ResultRecord], bool]:
+        """Wait for a first row, then gather more until the batch is full or the interval elapses."""
+        loop = asyncio.get_running_loop()
+        item = await self._queue.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _flush(self, batch: List[ResultRecord]) -> None:
+        """Write a batch with COPY, retrying transient errors with backoff."""
+        pending = list(batch)
+        row_by_row = False
+        attempt = 0
+        while pending:
+            try:
+                if row_by_row:
+                    await self._write_rows_individually(pending)
+                else:
+                    async with acquire_connection() as conn:
+                        await self._write(conn, pending)
+                    self.flushed_rows += len(pending)
+                    return
+            except asyncpg.IntegrityConstraintViolationError:
+                # One bad row (e.g. a deleted sentence) must not block the whole batch
+                row_by_row = True
+            except Exception as e:
+                # Rows already written one by one were removed from pending and are not retried
+                attempt += 1
+                if self._closing and attempt >= 3:
+                    self.dropped_rows += len(pending)
+                    logging.error(f"Dropping {len(pending)} buffered results after {attempt} failed flushes: {e}")
+                    return
+                wait_time = min(self.flush_interval * (2 ** attempt), 30.0)
+                logging.warning(f"Failed to flush {len(pending)} results: {e}. Retrying in {wait_time:.1f} seconds")
+                await asyncio.sleep(wait_time)
+
+    async def _write(self, conn, batch: List[ResultRecord]) -> None:
+        """Copy a batch into the results table and update the rollup, progress counters and last-attempt pointers atomically."""
+        async with conn.transaction():
+            # Progress first: new solves are detected against results written before this batch
+            await update_user_progress(conn, self.table, batch)
+            await conn.copy_records_to_table(self.table, records=batch, columns=RESULT_COLUMNS)
+            await update_daily_stats(conn, self.table, batch)
+            await update_last_attempts(conn, self.table, batch)
+
+    async def _write_rows_individually(self, pending: List[ResultRecord]) -> None:
+        """Insert rows one by one, skipping those that violate constraints and removing each handled row from pending."""
+        async with acquire_connection() as conn:
+            while pending:
+                record = pending[0]
+                try:
+                    await self._write(conn, [record])
+                    self.flushed_rows += 1
+                except asyncpg.IntegrityConstraintViolationError as e:
+                    self.dropped_rows += 1
+                    logging.error(f"Skipping invalid result {record}: {e}")
+                pending.pop(0)
+
+
+# Process-wide buffer, created by start_result_buffer() on application startup
+_result_buffer: Optional[ResultWriteBuffer] = None
+
+
+def start_result_buffer(batch_size: int = 500, flush_interval: float = 1.0,
+                        max_pending: int = 10000) -> ResultWriteBuffer:
+    """Create and start the shared result buffer used by store_sentence_result"""
+    global _result_buffer
+    if _result_buffer is None:
+        _result_buffer = ResultWriteBuffer(batch_size=batch_size, flush_interval=flush_interval,
+                                           max_pending=max_pending)
+        _result_buffer.start()
+        logging.info(f"Result buffer started (batch_size={batch_size}, flush_interval={flush_interval}s)")
+    return _result_buffer
+
+
+async def stop_result_buffer() -> None:
+    """Flush and stop the shared result buffer"""
+    global _result_buffer
+    if _result_buffer is None:
+        return
+    buffer, _result_buffer = _result_buffer, None
+    await buffer.stop()
+    logging.info(f"Result buffer stopped ({buffer.flushed_rows} rows flushed, {buffer.dropped_rows} dropped)")
+
+
+def get_result_buffer() -> Optional[ResultWriteBuffer]:
+    """Get the shared result buffer, or None if it has not been started"""
+    return _result_buffer
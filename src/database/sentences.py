@@ -8,10 +8,13 @@ and content generation using LLM integration.
 import asyncpg
 import asyncio
 import logging
+import random
 import sys
 import os
-import concurrent.futures
+import re
+import json
 import time
+from collections import Counter
 
 # Configure logging to suppress verbose OpenAI library logs
 logging.getLogger("openai").setLevel(logging.WARNING)
@@ -22,21 +25,6 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from aiogram.types import User
 
 # Use the same mock config functions from other modules
-def get_database_config():
-    """Get database configuration, with fallback for testing"""
-    try:
-        from config import get_database_config as real_get_database_config
-        return real_get_database_config()
-    except FileNotFoundError:
-        # Return mock config for testing when config.ini doesn't exist
-        class MockDatabaseConfig:
-            host = "localhost"
-            port = 5432
-            name = "parla_italiano"
-            user = "parla_user"
-            password = ""
-        return MockDatabaseConfig()
-
 def get_llm_config():
     """Get LLM configuration, with fallback for testing"""
     try:
@@ -48,147 +36,280 @@ def get_llm_config():
             api_key = "test-key"
             api_url = "https://test.api"
             model_name = "test-model"
+            max_connections = 10
+            keepalive_expiry = 60.0
+            request_timeout = 120.0
+            http2 = True
+            requests_per_minute = 20.0
+            tokens_per_minute = 100000.0
+            estimated_tokens = 3000
+            breaker_failure_threshold = 5
+            breaker_reset_timeout = 60.0
+            streaming = True
         return MockLLMConfig()
+from .connection import acquire_connection
+from .results import get_result_buffer
+from .phrases import get_phrase_cache
+from .daily_stats import daily_stats_upsert
+from .user_progress import user_progress_upsert, get_user_progress
+from .last_attempts import last_attempt_upsert
+from .replenishment import get_replenishment_coordinator
+from .journal import get_generation_journal
+from .llm_limits import CircuitOpenError, get_llm_call_guard, get_llm_call_metrics
+from .validation import get_sentence_validator
+from .near_duplicates import get_near_duplicate_index
 from .base import (
-    is_valid_italian_sentence,
-    is_valid_russian_sentence,
-    clean_sentence,
     execute_with_retry,
-    execute_with_retry_sync,
+    get_llm_client,
     SentenceList,
     SentenceTranslationList
 )
 
 
+# Replenishment starts when a user has fewer unsolved sentences than this
+REPLENISHMENT_THRESHOLD = 10
+
+# Seconds a counted corpus size is trusted. Sentences added by other processes (journal
+# replay, the missing-word backfill) do not reset the cache, so it also expires.
+CORPUS_SIZE_TTL = 300.0
+
+# Number of sentences in italian_sentences, loaded on first use and reset when sentences are added
+_corpus_size: int | None = None
+_corpus_size_loaded_at = 0.0
+
+
+async def get_corpus_size(conn, max_age: float = CORPUS_SIZE_TTL) -> int:
+    """Get the cached number of sentences, counting them again once the count is older than `max_age` seconds or sentences were added"""
+    global _corpus_size, _corpus_size_loaded_at
+    if _corpus_size is None or time.monotonic() - _corpus_size_loaded_at >= max_age:
+        _corpus_size = await conn.fetchval("SELECT COUNT(*) FROM italian_sentences")
+        _corpus_size_loaded_at = time.monotonic()
+    return _corpus_size
+
+
 async def get_random_sentence(user_id: int) -> tuple[int | None, str]:
     """Get a random Italian sentence ID and text from the database, preferring sentences the user has not successfully completed"""
-    db_config = get_database_config()
-    conn = await asyncpg.connect(
-        host=db_config.host, port=db_config.port, database=db_config.name,
-        user=db_config.user, password=db_config.password
-    )
-    try:
-        # Check remaining uncompleted count for replenishment
-        count_row = await conn.fetchrow("""
-            SELECT COUNT(*) as unused_count FROM italian_sentences
-            WHERE id NOT IN (
-                SELECT italian_sentence_id FROM italian_sentences_results
-                WHERE user_id = $1 AND is_success = true
-            )
-        """, user_id)
-        unused_count = count_row['unused_count'] if count_row else 0
-        if unused_count < 10:
+    async with acquire_connection() as conn:
+        # Check remaining uncompleted count for replenishment: corpus size minus the
+        # user's solved counter, both without scanning results
+        progress = await get_user_progress(conn, user_id, 'sentence_ordering')
+        solved_count = progress['solved_count'] if progress else 0
+        unused_count = await get_corpus_size(conn) - solved_count
+        if unused_count < REPLENISHMENT_THRESHOLD:
 #        if 1==1: # TEMPORARY: only for manual testing
-            asyncio.create_task(sentence_replenishment(user_id))
+            request_replenishment(user_id)
 
-        # Prefer sentences not successfully completed by this user
+        # Prefer sentences not successfully completed by this user: seek to a random
+        # point of the random_key index and walk forward, wrapping around once.
+        # Successes are looked up in the attached partitions and in results_archive.
+        probe = random.random()
         row = await conn.fetchrow("""
-            SELECT id, sentence FROM italian_sentences
-            WHERE id NOT IN (
-                SELECT italian_sentence_id FROM italian_sentences_results
-                WHERE user_id = $1 AND is_success = true
-            )
-            ORDER BY RANDOM() LIMIT 1
-        """, user_id)
+            (SELECT id, sentence FROM italian_sentences s
+             WHERE s.random_key >= $2
+               AND NOT EXISTS (
+                   SELECT 1 FROM italian_sentences_results r
+                   WHERE r.user_id = $1 AND r.italian_sentence_id = s.id AND r.is_success
+                     AND r.timestamp >= results_live_since('italian_sentences_results')
+               )
+               AND NOT EXISTS (
+                   SELECT 1 FROM results_archive a
+                   WHERE a.user_id = $1 AND a.italian_sentence_id = s.id
+                     AND a.exercise_type = 'sentence_ordering' AND a.successes > 0
+               )
+             ORDER BY s.random_key LIMIT 1)
+            UNION ALL
+            (SELECT id, sentence FROM italian_sentences s
+             WHERE s.random_key < $2
+               AND NOT EXISTS (
+                   SELECT 1 FROM italian_sentences_results r
+                   WHERE r.user_id = $1 AND r.italian_sentence_id = s.id AND r.is_success
+                     AND r.timestamp >= results_live_since('italian_sentences_results')
+               )
+               AND NOT EXISTS (
+                   SELECT 1 FROM results_archive a
+                   WHERE a.user_id = $1 AND a.italian_sentence_id = s.id
+                     AND a.exercise_type = 'sentence_ordering' AND a.successes > 0
+               )
+             ORDER BY s.random_key LIMIT 1)
+            LIMIT 1
+        """, user_id, probe)
         if row:
             return row['id'], row['sentence']
 
         # Fallback to any random sentence
-        row = await conn.fetchrow("SELECT id, sentence FROM italian_sentences ORDER BY RANDOM() LIMIT 1")
+        row = await conn.fetchrow("""
+            (SELECT id, sentence FROM italian_sentences WHERE random_key >= $1 ORDER BY random_key LIMIT 1)
+            UNION ALL
+            (SELECT id, sentence FROM italian_sentences WHERE random_key < $1 ORDER BY random_key LIMIT 1)
+            LIMIT 1
+        """, probe)
         if row:
             return row['id'], row['sentence']
         return None, "Ciao come stai"  # fallback
-    finally:
-        await conn.close()
 
 
-async def store_sentence_result(user_id: int, sentence_id: int, is_success: bool) -> None:
-    """Store a sentence result for a user"""
-    db_config = get_database_config()
-    conn = await asyncpg.connect(
-        host=db_config.host, port=db_config.port, database=db_config.name,
-        user=db_config.user, password=db_config.password
+async def get_unsolved_sentences(user_id: int, limit: int, exclude_ids: list[int] | None = None) -> list[tuple[int, str]]:
+    """Get up to `limit` random sentences the user has not successfully completed, in one batched query"""
+    exclude_ids = list(exclude_ids or [])
+    async with acquire_connection() as conn:
+        rows = await conn.fetch("""
+            (SELECT id, sentence FROM italian_sentences s
+             WHERE s.random_key >= $2
+               AND s.id <> ALL($4::int[])
+               AND NOT EXISTS (
+                   SELECT 1 FROM italian_sentences_results r
+                   WHERE r.user_id = $1 AND r.italian_sentence_id = s.id AND r.is_success
+                     AND r.timestamp >= results_live_since('italian_sentences_results')
+               )
+               AND NOT EXISTS (
+                   SELECT 1 FROM results_archive a
+                   WHERE a.user_id = $1 AND a.italian_sentence_id = s.id
+                     AND a.exercise_type = 'sentence_ordering' AND a.successes > 0
+               )
+             ORDER BY s.random_key LIMIT $3)
+            UNION ALL
+            (SELECT id, sentence FROM italian_sentences s
+             WHERE s.random_key < $2
+               AND s.id <> ALL($4::int[])
+               AND NOT EXISTS (
+                   SELECT 1 FROM italian_sentences_results r
+                   WHERE r.user_id = $1 AND r.italian_sentence_id = s.id AND r.is_success
+                     AND r.timestamp >= results_live_since('italian_sentences_results')
+               )
+               AND NOT EXISTS (
+                   SELECT 1 FROM results_archive a
+                   WHERE a.user_id = $1 AND a.italian_sentence_id = s.id
+                     AND a.exercise_type = 'sentence_ordering' AND a.successes > 0
+               )
+             ORDER BY s.random_key LIMIT $3)
+            LIMIT $3
+        """, user_id, random.random(), limit, exclude_ids)
+
+    # Excluded ids are unsolved too, they are just already held by the caller
+    if len(rows) + len(exclude_ids) < REPLENISHMENT_THRESHOLD:
+        request_replenishment(user_id)
+    return [(row['id'], row['sentence']) for row in rows]
+
+
+def request_replenishment(user_id: int) -> None:
+    """Schedule sentence replenishment in the background, through the coordinator when it is running"""
+    coordinator = get_replenishment_coordinator()
+    if coordinator is not None:
+        coordinator.request(user_id)
+        return
+    asyncio.create_task(sentence_replenishment(user_id))
+
+
+# Callbacks invoked after sentence_replenishment stores new sentences
+_new_sentences_listeners = []
+
+
+def add_new_sentences_listener(listener) -> None:
+    """Register a callback (no arguments) invoked after new sentences are stored"""
+    if listener not in _new_sentences_listeners:
+        _new_sentences_listeners.append(listener)
+
+
+def remove_new_sentences_listener(listener) -> None:
+    """Unregister a callback added with add_new_sentences_listener"""
+    if listener in _new_sentences_listeners:
+        _new_sentences_listeners.remove(listener)
+
+
+def _notify_new_sentences() -> None:
+    """Reset the cached corpus size and invoke all new-sentence listeners, logging (not raising) their errors"""
+    global _corpus_size
+    _corpus_size = None
+    for listener in list(_new_sentences_listeners):
+        try:
+            listener()
+        except Exception as e:
+            logging.error(f"New sentences listener failed: {e}")
+
+
+# Inserts one result and updates the daily rollup, progress counters and last-attempt pointer in the same statement
+_STORE_RESULT_QUERY = """
+    WITH inserted AS (
+        INSERT INTO italian_sentences_results (user_id, italian_sentence_id, is_success)
+        VALUES ($1, $2, $3)
+        RETURNING user_id, italian_sentence_id, is_success, timestamp
+    ), daily AS (
+""" + daily_stats_upsert("inserted v", "'sentence_ordering'") + """
+    ), last_attempt AS (
+""" + last_attempt_upsert("inserted v", "'sentence_ordering'") + """
     )
-    try:
-        await conn.execute("""
-            INSERT INTO italian_sentences_results (user_id, italian_sentence_id, is_success)
-            VALUES ($1, $2, $3)
-        """, user_id, sentence_id, is_success)
-    finally:
-        await conn.close()
+""" + user_progress_upsert("inserted v", "'sentence_ordering'", "italian_sentences_results")
+
+
+async def store_sentence_result(user_id: int, sentence_id: int, is_success: bool) -> None:
+    """Store a sentence result for a user, through the write-behind buffer when it is running"""
+    result_buffer = get_result_buffer()
+    if result_buffer is not None:
+        await result_buffer.put(user_id, sentence_id, is_success)
+        return
+    async with acquire_connection() as conn:
+        await conn.execute(_STORE_RESULT_QUERY, user_id, sentence_id, is_success)
+
+
+async def store_sentence_pairs(pairs: list[dict]) -> tuple[int, int]:
+    """Insert Italian/Russian sentence pairs in one statement, skipping sentences already stored (normalized-hash match) and near-duplicates. Returns (inserted, duplicates)."""
+    if not pairs:
+        return 0, 0
+    near_duplicate_index = get_near_duplicate_index()
+    candidates = pairs
+    if near_duplicate_index is not None:
+        candidates, near_duplicates = near_duplicate_index.filter_pairs(pairs)
+        for pair, matched_id, similarity in near_duplicates:
+            matched = f"sentence {matched_id}" if matched_id is not None else "an earlier pair of the batch"
+            logging.info(f"Skipping near-duplicate '{pair['italian']}' (similarity {similarity:.2f} to {matched})")
+        if not candidates:
+            return 0, len(pairs)
+    async with acquire_connection() as conn:
+        rows = await conn.fetch("""
+            INSERT INTO italian_sentences (sentence, sentence_rus, sentence_hash)
+            SELECT v.sentence, v.sentence_rus, normalized_sentence_hash(v.sentence)
+            FROM unnest($1::text[], $2::text[]) AS v(sentence, sentence_rus)
+            ON CONFLICT (sentence_hash) DO NOTHING
+            RETURNING id, sentence
+        """, [pair['italian'] for pair in candidates], [pair['russian'] for pair in candidates])
+    if near_duplicate_index is not None:
+        for row in rows:
+            near_duplicate_index.add(row['id'], row['sentence'])
+    inserted = len(rows)
+    return inserted, len(pairs) - inserted
 
 
 async def get_random_encouraging_phrase() -> str:
-    """Get a random encouraging phrase from the database"""
-    db_config = get_database_config()
-    conn = await asyncpg.connect(
-        host=db_config.host, port=db_config.port, database=db_config.name,
-        user=db_config.user, password=db_config.password
-    )
-    try:
+    """Get a random encouraging phrase, from the phrase cache when it is running"""
+    phrase_cache = get_phrase_cache()
+    if phrase_cache is not None:
+        return phrase_cache.choice('encouraging_phrases') or "Bravo!"  # fallback
+    async with acquire_connection() as conn:
         row = await conn.fetchrow("SELECT phrase FROM encouraging_phrases ORDER BY RANDOM() LIMIT 1")
         return row['phrase'] if row else "Bravo!"  # fallback
-    finally:
-        await conn.close()
 
 
 async def get_random_error_phrase() -> str:
-    """Get a random error phrase from the database"""
-    db_config = get_database_config()
-    conn = await asyncpg.connect(
-        host=db_config.host, port=db_config.port, database=db_config.name,
-        user=db_config.user, password=db_config.password
-    )
-    try:
+    """Get a random error phrase, from the phrase cache when it is running"""
+    phrase_cache = get_phrase_cache()
+    if phrase_cache is not None:
+        return phrase_cache.choice('error_phrases') or "Quasi!"  # fallback
+    async with acquire_connection() as conn:
         row = await conn.fetchrow("SELECT phrase FROM error_phrases ORDER BY RANDOM() LIMIT 1")
         return row['phrase'] if row else "Quasi!"  # fallback
-    finally:
-        await conn.close()
 
 async def get_random_exercise_prompt() -> str:
-    """Get a random exercise prompt from the database"""
-    db_config = get_database_config()
-    conn = await asyncpg.connect(
-        host=db_config.host, port=db_config.port, database=db_config.name,
-        user=db_config.user, password=db_config.password
-    )
-    try:
+    """Get a random exercise prompt, from the phrase cache when it is running"""
+    phrase_cache = get_phrase_cache()
+    if phrase_cache is not None:
+        return phrase_cache.choice('exercise_prompts') or "Prossimo!"  # fallback
+    async with acquire_connection() as conn:
         row = await conn.fetchrow("SELECT prompt FROM exercise_prompts ORDER BY RANDOM() LIMIT 1")
         return row['prompt'] if row else "Prossimo!"  # fallback
-    finally:
-        await conn.close()
 
 
-async def sentence_replenishment(user_id: int) -> None:
-    """Generate Italian sentences with Russian translations using OpenAI API and store them in the database"""
-    logging.info(f"🔄 Starting sentence replenishment for user {user_id}")
-    start_time = time.time()
-    
-    # Get LLM configuration
-    llm_config = get_llm_config()
-    
-    # Check if API key is available
-    if not llm_config.api_key:
-        logging.error("LLM_API_KEY not found in environment variables, cannot generate sentences")
-        return
-    
-    def generate_sentences_with_translations():
-        """Generate sentences with Russian translations using LLM"""
-        # Initialize OpenAI client with instructor patch
-        # Since we're already in an async context, we need to get the client synchronously
-        llm_config = get_llm_config()
-        
-        # Check if API key is available
-        if not llm_config.api_key:
-            raise ValueError("LLM_API_KEY not found in environment variables")
-        
-        # Create the client directly without async
-        import instructor
-        from openai import OpenAI
-        client = instructor.patch(OpenAI(base_url=llm_config.api_url, api_key=llm_config.api_key))
-        
-        # System prompt to guide the LLM
-        system_prompt = """Generate Italian sentences with Russian translations for language learning.
+# System prompt to guide the LLM
+SENTENCE_GENERATION_PROMPT = """Generate Italian sentences with Russian translations for language learning.
 Each entry should include:
 1. An Italian sentence that:
    - Is in Italian (not translated from English)
@@ -208,6 +329,230 @@ Examples of appropriate entries:
 - Italian: "Perché non ti piace Marco, ha la barba?" | Russian: "Почему тебе не нравится Марко, у него же есть борода?"
 
 Please generate from 25 to 35 sentence pairs in the format requested."""
+
+# Appended to the prompt when streaming: one pair per line can be parsed as soon as the line ends
+STREAMING_FORMAT_INSTRUCTIONS = """
+
+Write one sentence pair per line, with nothing else, exactly in this format:
+Italian: <Italian sentence> | Russian: <Russian translation>"""
+
+
+def _journal_response(kind: str, response, user_id: int, model: str) -> None:
+    """Append a raw LLM response to the generation journal if it is open, logging (not raising) write errors"""
+    journal = get_generation_journal()
+    if journal is None:
+        return
+    try:
+        journal.append(kind, response, user_id=user_id, model=model)
+    except Exception as e:
+        logging.error(f"Failed to journal LLM response: {e}")
+
+
+def _completion_hooks(user_id: int, model: str):
+    """Instructor hooks seeing every API attempt inside one structured call: journal raw completions, report 429s to the call guard"""
+    from instructor.core.hooks import Hooks
+    hooks = Hooks()
+    if get_generation_journal() is not None:
+        hooks.on('completion:response', lambda completion: _journal_response(
+            'completion', completion.model_dump(mode='json'), user_id, model))
+    guard = get_llm_call_guard()
+    hooks.on('completion:error', lambda error: guard.record_rate_limited(error)
+             if getattr(error, 'status_code', None) == 429 else None)
+    return hooks
+
+
+def _parse_sentence_pairs_text(content: str) -> list[dict]:
+    """Parse free-text LLM output with lines like "Italian: ... | Russian: ..." into sentence pairs"""
+    sentence_pairs = []
+    for line in content.split('\n'):
+        line = line.strip()
+        if line:
+            # Try to parse Italian/Russian pairs
+            italian_match = re.search(r'Italian:\s*(.+?)(?:\s*\|\s*Russian:|$)', line, re.IGNORECASE)
+            russian_match = re.search(r'Russian:\s*(.+?)(?:\s*\||$)', line, re.IGNORECASE)
+            
+            if italian_match and russian_match:
+                # Remove quotes if present
+                italian_sentence = italian_match.group(1).strip().strip('"\'')
+                russian_sentence = russian_match.group(1).strip().strip('"\'')
+                if italian_sentence and russian_sentence:
+                    sentence_pairs.append({
+                        'italian': italian_sentence,
+                        'russian': russian_sentence
+                    })
+    return sentence_pairs
+
+
+def parse_journal_entry(entry: dict) -> list[dict]:
+    """Parse the sentence pairs out of a generation journal entry (structured completion or free text)"""
+    if entry['kind'] == 'text':
+        return _parse_sentence_pairs_text(entry['response'] or '')
+    message = entry['response']['choices'][0]['message']
+    tool_calls = message.get('tool_calls') or []
+    if tool_calls:
+        payload = tool_calls[0]['function']['arguments']
+    else:
+        # JSON answered in the message body, possibly inside a Markdown code block
+        payload = (message.get('content') or '').strip()
+        payload = re.sub(r'^```(?:json)?\s*|\s*```$', '', payload)
+    parsed = SentenceTranslationList.model_validate(json.loads(payload))
+    return [{'italian': pair.italian, 'russian': pair.russian} for pair in parsed.sentences]
+
+
+def validate_sentence_pairs(sentence_pairs, user_id: int | None = None) -> list[dict]:
+    """Clean generated sentence pairs and keep those passing Italian and Russian validation"""
+    result = get_sentence_validator().validate_batch(sentence_pairs)
+    summary = result.summary()
+    
+    logging.info(f"Validation Results for user {user_id}:")
+    logging.info(f"Valid sentence pairs: {summary['valid']}")
+    logging.info(f"Invalid sentence pairs: {summary['rejected']}")
+    
+    if result.rejected:
+        logging.info(f"Rejection reasons: {summary['reasons']}")
+        logging.info("Invalid sentence pairs details:")
+        for i, italian, russian, reasons in result.rejected:
+            logging.info(f"  Pair {i}: '{italian}' | '{russian}' ({', '.join(reasons)})")
+    return result.valid
+
+
+class SentencePairStreamParser:
+    """
+    Incremental splitter of streamed text into completed "Italian: ... | Russian: ..." lines.
+    """
+
+    def __init__(self):
+        self._buffer = ''
+
+    def feed(self, chunk: str) -> str:
+        """Add streamed text and return the lines it completed, or an empty string"""
+        self._buffer += chunk
+        if '\n' not in chunk:
+            return ''
+        complete, _, self._buffer = self._buffer.rpartition('\n')
+        return complete
+
+    def close(self) -> str:
+        """Return the last, unterminated line"""
+        rest, self._buffer = self._buffer, ''
+        return rest
+
+
+async def stream_and_store_sentences(user_id: int, llm_config) -> dict:
+    """Stream one generation and validate, store and announce the sentence pairs of every completed line while the rest is still being generated. Returns counts of pairs, valid, inserted and duplicates, also when the stream fails after sentences were stored; raises the stream's error if none were, and ValueError if no streamed pair was valid."""
+    client = get_llm_client()
+    validator = get_sentence_validator()
+    parser = SentencePairStreamParser()
+    totals = {'pairs': 0, 'valid': 0, 'inserted': 0, 'duplicates': 0}
+    rejection_reasons = Counter()
+    start_time = time.time()
+    first_sentence_time = None
+    # Parsed pairs are stored by a separate task, so database writes never run inside the guarded LLM call
+    pending: asyncio.Queue = asyncio.Queue()
+
+    async def store(pairs: list[dict]) -> None:
+        nonlocal first_sentence_time
+        result = validator.validate_batch(pairs)
+        totals['pairs'] += len(pairs)
+        totals['valid'] += len(result.valid)
+        rejection_reasons.update(result.reason_counts)
+        for _, italian, russian, reasons in result.rejected:
+            logging.debug(f"Invalid streamed pair: '{italian}' | '{russian}' ({', '.join(reasons)})")
+        if not result.valid:
+            return
+        inserted, duplicates = await store_sentence_pairs(result.valid)
+        totals['inserted'] += inserted
+        totals['duplicates'] += duplicates
+        if inserted:
+            if first_sentence_time is None:
+                first_sentence_time = time.time() - start_time
+                logging.info(f"⚡ First streamed sentence stored for user {user_id} after {first_sentence_time:.2f} seconds")
+            _notify_new_sentences()
+
+    async def store_pending() -> None:
+        while (pairs := await pending.get()) is not None:
+            try:
+                await store(pairs)
+            except Exception as e:
+                # The lines are already journaled, so the pairs can be replayed
+                logging.error(f"Failed to store streamed sentence pairs for user {user_id}: {e}")
+
+    def complete(text: str) -> None:
+        """Journal completed lines as soon as they arrive and queue their pairs for storage"""
+        if not text.strip():
+            return
+        _journal_response('text', text, user_id, llm_config.model_name)
+        pairs = _parse_sentence_pairs_text(text)
+        if pairs:
+            pending.put_nowait(pairs)
+
+    storer = asyncio.create_task(store_pending())
+    logging.info(f"🌐 Making streaming LLM API request to {llm_config.api_url} with model {llm_config.model_name}")
+    try:
+        try:
+            async with get_llm_call_guard().call() as usage:
+                stream = await client.openai.chat.completions.create(
+                    model=llm_config.model_name,
+                    messages=[
+                        {"role": "system", "content": SENTENCE_GENERATION_PROMPT + STREAMING_FORMAT_INSTRUCTIONS},
+                    ],
+                    stream=True,
+                    stream_options={"include_usage": True}
+                )
+                async for chunk in stream:
+                    # The last chunk carries the token usage and no choices
+                    if getattr(chunk, 'usage', None) is not None:
+                        usage.record(chunk)
+                    if not chunk.choices:
+                        continue
+                    content = chunk.choices[0].delta.content
+                    if content:
+                        complete(parser.feed(content))
+        finally:
+            # Lines received before a failure are still journaled and stored
+            complete(parser.close())
+            pending.put_nowait(None)
+            await storer
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        # Sentences stored before the failure already served this generation: a full request would pay for it twice
+        if not totals['inserted']:
+            raise
+        error_msg = str(e) if len(str(e)) < 100 else f"{str(e)[:100]}..."
+        logging.error(f"Streaming generation for user {user_id} failed after {totals['inserted']} sentences "
+                      f"were stored, keeping them: {error_msg}")
+
+    logging.info(f"🌐 Streaming LLM API request completed in {time.time() - start_time:.2f} seconds: "
+                 f"{totals['pairs']} pairs, {totals['valid']} valid, {totals['inserted']} stored, "
+                 f"{totals['duplicates']} duplicates")
+    if rejection_reasons:
+        logging.info(f"Rejection reasons: {dict(rejection_reasons.most_common())}")
+    if not totals['valid']:
+        raise ValueError(f"Streamed response contained no valid sentence pairs ({totals['pairs']} parsed)")
+    return totals
+
+
+async def sentence_replenishment(user_id: int) -> None:
+    """Generate Italian sentences with Russian translations using OpenAI API and store them in the database"""
+    logging.info(f"🔄 Starting sentence replenishment for user {user_id}")
+    start_time = time.time()
+    
+    # Get LLM configuration
+    llm_config = get_llm_config()
+    
+    # Check if API key is available
+    if not llm_config.api_key:
+        logging.error("LLM_API_KEY not found in environment variables, cannot generate sentences")
+        return
+    
+    async def generate_sentences_with_translations():
+        """Generate sentences with Russian translations using LLM"""
+        # Shared client, its HTTP connections are reused across replenishments
+        client = get_llm_client()
+        
+        # System prompt to guide the LLM
+        system_prompt = SENTENCE_GENERATION_PROMPT
         
         logging.info(f"Connecting to OpenAI API for user {user_id}")
         logging.info(f"Using model: {llm_config.model_name}")
@@ -219,17 +564,19 @@ Please generate from 25 to 35 sentence pairs in the format requested."""
         logging.debug(f"Response model: {SentenceList}")
         
         try:
-            # The instructor.patch modifies the client to support response_model parameter
-            # In newer versions of instructor, the create method is synchronous, not async
+            # The instructor client adds the response_model parameter
             logging.info(f"🌐 Making LLM API request to {llm_config.api_url} with model {llm_config.model_name}")
             api_start_time = time.time()
-            response: SentenceTranslationList = client.chat.completions.create(
-                model=llm_config.model_name,
-                response_model=SentenceTranslationList,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                ]
-            )
+            async with get_llm_call_guard().call() as usage:
+                response, completion = await client.instructor.chat.completions.create_with_completion(
+                    model=llm_config.model_name,
+                    response_model=SentenceTranslationList,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                    ],
+                    hooks=_completion_hooks(user_id, llm_config.model_name)
+                )
+                usage.record(completion)
             api_duration = time.time() - api_start_time
             logging.info(f"🌐 LLM API request completed in {api_duration:.2f} seconds")
             logging.debug(f"LLM API call successful, response type: {type(response)}")
@@ -245,45 +592,25 @@ Please generate from 25 to 35 sentence pairs in the format requested."""
             try:
                 logging.info(f"🌐 Making fallback LLM API request to {llm_config.api_url} with model {llm_config.model_name}")
                 fallback_start_time = time.time()
-                raw_response = client.chat.completions.create(
-                    model=llm_config.model_name,
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                    ]
-                )
+                async with get_llm_call_guard().call() as usage:
+                    raw_response = await client.openai.chat.completions.create(
+                        model=llm_config.model_name,
+                        messages=[
+                            {"role": "system", "content": system_prompt},
+                        ]
+                    )
+                    usage.record(raw_response)
                 fallback_duration = time.time() - fallback_start_time
                 logging.info(f"🌐 Fallback LLM API request completed in {fallback_duration:.2f} seconds")
                 content = raw_response.choices[0].message.content
                 logging.debug(f"Raw response content: {content}")
+                _journal_response('text', content, user_id, llm_config.model_name)
                 
                 # Parse the content manually into sentence pairs
-                # Assuming the LLM returns sentences in format: "Italian: ... | Russian: ..."
-                sentence_pairs = []
-                for line in content.split('\n'):
-                    line = line.strip()
-                    if line:
-                        # Try to parse Italian/Russian pairs
-                        import re
-                        italian_match = re.search(r'Italian:\s*(.+?)(?:\s*\|\s*Russian:|$)', line, re.IGNORECASE)
-                        russian_match = re.search(r'Russian:\s*(.+?)(?:\s*\||$)', line, re.IGNORECASE)
-                        
-                        if italian_match and russian_match:
-                            italian_sentence = italian_match.group(1).strip()
-                            russian_sentence = russian_match.group(1).strip()
-                            # Remove quotes if present
-                            italian_sentence = italian_sentence.strip('"\'')
-                            russian_sentence = russian_sentence.strip('"\'')
-                            if italian_sentence and russian_sentence:
-                                sentence_pairs.append({
-                                    'italian': italian_sentence,
-                                    'russian': russian_sentence
-                                })
+                sentence_pairs = _parse_sentence_pairs_text(content)
                 
                 # Convert to SentenceTranslationList format
-                response = SentenceTranslationList(sentences=[
-                    type('SentenceWithTranslation', (), {'italian': pair['italian'], 'russian': pair['russian']})
-                    for pair in sentence_pairs
-                ])
+                response = SentenceTranslationList(sentences=sentence_pairs)
                 logging.debug(f"Parsed {len(sentence_pairs)} sentence pairs manually")
                 
             except Exception as e2:
@@ -296,96 +623,40 @@ Please generate from 25 to 35 sentence pairs in the format requested."""
         return response.sentences
     
     try:
-        # Generate sentences with retry logic
-        # Run the synchronous LLM calls in a thread pool to avoid blocking the event loop
+        if llm_config.streaming:
+            # Sentences reach waiting users while the rest of the response is still being generated.
+            # Not retried: the full-response path below has its own retries.
+            try:
+                await stream_and_store_sentences(user_id, llm_config)
+                return
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                error_msg = str(e) if len(str(e)) < 100 else f"{str(e)[:100]}..."
+                logging.error(f"Streaming generation failed for user {user_id}, requesting a full response: {error_msg}")
+        
+        # Generate sentences with retry logic, awaiting the API without blocking the event loop
         logging.info(f"⏳ Starting LLM API call for user {user_id}...")
         llm_start_time = time.time()
-        
-        # Use a thread pool executor to run the blocking LLM calls
-        loop = asyncio.get_event_loop()
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            # Run the sync function in a thread
-            generated_sentence_pairs = await loop.run_in_executor(
-                executor,
-                execute_with_retry_sync,
-                generate_sentences_with_translations
-            )
+        generated_sentence_pairs = await execute_with_retry(generate_sentences_with_translations)
         
         llm_duration = time.time() - llm_start_time
         logging.info(f"✅ LLM API call completed for user {user_id} in {llm_duration:.2f} seconds")
         
         # Validate and clean sentences
-        valid_sentence_pairs = []
-        invalid_sentence_pairs = []
-        
-        for i, sentence_pair in enumerate(generated_sentence_pairs, 1):
-            # Handle both object and dict formats
-            if hasattr(sentence_pair, 'italian') and hasattr(sentence_pair, 'russian'):
-                italian_sentence = sentence_pair.italian
-                russian_sentence = sentence_pair.russian
-            elif isinstance(sentence_pair, dict):
-                italian_sentence = sentence_pair.get('italian', '')
-                russian_sentence = sentence_pair.get('russian', '')
-            else:
-                invalid_sentence_pairs.append((i, str(sentence_pair)))
-                continue
-            
-            cleaned_italian = clean_sentence(italian_sentence)
-            cleaned_russian = clean_sentence(russian_sentence)
-            
-            # Validate both Italian and Russian sentences
-            if (is_valid_italian_sentence(cleaned_italian) and
-                is_valid_russian_sentence(cleaned_russian)):
-                valid_sentence_pairs.append({
-                    'italian': cleaned_italian,
-                    'russian': cleaned_russian
-                })
-                logging.debug(f"Valid sentence pair {i}: '{cleaned_italian}' | '{cleaned_russian}'")
-            else:
-                invalid_sentence_pairs.append((i, cleaned_italian, cleaned_russian))
-                logging.debug(f"Invalid sentence pair {i}: '{cleaned_italian}' | '{cleaned_russian}'")
-        
-        logging.info(f"Validation Results for user {user_id}:")
-        logging.info(f"Valid sentence pairs: {len(valid_sentence_pairs)}")
-        logging.info(f"Invalid sentence pairs: {len(invalid_sentence_pairs)}")
-        
-        if invalid_sentence_pairs:
-            logging.info("Invalid sentence pairs details:")
-            for i, italian, russian in invalid_sentence_pairs:
-                logging.info(f"  Pair {i}: '{italian}' | '{russian}'")
+        valid_sentence_pairs = validate_sentence_pairs(generated_sentence_pairs, user_id)
         
         # Store valid sentences in the database
         if valid_sentence_pairs:
             logging.info(f"💾 Starting database storage for user {user_id}...")
             db_start_time = time.time()
-            db_config = get_database_config()
-            conn = await asyncpg.connect(
-                host=db_config.host, port=db_config.port, database=db_config.name,
-                user=db_config.user, password=db_config.password
-            )
             try:
-                for pair in valid_sentence_pairs:
-                    italian_sentence = pair['italian']
-                    russian_sentence = pair['russian']
-                    
-                    # Check if sentence already exists to avoid duplicates
-                    existing = await conn.fetchrow(
-                        "SELECT id FROM italian_sentences WHERE sentence = $1",
-                        italian_sentence
-                    )
-                    if not existing:
-                        await conn.execute(
-                            "INSERT INTO italian_sentences (sentence, sentence_rus) VALUES ($1, $2)",
-                            italian_sentence, russian_sentence
-                        )
-                        logging.debug(f"Added sentence pair to database: '{italian_sentence}' | '{russian_sentence}'")
-                    else:
-                        logging.debug(f"Skipped duplicate sentence: '{italian_sentence}'")
-                
-                logging.info(f"✅ Successfully stored {len(valid_sentence_pairs)} valid sentence pairs in database for user {user_id}")
+                inserted, duplicates = await store_sentence_pairs(valid_sentence_pairs)
+                logging.info(f"✅ Stored {inserted} new sentence pairs in database for user {user_id} ({duplicates} duplicates skipped)")
+                if inserted:
+                    _notify_new_sentences()
                 
             finally:
-                await conn.close()
                 db_duration = time.time() - db_start_time
                 logging.info(f"💾 Database storage completed for user {user_id} in {db_duration:.2f} seconds")
     
@@ -396,4 +667,7 @@ Please generate from 25 to 35 sentence pairs in the format requested."""
     
     finally:
         total_duration = time.time() - start_time
-        logging.info(f"🔚 Sentence replenishment completed for user {user_id} in {total_duration:.2f} seconds")
\ No newline at end of file
+        logging.info(f"🔚 Sentence replenishment completed for user {user_id} in {total_duration:.2f} seconds")
+        llm_call_metrics = get_llm_call_metrics()
+        if llm_call_metrics is not None:
+            logging.info("LLM call metrics: " + ", ".join(f"{key}={value}" for key, value in llm_call_metrics.items()))
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""
+Per-user progress counters module for Parla Italiano Bot.
+
+This module keeps the user_progress table (see migrations/010_user_progress.sql)
+in step with result writes: attempts, successes, distinct solved sentences and
+today's counters per user and exercise type. Personal statistics and the
+replenishment check read one row by primary key instead of scanning results.
+"""
+
+import sys
+import os
+from typing import Iterable, Tuple
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from .daily_stats import EXERCISE_TYPES
+
+# A success counts as a new solve only if neither the results table nor the archive
+# summary of detached partitions holds an earlier success, so the upsert must run
+# before the rows themselves become visible (same snapshot or earlier in the same
+# transaction). The results probe only reaches the partitions still attached, see
+# migrations/017_results_live_since.sql. Rows are locked in key order to avoid deadlocks.
+_UPSERT_TEMPLATE = """
+    INSERT INTO user_progress (
+        user_id, exercise_type, attempts, successes, solved_count,
+        today, today_attempts, today_successes
+    )
+    SELECT
+        v.user_id,
+        {exercise_type},
+        COUNT(*),
+        COUNT(*) FILTER (WHERE v.is_success),
+        COUNT(DISTINCT v.italian_sentence_id) FILTER (WHERE v.first_solve),
+        CURRENT_DATE,
+        COUNT(*) FILTER (WHERE v.timestamp >= CURRENT_DATE::timestamptz AND v.timestamp < (CURRENT_DATE + 1)::timestamptz),
+        COUNT(*) FILTER (WHERE v.timestamp >= CURRENT_DATE::timestamptz AND v.timestamp < (CURRENT_DATE + 1)::timestamptz AND v.is_success)
+    FROM (
+        SELECT v.user_id, v.italian_sentence_id, v.is_success, v.timestamp,
+               v.is_success AND NOT EXISTS (
+                   SELECT 1 FROM {table} r
+                   WHERE r.user_id = v.user_id AND r.italian_sentence_id = v.italian_sentence_id AND r.is_success
+                     AND r.timestamp >= results_live_since('{table}')
+               ) AND NOT EXISTS (
+                   SELECT 1 FROM results_archive a
+                   WHERE a.user_id = v.user_id AND a.italian_sentence_id = v.italian_sentence_id
+                     AND a.exercise_type = {exercise_type} AND a.successes > 0
+               ) AS first_solve
+        FROM {source}
+    ) v
+    GROUP BY v.user_id
+    ORDER BY v.user_id
+    ON CONFLICT (user_id, exercise_type) DO UPDATE SET
+        attempts = user_progress.attempts + EXCLUDED.attempts,
+        successes = user_progress.successes + EXCLUDED.successes,
+        solved_count = user_progress.solved_count + EXCLUDED.solved_count,
+        today_attempts = EXCLUDED.today_attempts
+            + CASE WHEN user_progress.today = EXCLUDED.today THEN user_progress.today_attempts ELSE 0 END,
+        today_successes = EXCLUDED.today_successes
+            + CASE WHEN user_progress.today = EXCLUDED.today THEN user_progress.today_successes ELSE 0 END,
+        today = EXCLUDED.today
+"""
+
+
+def user_progress_upsert(source: str, exercise_type: str, table: str) -> str:
+    """
+    Build the progress upsert for rows selected from `source`.
+
+    Args:
+        source: Relation aliased as v with user_id, italian_sentence_id, is_success and timestamp columns
+        exercise_type: SQL expression for the exercise type
+        table: Results table checked for earlier successes
+
+    Returns:
+        SQL statement adding the source rows to user_progress
+    """
+    return _UPSERT_TEMPLATE.format(source=source, exercise_type=exercise_type, table=table)
+
+
+_BATCH_SOURCE = (
+    "unnest($2::bigint[], $3::int[], $4::boolean[], $5::timestamptz[])"
+    " AS v(user_id, italian_sentence_id, is_success, timestamp)"
+)
+
+_BATCH_UPSERTS = {
+    table: user_progress_upsert(_BATCH_SOURCE, "$1::text", table)
+    for table in EXERCISE_TYPES
+}
+
+
+async def update_user_progress(conn, table: str, records: Iterable[Tuple[int, int, bool, datetime]]) -> None:
+    """
+    Add a batch of result rows to the per-user counters.
+
+    Must run before the rows are written, inside the same transaction.
+
+    Args:
+        conn: Connection inside the transaction that writes the results
+        table: Results table the rows are written to
+        records: (user_id, sentence_id, is_success, timestamp) tuples
+    """
+    records = list(records)
+    if not records:
+        return
+    await conn.execute(
+        _BATCH_UPSERTS[table],
+        EXERCISE_TYPES[table],
+        [record[0] for record in records],
+        [record[1] for record in records],
+        [record[2] for record in records],
+        [record[3] for record in records]
+    )
+
+
+async def get_user_progress(conn, user_id: int, exercise_type: str):
+    """
+    Get the counters of one user and exercise type.
+
+    Args:
+        conn: Database connection
+        user_id: Telegram user ID
+        exercise_type: One of the EXERCISE_TYPES values
+
+    Returns:
+        user_progress row with today's counters reset if the stored day is past, or None
+    """
+    return await conn.fetchrow("""
+        SELECT
+            attempts,
+            successes,
+            solved_count,
+            CASE WHEN today = CURRENT_DATE THEN today_attempts ELSE 0 END AS today_attempts,
+            CASE WHEN today = CURRENT_DATE THEN today_successes ELSE 0 END AS today_successes
+        FROM user_progress
+        WHERE user_id = $1 AND exercise_type = $2
+    """, user_id, exercise_type)
@@ -2,63 +2,126 @@
 User management module for Parla Italiano Bot.
 
 This module handles user profile operations including creation, updates, and access tracking.
+Profiles are written with a single upsert and only when they change; last_access_at
+updates for unchanged profiles are collected in memory and written in batches.
 """
 
-import asyncpg
+import asyncio
+import logging
 import sys
 import os
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from aiogram.types import User
 
-# Use the same mock config function from connection.py
-def get_database_config():
-    """Get database configuration, with fallback for testing"""
-    try:
-        from config import get_database_config as real_get_database_config
-        return real_get_database_config()
-    except FileNotFoundError:
-        # Return mock config for testing when config.ini doesn't exist
-        class MockDatabaseConfig:
-            host = "localhost"
-            port = 5432
-            name = "parla_italiano"
-            user = "parla_user"
-            password = ""
-        return MockDatabaseConfig()
+from .connection import acquire_connection
+
+# Last profile written to the database for each recently seen user, least recently used first.
+# A user evicted from it just goes through the upsert once more.
+_known_profiles: "OrderedDict[int, Tuple]" = OrderedDict()
+
+# Users kept in _known_profiles, set by start_access_flusher()
+_max_known_profiles = 10000
+
+# Latest access time per user that has not been written yet
+_pending_access: Dict[int, datetime] = {}
+
+# Background task writing _pending_access, created by start_access_flusher()
+_access_flush_task: Optional[asyncio.Task] = None
+
+
+def _profile_of(user: User) -> Tuple:
+    """Profile fields stored in the users table"""
+    return (user.first_name, user.last_name, user.username, user.language_code, user.is_bot, user.is_premium)
 
 
 async def get_or_create_user(user: User) -> int:
-    """Get or create user record. Updates profile fields and last_access_at if exists, inserts with first_access_at if new."""
-    db_config = get_database_config()
-    conn = await asyncpg.connect(
-        host=db_config.host, port=db_config.port, database=db_config.name,
-        user=db_config.user, password=db_config.password
-    )
+    """Get or create user record. Upserts profile fields and last_access_at when the profile changed, otherwise defers the last_access_at write."""
+    profile = _profile_of(user)
+    if _access_flush_task is not None and _known_profiles.get(user.id) == profile:
+        _known_profiles.move_to_end(user.id)
+        _pending_access[user.id] = datetime.now(timezone.utc)
+        return user.id
+
+    async with acquire_connection() as conn:
+        await conn.execute("""
+            INSERT INTO users (
+                user_id, first_name, last_name, username, language_code,
+                is_bot, is_premium, first_access_at, last_access_at
+            ) VALUES ($1, $2, $3, $4, $5, $6, $7, NOW(), NOW())
+            ON CONFLICT (user_id) DO UPDATE SET
+                first_name = EXCLUDED.first_name,
+                last_name = EXCLUDED.last_name,
+                username = EXCLUDED.username,
+                language_code = EXCLUDED.language_code,
+                is_bot = EXCLUDED.is_bot,
+                is_premium = EXCLUDED.is_premium,
+                last_access_at = EXCLUDED.last_access_at
+        """, user.id, *profile)
+    _known_profiles[user.id] = profile
+    _known_profiles.move_to_end(user.id)
+    while len(_known_profiles) > _max_known_profiles:
+        _known_profiles.popitem(last=False)
+    _pending_access.pop(user.id, None)
+    return user.id
+
+
+async def flush_user_access() -> int:
+    """Write deferred last_access_at values in one statement. Returns the number of users flushed."""
+    if not _pending_access:
+        return 0
+    pending = dict(_pending_access)
+    _pending_access.clear()
     try:
-        # Check if user exists
-        row = await conn.fetchrow("SELECT user_id FROM users WHERE user_id = $1", user.id)
-        if row:
-            # Update existing user profile and last access
+        async with acquire_connection() as conn:
             await conn.execute("""
-                UPDATE users SET
-                    first_name = $2,
-                    last_name = $3,
-                    username = $4,
-                    language_code = $5,
-                    is_bot = $6,
-                    is_premium = $7,
-                    last_access_at = NOW()
-                WHERE user_id = $1
-            """, user.id, user.first_name, user.last_name, user.username, user.language_code, user.is_bot, user.is_premium)
-        else:
-            # Create new user
-            await conn.execute("""
-                INSERT INTO users (
-                    user_id, first_name, last_name, username, language_code,
-                    is_bot, is_premium, first_access_at, last_access_at
-                ) VALUES ($1, $2, $3, $4, $5, $6, $7, NOW(), NOW())
-            """, user.id, user.first_name, user.last_name, user.username, user.language_code, user.is_bot, user.is_premium)
-        return user.id
-    finally:
-        await conn.close()
\ No newline at end of file
+                UPDATE users u SET last_access_at = v.last_access_at
+                FROM unnest($1::bigint[], $2::timestamptz[]) AS v(user_id, last_access_at)
+                WHERE u.user_id = v.user_id AND u.last_access_at < v.last_access_at
+            """, list(pending.keys()), list(pending.values()))
+    except Exception:
+        # Put the values back unless a newer access arrived meanwhile
+        for user_id, accessed_at in pending.items():
+            _pending_access.setdefault(user_id, accessed_at)
+        raise
+    return len(pending)
+
+
+async def _flush_access_periodically(interval: float) -> None:
+    """Flush deferred access times every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await flush_user_access()
+        except Exception as e:
+            logging.error(f"Failed to flush user access times: {e}")
+
+
+def start_access_flusher(interval: float = 60.0, max_cached_users: int = 10000) -> None:
+    """Start batching last_access_at writes for users whose profile is unchanged, remembering the profiles of at most `max_cached_users` users"""
+    global _access_flush_task, _max_known_profiles
+    _max_known_profiles = max_cached_users
+    if _access_flush_task is None:
+        _access_flush_task = asyncio.create_task(_flush_access_periodically(interval))
+        logging.info(f"User access flusher started (interval={interval}s)")
+
+
+async def stop_access_flusher() -> None:
+    """Stop the periodic flusher and write any remaining access times"""
+    global _access_flush_task
+    if _access_flush_task is None:
+        return
+    task, _access_flush_task = _access_flush_task, None
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    try:
+        await flush_user_access()
+    except Exception as e:
+        logging.error(f"Failed to flush user access times on shutdown: {e}")
+    logging.info("User access flusher stopped")
@@ -0,0 +1,183 @@
+"""
+Sentence validation for Parla Italiano Bot.
+
+The validation rules (allowed characters per language, word count, no
+repeated words) are compiled once from ValidationConfig into a
+SentenceValidator: each character set becomes one precompiled regular
+expression and every sentence is tokenized a single time. A whole batch of
+generated or imported pairs is validated in one call, and every rejected
+pair carries the rules it broke so failed generations can be explained.
+"""
+
+import logging
+import re
+import sys
+import os
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# Rejection reasons reported per pair, prefixed with the language they apply to
+TOO_FEW_WORDS = 'too_few_words'
+TOO_MANY_WORDS = 'too_many_words'
+DUPLICATE_WORDS = 'duplicate_words'
+INVALID_CHARACTERS = 'invalid_characters'
+MALFORMED_PAIR = 'malformed_pair'
+
+
+def _compile_character_check(characters: Iterable[str]) -> 're.Pattern[str]':
+    """Compile a pattern matching any character outside the allowed set."""
+    allowed = ''.join(re.escape(char) for char in sorted(characters))
+    return re.compile(f"[^{allowed}]" if allowed else r"[\s\S]")
+
+
+class BatchValidationResult:
+    """
+    Outcome of validating a batch of sentence pairs.
+    """
+
+    def __init__(self):
+        self.valid: List[Dict[str, str]] = []
+        # (position, italian, russian, reasons) for every rejected pair, positions start at 1
+        self.rejected: List[Tuple[int, str, str, List[str]]] = []
+        self.reason_counts: Counter = Counter()
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Get the batch counters.
+
+        Returns:
+            Dictionary with valid/rejected totals and the number of pairs failing each rule
+        """
+        return {
+            'valid': len(self.valid),
+            'rejected': len(self.rejected),
+            'reasons': dict(self.reason_counts.most_common()),
+        }
+
+
+class SentenceValidator:
+    """
+    Italian/Russian sentence rules compiled from the validation configuration.
+    """
+
+    def __init__(self, italian_characters: Iterable[str], russian_characters: Iterable[str],
+                 min_words: int = 3, max_words: int = 10):
+        """
+        Compile the character checks.
+
+        Args:
+            italian_characters: Characters allowed in lowercased Italian sentences
+            russian_characters: Characters allowed in lowercased Russian sentences
+            min_words: Minimum number of words in an Italian sentence
+            max_words: Maximum number of words in an Italian sentence
+        """
+        self._italian_invalid = _compile_character_check(italian_characters)
+        self._russian_invalid = _compile_character_check(russian_characters)
+        self.min_words = min_words
+        self.max_words = max_words
+
+    @classmethod
+    def from_config(cls, validation_config) -> 'SentenceValidator':
+        """Build a validator from a ValidationConfig."""
+        return cls(validation_config.italian_characters, validation_config.russian_characters)
+
+    def italian_errors(self, sentence: str) -> List[str]:
+        """
+        Check an Italian sentence: 3-10 words, no repeated word (case-insensitive), allowed characters only.
+
+        Args:
+            sentence: Cleaned sentence
+
+        Returns:
+            Broken rules, empty if the sentence is valid
+        """
+        lowered = sentence.lower()
+        words = lowered.split()
+        errors = []
+        if len(words) < self.min_words:
+            errors.append(TOO_FEW_WORDS)
+        elif len(words) > self.max_words:
+            errors.append(TOO_MANY_WORDS)
+        if len(words) != len(set(words)):
+            errors.append(DUPLICATE_WORDS)
+        if self._italian_invalid.search(lowered):
+            errors.append(INVALID_CHARACTERS)
+        return errors
+
+    def russian_errors(self, sentence: str) -> List[str]:
+        """
+        Check a Russian sentence: allowed characters only.
+
+        Args:
+            sentence: Cleaned sentence
+
+        Returns:
+            Broken rules, empty if the sentence is valid
+        """
+        if self._russian_invalid.search(sentence.lower()):
+            return [INVALID_CHARACTERS]
+        return []
+
+    def is_italian_text(self, text: str) -> bool:
+        """Check that a word or text uses only allowed Italian characters."""
+        return not self._italian_invalid.search(text.lower())
+
+    def validate_batch(self, sentence_pairs: Iterable[Any]) -> BatchValidationResult:
+        """
+        Clean and validate sentence pairs.
+
+        Args:
+            sentence_pairs: Objects with `italian`/`russian` attributes or dictionaries with those keys
+
+        Returns:
+            BatchValidationResult with the cleaned valid pairs and the reasons for every rejection
+        """
+        result = BatchValidationResult()
+        for position, sentence_pair in enumerate(sentence_pairs, 1):
+            if hasattr(sentence_pair, 'italian') and hasattr(sentence_pair, 'russian'):
+                italian, russian = sentence_pair.italian, sentence_pair.russian
+            elif isinstance(sentence_pair, dict):
+                italian, russian = sentence_pair.get('italian', ''), sentence_pair.get('russian', '')
+            else:
+                result.rejected.append((position, str(sentence_pair), '', [MALFORMED_PAIR]))
+                result.reason_counts[MALFORMED_PAIR] += 1
+                continue
+            if not isinstance(italian, str) or not isinstance(russian, str):
+                result.rejected.append((position, str(italian), str(russian), [MALFORMED_PAIR]))
+                result.reason_counts[MALFORMED_PAIR] += 1
+                continue
+
+            # Same normalization as clean_sentence(), from one split per sentence
+            italian = ' '.join(italian.split())
+            russian = ' '.join(russian.split())
+            reasons = [f"italian_{error}" for error in self.italian_errors(italian)]
+            reasons += [f"russian_{error}" for error in self.russian_errors(russian)]
+            if reasons:
+                result.rejected.append((position, italian, russian, reasons))
+                result.reason_counts.update(reasons)
+            else:
+                result.valid.append({'italian': italian, 'russian': russian})
+        return result
+
+
+# Validator and the validation configuration object it was compiled from
+_validator: Optional[SentenceValidator] = None
+# Character sets _validator was compiled from; compared by value, since a config without
+# config.ini is a new object on every get_validation_config() call
+_validator_characters: Optional[Tuple[Set[str], Set[str]]] = None
+
+
+def get_sentence_validator() -> SentenceValidator:
+    """Get the validator for the current validation configuration, recompiling only when its character sets change; callers validating many sentences should hold on to it"""
+    global _validator, _validator_characters
+    from .base import get_validation_config
+    validation_config = get_validation_config()
+    characters = (validation_config.italian_characters, validation_config.russian_characters)
+    if _validator is None or characters != _validator_characters:
+        _validator = SentenceValidator.from_config(validation_config)
+        _validator_characters = characters
+        logging.debug("Compiled sentence validator from the validation configuration")
+    return _validator
@@ -6,7 +6,8 @@ must arrange scrambled Italian words to form a correct sentence.
 """
 
 import random
-from typing import List, Tuple, Optional
+from collections import OrderedDict
+from typing import Dict, List, Tuple, Optional
 from aiogram import types
 from aiogram.types import CallbackQuery, Message
 
@@ -20,23 +21,27 @@ sys.path.insert(0, project_root)
 
 try:
     from src.database import (
-        get_random_sentence,
         get_random_encouraging_phrase,
         get_random_error_phrase,
         get_random_exercise_prompt,
         store_sentence_result,
-        get_or_create_user
+        get_or_create_user,
+        get_last_attempted_sentence,
+        get_sentence_translation
     )
+    from src.state.sentence_deck import SentenceDeck
 except ImportError:
     # Fallback for Docker environment
     from database import (
-        get_random_sentence,
         get_random_encouraging_phrase,
         get_random_error_phrase,
         get_random_exercise_prompt,
         store_sentence_result,
-        get_or_create_user
+        get_or_create_user,
+        get_last_attempted_sentence,
+        get_sentence_translation
     )
+    from state.sentence_deck import SentenceDeck
 
 
 class SentenceOrderingExercise:
@@ -44,14 +49,58 @@ class SentenceOrderingExercise:
     Handles sentence word ordering exercises for Italian language learning.
     """
     
-    def __init__(self, learning_state):
+    def __init__(self, learning_state, sentence_deck: Optional[SentenceDeck] = None,
+                 max_cached_users: int = 10000):
         """
         Initialize the sentence ordering exercise.
         
         Args:
             learning_state: LearningState instance for managing user progress
+            sentence_deck: SentenceDeck instance with prefetched sentences per user
+            max_cached_users: Number of most recent users whose last attempt is kept in memory
         """
         self.learning_state = learning_state
+        self.sentence_deck = sentence_deck if sentence_deck is not None else SentenceDeck()
+        self.max_cached_users = max_cached_users
+        # Last answered sentence per user, least recent first: sentence_id, italian and (once looked up) russian.
+        # Users dropped from it are answered from the persisted last-attempt pointer.
+        self._last_attempted: "OrderedDict[int, Dict]" = OrderedDict()
+    
+    def _record_attempt(self, user_id: int, sentence_id: int, sentence: str) -> None:
+        """
+        Remember the sentence a user just answered.
+        
+        Args:
+            user_id: Telegram user ID
+            sentence_id: Italian sentence ID
+            sentence: Italian sentence text
+        """
+        self._last_attempted[user_id] = {'sentence_id': sentence_id, 'italian': sentence, 'russian': None}
+        self._last_attempted.move_to_end(user_id)
+        while len(self._last_attempted) > self.max_cached_users:
+            self._last_attempted.popitem(last=False)
+    
+    async def get_last_attempted_sentence(self, user_id: int) -> Optional[Dict[str, str]]:
+        """
+        Get the last attempted sentence and its Russian translation for a user.
+        
+        Answers from memory for sentences answered since startup, otherwise from
+        the persisted last-attempt pointer (which also covers other exercises).
+        
+        Args:
+            user_id: Telegram user ID
+            
+        Returns:
+            Dictionary with 'italian' and 'russian' keys, or None if nothing was attempted
+        """
+        entry = self._last_attempted.get(user_id)
+        if entry is None:
+            return await get_last_attempted_sentence(user_id)
+        if not entry['russian']:
+            # Translations can be filled in later, so only a non-empty one is kept
+            translation = await get_sentence_translation(entry['sentence_id'])
+            entry['russian'] = translation['russian'] if translation else ''
+        return {'italian': entry['italian'], 'russian': entry['russian']}
     
     def create_word_buttons(self, shuffled_words: List[str]) -> types.InlineKeyboardMarkup:
         """
@@ -92,8 +141,8 @@ class SentenceOrderingExercise:
             message_or_callback: Telegram message or callback query
             user_id: Telegram user ID
         """
-        # Get random sentence and store original order
-        sentence_id, original_sentence = await get_random_sentence(user_id)
+        # Get the next prefetched sentence and store original order
+        sentence_id, original_sentence = await self.sentence_deck.next_sentence(user_id)
         words = original_sentence.split()
         random.shuffle(words)  # Shuffle once and store this order
         
@@ -203,6 +252,7 @@ class SentenceOrderingExercise:
         # Store the result
         sentence_id = self.learning_state.get_sentence_id(user_id)
         if sentence_id is not None:
+            self._record_attempt(user_id, sentence_id, self.learning_state.get_original_sentence(user_id))
             await store_sentence_result(user_id, sentence_id, True)
     
     async def _handle_incorrect_answer(self, callback: CallbackQuery, user_id: int, original_words: List[str], selected_order: List[str]) -> None:
@@ -229,6 +279,7 @@ class SentenceOrderingExercise:
         # Store the result
         sentence_id = self.learning_state.get_sentence_id(user_id)
         if sentence_id is not None:
+            self._record_attempt(user_id, sentence_id, self.learning_state.get_original_sentence(user_id))
             await store_sentence_result(user_id, sentence_id, False)
     
     async def _update_exercise_progress(self, callback: CallbackQuery, user_id: int) -> None:
@@ -6,5 +6,6 @@ including exercise progress and session tracking.
 """
 
 from .learning_state import LearningState
+from .sentence_deck import SentenceDeck
 
-__all__ = ['LearningState']
\ No newline at end of file
+__all__ = ['LearningState', 'SentenceDeck']
\ No newline at end of file
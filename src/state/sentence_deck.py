@@ -0,0 +1,184 @@
+"""
+Prefetched exercise deck for Parla Italiano Bot.
+
+This module keeps, per user, the next few unsolved sentences in memory so that
+starting a new exercise is a memory pop instead of a database round trip.
+Decks are fetched in one batched query and refilled in the background, right
+away for users running out of sentences when new ones are added to the corpus.
+Only the most recently active users are kept; the least recently active one
+is forgotten when the limit is reached and simply gets a fresh deck on return.
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import sys
+import os
+
+# Add the project root to Python path for imports
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+try:
+    from src.database import get_unsolved_sentences, get_random_sentence
+except ImportError:
+    # Fallback for Docker environment
+    from database import get_unsolved_sentences, get_random_sentence
+
+
+class SentenceDeck:
+    """
+    Per-user queue of prefetched unsolved sentences.
+    """
+
+    def __init__(self, deck_size: int = 20, low_water_mark: int = 5, max_users: int = 10000):
+        """
+        Initialize the deck storage.
+
+        Args:
+            deck_size: Number of sentences fetched per refill
+            low_water_mark: Remaining size below which a background refill starts
+            max_users: Number of most recently active users whose decks are kept
+        """
+        self.deck_size = deck_size
+        self.low_water_mark = low_water_mark
+        self.max_users = max_users
+        # Users by last activity, least recent first
+        self._active: "OrderedDict[int, None]" = OrderedDict()
+        self._decks: Dict[int, Deque[Tuple[int, str]]] = {}
+        self._refills: Dict[int, asyncio.Task] = {}
+        self._last_served: Dict[int, int] = {}
+
+    async def next_sentence(self, user_id: int) -> Tuple[Optional[int], str]:
+        """
+        Pop the next sentence for a user.
+
+        Args:
+            user_id: Telegram user ID
+
+        Returns:
+            Tuple of sentence ID and sentence text
+        """
+        self._touch(user_id)
+        deck = self._decks.get(user_id)
+        if not deck:
+            await self._refill(user_id)
+            deck = self._decks.get(user_id)
+
+        if not deck:
+            # No unsolved sentences left, fall back to any sentence
+            sentence_id, sentence = await get_random_sentence(user_id)
+        else:
+            sentence_id, sentence = deck.popleft()
+            if len(deck) < self.low_water_mark:
+                self._schedule_refill(user_id)
+
+        if sentence_id is not None:
+            self._last_served[user_id] = sentence_id
+        return sentence_id, sentence
+
+    def remaining(self, user_id: int) -> int:
+        """
+        Get the number of prefetched sentences left for a user.
+
+        Args:
+            user_id: Telegram user ID
+
+        Returns:
+            Number of sentences in the user's deck
+        """
+        deck = self._decks.get(user_id)
+        return len(deck) if deck else 0
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        """
+        Drop prefetched sentences so that the next pop fetches a fresh deck.
+
+        Args:
+            user_id: Telegram user ID, or None to invalidate every deck
+        """
+        user_ids = list(self._decks) if user_id is None else [user_id]
+        for uid in user_ids:
+            self._decks.pop(uid, None)
+            task = self._refills.pop(uid, None)
+            if task is not None and not task.done():
+                task.cancel()
+
+    def refresh_waiting(self) -> None:
+        """
+        Refill the decks of users who are running out of sentences.
+
+        Called when new sentences are stored: users with an empty or
+        nearly empty deck get them right away, fuller decks are left alone.
+        """
+        for user_id, deck in list(self._decks.items()):
+            if len(deck) < self.low_water_mark:
+                self._schedule_refill(user_id)
+
+    def discard(self, user_id: int) -> None:
+        """
+        Forget everything held for a user.
+
+        Args:
+            user_id: Telegram user ID
+        """
+        self.invalidate(user_id)
+        self._last_served.pop(user_id, None)
+        self._active.pop(user_id, None)
+
+    def _touch(self, user_id: int) -> None:
+        """Mark a user as the most recently active, forgetting the least recent ones beyond max_users."""
+        self._active[user_id] = None
+        self._active.move_to_end(user_id)
+        while len(self._active) > self.max_users:
+            evicted, _ = self._active.popitem(last=False)
+            self.discard(evicted)
+
+    def _schedule_refill(self, user_id: int) -> None:
+        """Start a background refill unless one is already in flight."""
+        task = self._refills.get(user_id)
+        if task is None or task.done():
+            self._refills[user_id] = asyncio.create_task(self._refill_in_background(user_id))
+
+    async def _refill_in_background(self, user_id: int) -> None:
+        """Background refill wrapper that logs instead of raising."""
+        try:
+            await self._fetch(user_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Failed to refill sentence deck for user {user_id}: {e}")
+        finally:
+            if self._refills.get(user_id) is asyncio.current_task():
+                self._refills.pop(user_id, None)
+
+    async def _refill(self, user_id: int) -> None:
+        """Refill in the foreground, joining an in-flight background refill if any."""
+        task = self._refills.get(user_id)
+        if task is not None and not task.done():
+            try:
+                await asyncio.shield(task)
+            except asyncio.CancelledError:
+                # Refill was cancelled by invalidation, fetch a fresh deck below
+                if asyncio.current_task().cancelling():
+                    raise
+            if self._decks.get(user_id):
+                return
+        await self._fetch(user_id)
+
+    async def _fetch(self, user_id: int) -> None:
+        """Fetch sentences not already held for the user and append them to the deck."""
+        deck = self._decks.setdefault(user_id, deque())
+        limit = self.deck_size - len(deck)
+        if limit <= 0:
+            return
+        held: List[int] = [sentence_id for sentence_id, _ in deck]
+        if user_id in self._last_served:
+            held.append(self._last_served[user_id])
+        sentences = await get_unsolved_sentences(user_id, limit, held)
+        # The deck may have been invalidated while the query was running
+        if self._decks.get(user_id) is deck:
+            deck.extend(sentences)
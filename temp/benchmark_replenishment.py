@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Benchmark sentence_replenishment end to end against the local LLM stub.
+Starts temp/llm_stub_server.py in-process, points the shared LLM client at it and
+runs rounds of concurrent replenishments. Sentences are inserted into scratch copies
+of italian_sentences in a separate schema (dropped at the end), so the benchmark
+measures generated sentences per second, time to the first stored sentence,
+database insert time and event-loop lag without calling the paid model.
+Compare --streaming with the default full-response path. Do not run against a busy production database.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+import asyncpg
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from llm_stub_server import add_stub_arguments, settings_from_args, start_stub_server
+from src.database import base, connection, llm_limits, sentences
+from src.database.base import LLMClient
+from src.database.llm_limits import LLMCallGuard
+
+
+# Load environment variables
+load_dotenv()
+
+SCHEMA = "bench_replenishment"
+
+
+class StubLLMConfig:
+    api_key = "stub-key"
+    api_url = ""
+    model_name = "stub-model"
+    streaming = False
+
+
+async def create_scratch_pool() -> asyncpg.Pool:
+    """Pool whose search_path resolves italian_sentences to a scratch copy"""
+    admin = await asyncpg.connect(
+        host=os.getenv("DB_HOST", "localhost"),
+        port=int(os.getenv("DB_PORT", 5432)),
+        database=os.getenv("DB_NAME", "parla_italiano"),
+        user=os.getenv("DB_USER", "parla_user"),
+        password=os.getenv("DB_PASSWORD", "")
+    )
+    try:
+        await admin.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await admin.execute(f"CREATE SCHEMA {SCHEMA}")
+        await admin.execute(f"CREATE TABLE {SCHEMA}.italian_sentences (LIKE public.italian_sentences INCLUDING ALL)")
+    finally:
+        await admin.close()
+    return await asyncpg.create_pool(
+        host=os.getenv("DB_HOST", "localhost"),
+        port=int(os.getenv("DB_PORT", 5432)),
+        database=os.getenv("DB_NAME", "parla_italiano"),
+        user=os.getenv("DB_USER", "parla_user"),
+        password=os.getenv("DB_PASSWORD", ""),
+        min_size=1, max_size=5,
+        server_settings={'search_path': f"{SCHEMA}, public"}
+    )
+
+
+async def drop_scratch_schema(pool: asyncpg.Pool) -> None:
+    async with pool.acquire() as conn:
+        await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+
+
+async def measure_loop_lag(interval: float, lags: list, stop: asyncio.Event) -> None:
+    """Record how late a periodic wake-up runs, in milliseconds"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, loop.time() - expected) * 1000)
+
+
+def percentile(values: list, share: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))] if values else 0.0
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=4, help="Replenishments started at the same time")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--no-db", action="store_true", help="Skip inserts (measures the LLM path only)")
+    parser.add_argument("--streaming", action="store_true", help="Stream generations and store pairs line by line")
+    parser.add_argument("--requests-per-minute", type=float, default=6000)
+    parser.add_argument("--tokens-per-minute", type=float, default=10_000_000)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    runner, stub_url, stub_stats = await start_stub_server(settings_from_args(args))
+    StubLLMConfig.api_url = stub_url
+    StubLLMConfig.streaming = args.streaming
+    sentences.get_llm_config = lambda: StubLLMConfig
+    base._llm_client = LLMClient(api_url=stub_url, api_key=StubLLMConfig.api_key)
+    llm_limits._llm_call_guard = LLMCallGuard(requests_per_minute=args.requests_per_minute,
+                                              tokens_per_minute=args.tokens_per_minute)
+
+    # Time every bulk insert; count the pairs instead when the database is skipped
+    insert_times, totals = [], {'valid': 0, 'inserted': 0, 'duplicates': 0}
+    round_start, first_stored = [0.0], []
+    store_sentence_pairs = sentences.store_sentence_pairs
+
+    async def timed_store(pairs):
+        start = time.perf_counter()
+        if args.no_db:
+            inserted, duplicates = len(pairs), 0
+        else:
+            inserted, duplicates = await store_sentence_pairs(pairs)
+        insert_times.append((time.perf_counter() - start) * 1000)
+        if inserted and len(first_stored) < len(round_times) + 1:
+            first_stored.append(time.perf_counter() - round_start[0])
+        totals['valid'] += len(pairs)
+        totals['inserted'] += inserted
+        totals['duplicates'] += duplicates
+        return inserted, duplicates
+
+    sentences.store_sentence_pairs = timed_store
+    pool = None if args.no_db else await create_scratch_pool()
+    connection._pool = pool
+
+    print("=" * 72)
+    print(f"Replenishment benchmark: {args.rounds} rounds x {args.concurrency} concurrent, "
+          f"stub latency {args.latency}s, 429 rate {args.rate_limit_rate}, malformed rate {args.malformed_rate}")
+    print("=" * 72)
+
+    lags, stop = [], asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(0.01, lags, stop))
+    round_times = []
+    try:
+        for round_number in range(1, args.rounds + 1):
+            start = round_start[0] = time.perf_counter()
+            await asyncio.gather(*(sentences.sentence_replenishment(user_id)
+                                   for user_id in range(1, args.concurrency + 1)))
+            round_times.append(time.perf_counter() - start)
+            print(f"  round {round_number}: {round_times[-1]:6.2f} s")
+    finally:
+        stop.set()
+        await lag_task
+        connection._pool = None
+        if pool is not None:
+            await drop_scratch_schema(pool)
+            await pool.close()
+        await base.close_llm_client()
+        await runner.cleanup()
+
+    elapsed = sum(round_times)
+    print("-" * 72)
+    print(f"  valid sentences      : {totals['valid']} ({totals['valid'] / elapsed:.1f}/s)")
+    print(f"  inserted / duplicate : {totals['inserted']} / {totals['duplicates']}")
+    if first_stored:
+        print(f"  first stored sentence: median {statistics.median(first_stored):.2f} s after the round started "
+              f"(round median {statistics.median(round_times):.2f} s)")
+    if insert_times and not args.no_db:
+        print(f"  insert time          : median {statistics.median(insert_times):.2f} ms | "
+              f"p95 {percentile(insert_times, 0.95):.2f} ms")
+    print(f"  stub requests        : {stub_stats.requests} (structured {stub_stats.structured}, "
+          f"fallback {stub_stats.plain}, streamed {stub_stats.streamed}, 429 {stub_stats.rate_limited}, malformed {stub_stats.malformed})")
+    print(f"  event loop lag       : median {statistics.median(lags) if lags else 0:.2f} ms | "
+          f"p99 {percentile(lags, 0.99):.2f} ms | max {max(lags, default=0):.2f} ms")
+    print(f"  LLM call metrics     : {llm_limits.get_llm_call_metrics()}")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Benchmark random unsolved-sentence sampling against corpus size.
+Builds scratch copies of italian_sentences and italian_sentences_results in a
+separate schema (1k to 1M sentences), then times the legacy NOT IN + ORDER BY RANDOM()
+queries and the random_key index probe used by get_random_sentence.
+The scratch schema is dropped at the end. Do not run against a busy production database.
+"""
+
+import os
+import time
+import random
+import asyncio
+import argparse
+import statistics
+
+import asyncpg
+from dotenv import load_dotenv
+
+
+# Load environment variables
+load_dotenv()
+
+SCHEMA = "bench_sampling"
+USER_ID = 1
+
+LEGACY_COUNT_QUERY = f"""
+    SELECT COUNT(*) as unused_count FROM {SCHEMA}.italian_sentences
+    WHERE id NOT IN (
+        SELECT italian_sentence_id FROM {SCHEMA}.italian_sentences_results
+        WHERE user_id = $1 AND is_success = true
+    )
+"""
+
+LEGACY_SAMPLE_QUERY = f"""
+    SELECT id, sentence FROM {SCHEMA}.italian_sentences
+    WHERE id NOT IN (
+        SELECT italian_sentence_id FROM {SCHEMA}.italian_sentences_results
+        WHERE user_id = $1 AND is_success = true
+    )
+    ORDER BY RANDOM() LIMIT 1
+"""
+
+PROBE_COUNT_QUERY = f"""
+    SELECT COUNT(*) as unused_count FROM (
+        SELECT 1 FROM {SCHEMA}.italian_sentences s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM {SCHEMA}.italian_sentences_results r
+            WHERE r.user_id = $1 AND r.italian_sentence_id = s.id AND r.is_success
+        )
+        LIMIT 10
+    ) unsolved
+"""
+
+PROBE_SAMPLE_QUERY = f"""
+    (SELECT id, sentence FROM {SCHEMA}.italian_sentences s
+     WHERE s.random_key >= $2
+       AND NOT EXISTS (
+           SELECT 1 FROM {SCHEMA}.italian_sentences_results r
+           WHERE r.user_id = $1 AND r.italian_sentence_id = s.id AND r.is_success
+       )
+     ORDER BY s.random_key LIMIT 1)
+    UNION ALL
+    (SELECT id, sentence FROM {SCHEMA}.italian_sentences s
+     WHERE s.random_key < $2
+       AND NOT EXISTS (
+           SELECT 1 FROM {SCHEMA}.italian_sentences_results r
+           WHERE r.user_id = $1 AND r.italian_sentence_id = s.id AND r.is_success
+       )
+     ORDER BY s.random_key LIMIT 1)
+    LIMIT 1
+"""
+
+
+async def build_dataset(conn: asyncpg.Connection, size: int, solved: int, other_results: int) -> None:
+    """(Re)create the scratch tables with `size` sentences and synthetic results"""
+    await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    await conn.execute(f"CREATE SCHEMA {SCHEMA}")
+    await conn.execute(f"""
+        CREATE TABLE {SCHEMA}.italian_sentences (
+            id SERIAL PRIMARY KEY,
+            sentence TEXT NOT NULL,
+            random_key DOUBLE PRECISION NOT NULL DEFAULT random()
+        )
+    """)
+    await conn.execute(f"""
+        CREATE TABLE {SCHEMA}.italian_sentences_results (
+            id SERIAL PRIMARY KEY,
+            user_id BIGINT NOT NULL,
+            italian_sentence_id INT NOT NULL,
+            is_success BOOLEAN NOT NULL,
+            timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+    """)
+    await conn.execute(f"""
+        INSERT INTO {SCHEMA}.italian_sentences (sentence)
+        SELECT 'Frase di prova numero ' || g FROM generate_series(1, $1) g
+    """, size)
+    # The measured user solved `solved` random sentences
+    await conn.execute(f"""
+        INSERT INTO {SCHEMA}.italian_sentences_results (user_id, italian_sentence_id, is_success)
+        SELECT $1, id, true FROM {SCHEMA}.italian_sentences ORDER BY random() LIMIT $2
+    """, USER_ID, solved)
+    # Background traffic from other users
+    await conn.execute(f"""
+        INSERT INTO {SCHEMA}.italian_sentences_results (user_id, italian_sentence_id, is_success)
+        SELECT 2 + (g % 1000), 1 + (g % $1), (g % 3) <> 0 FROM generate_series(1, $2) g
+    """, size, other_results)
+    await conn.execute(f"CREATE INDEX ON {SCHEMA}.italian_sentences(random_key)")
+    await conn.execute(f"CREATE INDEX ON {SCHEMA}.italian_sentences_results(user_id, italian_sentence_id, timestamp)")
+    await conn.execute(f"""
+        CREATE INDEX ON {SCHEMA}.italian_sentences_results(user_id, italian_sentence_id)
+        WHERE is_success
+    """)
+    await conn.execute(f"ANALYZE {SCHEMA}.italian_sentences")
+    await conn.execute(f"ANALYZE {SCHEMA}.italian_sentences_results")
+
+
+async def time_queries(conn: asyncpg.Connection, count_query: str, sample_query: str,
+                       iterations: int, with_probe: bool) -> list[float]:
+    """Time `iterations` count + sample round trips, returning milliseconds"""
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await conn.fetchrow(count_query, USER_ID)
+        if with_probe:
+            await conn.fetchrow(sample_query, USER_ID, random.random())
+        else:
+            await conn.fetchrow(sample_query, USER_ID)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summarize(timings: list[float]) -> str:
+    timings = sorted(timings)
+    p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+    return f"median {statistics.median(timings):8.2f} ms | p95 {p95:8.2f} ms"
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000",
+                        help="Comma-separated corpus sizes")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--solved-ratio", type=float, default=0.3,
+                        help="Share of the corpus already solved by the measured user")
+    parser.add_argument("--legacy-max-size", type=int, default=100000,
+                        help="Skip the legacy queries above this corpus size")
+    args = parser.parse_args()
+
+    conn = await asyncpg.connect(
+        host=os.getenv("DB_HOST", "localhost"),
+        port=int(os.getenv("DB_PORT", 5432)),
+        database=os.getenv("DB_NAME", "parla_italiano"),
+        user=os.getenv("DB_USER", "parla_user"),
+        password=os.getenv("DB_PASSWORD", "")
+    )
+
+    print("=" * 72)
+    print("Random unsolved-sentence sampling benchmark")
+    print("=" * 72)
+
+    try:
+        for size in (int(s) for s in args.sizes.split(",")):
+            solved = int(size * args.solved_ratio)
+            print(f"\nBuilding {size} sentences ({solved} solved by the measured user)...")
+            await build_dataset(conn, size, solved, other_results=size)
+
+            probe = await time_queries(conn, PROBE_COUNT_QUERY, PROBE_SAMPLE_QUERY, args.iterations, True)
+            print(f"  random_key probe : {summarize(probe)}")
+            if size <= args.legacy_max_size:
+                legacy = await time_queries(conn, LEGACY_COUNT_QUERY, LEGACY_SAMPLE_QUERY, args.iterations, False)
+                print(f"  legacy NOT IN    : {summarize(legacy)}")
+            else:
+                print(f"  legacy NOT IN    : skipped (size > {args.legacy_max_size})")
+    finally:
+        await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await conn.close()
+
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-compatible stand-in for the LLM API, for benchmarks and load tests.
+Serves POST /v1/chat/completions with generated Italian/Russian sentence pairs:
+requests carrying `tools` (the structured-output path) get a tool call with JSON
+arguments, plain requests (the manual-parsing fallback) get "Italian: ... | Russian: ..."
+lines. Requests with `stream: true` get the same lines as server-sent events,
+spread over the response latency like a real token stream. Latency, the share
+of 429 responses, the share of malformed JSON and the number of pairs per
+response are configurable.
+
+    python temp/llm_stub_server.py --port 8089 --latency 2 --rate-limit-rate 0.1
+    # then set LLM_API_URL = http://localhost:8089/v1 in config.ini
+"""
+
+import json
+import time
+import random
+import asyncio
+import argparse
+from dataclasses import dataclass, field
+
+from aiohttp import web
+
+
+SUBJECTS = [
+    ("Il gatto", "Кот"), ("La nonna", "Бабушка"), ("Marco", "Марко"), ("Il professore", "Профессор"),
+    ("La bambina", "Девочка"), ("Mio fratello", "Мой брат"), ("Un cane", "Собака"), ("La vicina", "Соседка"),
+]
+VERBS = [
+    ("mangia", "ест"), ("guarda", "смотрит на"), ("cerca", "ищет"), ("compra", "покупает"),
+    ("dipinge", "рисует"), ("ascolta", "слушает"), ("trova", "находит"), ("porta", "несёт"),
+]
+OBJECTS = [
+    ("una mela", "яблоко"), ("il giornale", "газету"), ("la chitarra", "гитару"), ("un libro", "книгу"),
+    ("il treno", "поезд"), ("una torta", "торт"), ("la luna", "луну"), ("il formaggio", "сыр"),
+]
+PLACES = [
+    ("in cucina", "на кухне"), ("al mare", "на море"), ("sul tetto", "на крыше"), ("a Roma", "в Риме"),
+    ("nel parco", "в парке"), ("di notte", "ночью"), ("ogni mattina", "каждое утро"), ("con calma", "спокойно"),
+]
+
+
+@dataclass
+class StubSettings:
+    latency: float = 1.0
+    jitter: float = 0.2
+    rate_limit_rate: float = 0.0
+    malformed_rate: float = 0.0
+    sentences: int = 30
+    seed: int | None = None
+
+
+@dataclass
+class StubStats:
+    requests: int = 0
+    structured: int = 0
+    plain: int = 0
+    streamed: int = 0
+    rate_limited: int = 0
+    malformed: int = 0
+    latencies: list = field(default_factory=list)
+
+
+def sentence_pairs(rng: random.Random, count: int) -> list[dict]:
+    pairs = []
+    for _ in range(count):
+        parts = [rng.choice(words) for words in (SUBJECTS, VERBS, OBJECTS, PLACES)]
+        pairs.append({
+            'italian': " ".join(italian for italian, _ in parts) + ".",
+            'russian': " ".join(russian for _, russian in parts) + ".",
+        })
+    return pairs
+
+
+def completion(model: str, message: dict, prompt_tokens: int, completion_tokens: int) -> dict:
+    return {
+        'id': f"chatcmpl-stub-{random.getrandbits(48):x}",
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': model,
+        'choices': [{'index': 0, 'message': message, 'finish_reason': 'tool_calls' if message.get('tool_calls') else 'stop'}],
+        'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                  'total_tokens': prompt_tokens + completion_tokens},
+    }
+
+
+# Share of the latency spent before the first streamed token
+FIRST_TOKEN_SHARE = 0.1
+
+
+def stream_chunk(model: str, chunk_id: str, delta: dict | None, usage: dict | None = None) -> bytes:
+    payload = {
+        'id': chunk_id,
+        'object': 'chat.completion.chunk',
+        'created': int(time.time()),
+        'model': model,
+        'choices': [{'index': 0, 'delta': delta, 'finish_reason': None}] if delta is not None else [],
+        'usage': usage,
+    }
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode()
+
+
+async def stream_lines(request: web.Request, model: str, lines: list[str], duration: float,
+                       prompt_tokens: int, include_usage: bool) -> web.StreamResponse:
+    """Send each line in two chunks, spreading the chunks evenly over `duration` seconds"""
+    response = web.StreamResponse(headers={'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache'})
+    await response.prepare(request)
+    chunk_id = f"chatcmpl-stub-{random.getrandbits(48):x}"
+    pieces = []
+    for line in lines:
+        middle = len(line) // 2
+        pieces += [line[:middle], line[middle:] + "\n"]
+    await response.write(stream_chunk(model, chunk_id, {'role': 'assistant', 'content': ''}))
+    for piece in pieces:
+        await asyncio.sleep(duration / max(1, len(pieces)))
+        await response.write(stream_chunk(model, chunk_id, {'content': piece}))
+    if include_usage:
+        completion_tokens = sum(len(piece) for piece in pieces) // 4
+        await response.write(stream_chunk(model, chunk_id, None, {
+            'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens}))
+    await response.write(b"data: [DONE]\n\n")
+    await response.write_eof()
+    return response
+
+
+def create_app(settings: StubSettings) -> web.Application:
+    rng = random.Random(settings.seed)
+    stats = StubStats()
+
+    async def chat_completions(request: web.Request) -> web.Response:
+        body = await request.json()
+        stats.requests += 1
+        delay = max(0.0, settings.latency * (1 + rng.uniform(-settings.jitter, settings.jitter)))
+        streaming = bool(body.get('stream'))
+        await asyncio.sleep(delay * FIRST_TOKEN_SHARE if streaming else delay)
+        stats.latencies.append(delay)
+
+        if rng.random() < settings.rate_limit_rate:
+            stats.rate_limited += 1
+            return web.json_response(
+                {'error': {'message': 'Rate limit exceeded (stub)', 'type': 'rate_limit_error', 'code': 429}},
+                status=429, headers={'retry-after': '1'})
+
+        pairs = sentence_pairs(rng, settings.sentences)
+        malformed = rng.random() < settings.malformed_rate
+        stats.malformed += malformed
+        prompt_tokens = sum(len(str(m.get('content', ''))) for m in body.get('messages', [])) // 4
+
+        if streaming:
+            stats.streamed += 1
+            lines = [f"Italian: {p['italian']} | Russian: {p['russian']}" for p in pairs]
+            if malformed:
+                lines = [line.replace(" | Russian:", " /") for line in lines[:len(lines) // 2]] + lines[len(lines) // 2:]
+            include_usage = bool((body.get('stream_options') or {}).get('include_usage'))
+            return await stream_lines(request, body.get('model', 'stub'), lines, delay * (1 - FIRST_TOKEN_SHARE),
+                                      prompt_tokens, include_usage)
+
+        if body.get('tools'):
+            stats.structured += 1
+            arguments = json.dumps({'sentences': pairs}, ensure_ascii=False)
+            if malformed:
+                arguments = arguments[:len(arguments) // 2]
+            tool = body['tools'][0]['function']['name']
+            message = {'role': 'assistant', 'content': None, 'tool_calls': [
+                {'id': f"call_{stats.requests}", 'type': 'function',
+                 'function': {'name': tool, 'arguments': arguments}}]}
+        else:
+            stats.plain += 1
+            content = "\n".join(f"Italian: {p['italian']} | Russian: {p['russian']}" for p in pairs)
+            if malformed:
+                content = content.replace(" | Russian:", " /", len(pairs) // 2)
+            arguments = content
+            message = {'role': 'assistant', 'content': content}
+
+        return web.json_response(completion(body.get('model', 'stub'), message, prompt_tokens, len(arguments) // 4))
+
+    app = web.Application()
+    app['stats'] = stats
+    app.router.add_post('/v1/chat/completions', chat_completions)
+    app.router.add_post('/chat/completions', chat_completions)
+    return app
+
+
+async def start_stub_server(settings: StubSettings, host: str = '127.0.0.1', port: int = 0):
+    """Start the stub in the running event loop. Returns (runner, base_url, stats)."""
+    app = create_app(settings)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{bound_port}/v1", app['stats']
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", type=float, default=1.0, help="Mean response latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Relative latency jitter (0.2 = +/-20%%)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Share of responses with broken JSON/lines")
+    parser.add_argument("--sentences", type=int, default=30, help="Sentence pairs per response")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def settings_from_args(args: argparse.Namespace) -> StubSettings:
+    return StubSettings(latency=args.latency, jitter=args.jitter, rate_limit_rate=args.rate_limit_rate,
+                        malformed_rate=args.malformed_rate, sentences=args.sentences, seed=args.seed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    print(f"LLM stub listening on http://{args.host}:{args.port}/v1")
+    web.run_app(create_app(settings_from_args(args)), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
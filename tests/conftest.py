@@ -0,0 +1,31 @@
+"""Shared fixtures for the unit tests (mocked asyncpg, no live DB required)"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+@pytest.fixture
+def patch_acquire():
+    """Factory patching acquire_connection in a src.database module to yield a mock connection."""
+    def patch_module(module, mock_conn):
+        mock_conn.transaction = MagicMock(return_value=AsyncMock())
+
+        @asynccontextmanager
+        async def fake_acquire():
+            yield mock_conn
+        return patch(f'src.database.{module}.acquire_connection', fake_acquire)
+    return patch_module
+
+
+@pytest.fixture
+def reset_corpus_size():
+    """Forget the cached corpus size between tests."""
+    from src.database import sentences
+    sentences._corpus_size = None
+    yield
+    sentences._corpus_size = None
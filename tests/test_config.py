@@ -79,6 +79,28 @@ LOG_DIR = /test/logs
             assert config['validation']['italian_characters'] == set('abcdefghil .,;:!')
             assert config['logging']['log_dir'] == '/test/logs'
 
+    def test_load_pool_config_from_ini(self):
+        """Test loading connection pool settings from INI file"""
+        ini_content = """
+[Database]
+DB_HOST = test_host
+DB_POOL_MIN_SIZE = 2
+DB_POOL_MAX_SIZE = 8
+DB_POOL_ACQUIRE_TIMEOUT = 2.5
+DB_POOL_MAX_INACTIVE_LIFETIME = 60
+DB_TIMEZONE = Europe/Rome
+"""
+        
+        with patch('builtins.open', mock_open(read_data=ini_content)):
+            with patch('os.path.exists', return_value=True):
+                config = load_config_from_ini('test.ini')
+            
+            assert config['database']['pool_min_size'] == 2
+            assert config['database']['pool_max_size'] == 8
+            assert config['database']['pool_acquire_timeout'] == 2.5
+            assert config['database']['pool_max_inactive_lifetime'] == 60.0
+            assert config['database']['timezone'] == 'Europe/Rome'
+
     def test_merge_configurations(self):
         """Test merging environment and INI configurations"""
         env_config = {
@@ -6,10 +6,14 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import pytest
 import asyncio
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from aiogram.types import User
-from src.database import get_or_create_user, get_table_counts, get_random_sentence, store_sentence_result, get_stats_data, get_random_exercise_prompt
+from src.database import get_or_create_user, get_table_counts, get_random_sentence, get_unsolved_sentences, store_sentence_result, get_stats_data, get_random_exercise_prompt
 from src.database.base import is_valid_italian_sentence
+from src.database import connection, sentences, users
+
+
+pytestmark = pytest.mark.usefixtures('reset_corpus_size')
 
 @pytest.fixture(scope="session")
 def event_loop():
@@ -49,18 +53,18 @@ async def test_get_table_counts_all_tables(mock_connect):
 @pytest.mark.asyncio
 @patch('src.database.asyncpg.connect')
 async def test_get_or_create_user_new_insert(mock_connect):
-    """Test insert path for new user."""
+    """Test new users are written with a single upsert statement."""
     mock_conn = AsyncMock()
-    mock_conn.fetchrow.return_value = None  # New user
     mock_connect.return_value = mock_conn
 
     user = User(id=12345, first_name="NewTest", is_bot=False, is_premium=True)
     result = await get_or_create_user(user)
     assert result == 12345
-    mock_conn.fetchrow.assert_called_once()
+    mock_conn.fetchrow.assert_not_called()
     mock_conn.execute.assert_called_once()
-    # Verify INSERT called with expected args (NOW() auto)
+    # Verify upsert called with expected args (NOW() auto)
     call_args = mock_conn.execute.call_args[0]
+    assert "ON CONFLICT (user_id) DO UPDATE" in call_args[0]
     assert call_args[1] == 12345  # user.id
     assert call_args[2] == "NewTest"  # user.first_name
 
@@ -70,26 +74,81 @@ async def test_get_or_create_user_new_insert(mock_connect):
 async def test_get_or_create_user_existing_update(mock_connect):
     """Test update path for existing user."""
     mock_conn = AsyncMock()
-    mock_conn.fetchrow.return_value = {'user_id': 12345}  # Exists
     mock_connect.return_value = mock_conn
 
     user = User(id=12345, first_name="UpdatedTest", username="testuser", is_bot=False)
     result = await get_or_create_user(user)
     assert result == 12345
     mock_conn.execute.assert_called_once()
-    # Verify UPDATE called (NOW() for last_access_at)
+    # Verify upsert refreshes last_access_at
     call_args = mock_conn.execute.call_args[0]
+    assert "last_access_at = EXCLUDED.last_access_at" in call_args[0]
     assert call_args[1] == 12345  # user.id
     assert call_args[2] == "UpdatedTest"  # user.first_name
     assert call_args[4] == "testuser"  # user.username
 
 
+@pytest.mark.asyncio
+@patch('src.database.asyncpg.connect')
+async def test_get_or_create_user_debounces_unchanged_profile(mock_connect):
+    """Test unchanged profiles skip the write and access times are flushed in one batch."""
+    mock_conn = AsyncMock()
+    mock_connect.return_value = mock_conn
+
+    users.start_access_flusher(interval=3600)
+    try:
+        user = User(id=54321, first_name="Tapper", is_bot=False)
+        await get_or_create_user(user)
+        await get_or_create_user(user)
+        await get_or_create_user(user)
+        assert mock_conn.execute.call_count == 1
+
+        # A profile change is written immediately
+        await get_or_create_user(User(id=54321, first_name="Renamed", is_bot=False))
+        assert mock_conn.execute.call_count == 2
+        await get_or_create_user(User(id=54321, first_name="Renamed", is_bot=False))
+    finally:
+        await users.stop_access_flusher()
+
+    assert mock_conn.execute.call_count == 3
+    flush_args = mock_conn.execute.call_args[0]
+    assert "unnest($1::bigint[], $2::timestamptz[])" in flush_args[0]
+    assert flush_args[1] == [54321]
+
+
+@pytest.mark.asyncio
+@patch('src.database.asyncpg.connect')
+async def test_known_profiles_evict_least_recently_used_user(mock_connect):
+    """Test the profile cache stays bounded and an evicted user is simply upserted again."""
+    mock_conn = AsyncMock()
+    mock_connect.return_value = mock_conn
+    first, second, third = (User(id=user_id, first_name="Tapper", is_bot=False) for user_id in (1001, 1002, 1003))
+
+    users.start_access_flusher(interval=3600, max_cached_users=2)
+    try:
+        await get_or_create_user(first)
+        await get_or_create_user(second)
+        # A hit makes the first user the most recently used, so the third one evicts the second
+        await get_or_create_user(first)
+        await get_or_create_user(third)
+        assert list(users._known_profiles) == [1001, 1003]
+        assert mock_conn.execute.call_count == 3
+
+        await get_or_create_user(second)
+        assert mock_conn.execute.call_count == 4
+        assert list(users._known_profiles) == [1003, 1002]
+    finally:
+        await users.stop_access_flusher()
+        users._max_known_profiles = 10000
+
+
 @pytest.mark.asyncio
 @patch('src.database.asyncpg.connect')
 async def test_get_random_sentence_prefer_uncompleted(mock_connect):
     """Test get_random_sentence prefers uncompleted sentences."""
     mock_conn = AsyncMock()
-    mock_conn.fetchrow.side_effect = [{'unused_count': 15}, {'id': 123, 'sentence': 'Test uncompleted sentence'}]
+    mock_conn.fetchval.return_value = 20
+    mock_conn.fetchrow.side_effect = [{'solved_count': 5}, {'id': 123, 'sentence': 'Test uncompleted sentence'}]
     mock_connect.return_value = mock_conn
 
     result = await get_random_sentence(123)
@@ -102,7 +161,8 @@ async def test_get_random_sentence_prefer_uncompleted(mock_connect):
 async def test_get_random_sentence_fallback_to_random(mock_connect):
     """Test fallback to random sentence when no uncompleted available."""
     mock_conn = AsyncMock()
-    mock_conn.fetchrow.side_effect = [{'unused_count': 15}, None, {'id': 456, 'sentence': 'Fallback sentence'}]
+    mock_conn.fetchval.return_value = 20
+    mock_conn.fetchrow.side_effect = [{'solved_count': 5}, None, {'id': 456, 'sentence': 'Fallback sentence'}]
     mock_connect.return_value = mock_conn
 
     result = await get_random_sentence(123)
@@ -115,7 +175,8 @@ async def test_get_random_sentence_fallback_to_random(mock_connect):
 async def test_get_random_sentence_no_sentences(mock_connect):
     """Test fallback when no sentences at all."""
     mock_conn = AsyncMock()
-    mock_conn.fetchrow.side_effect = [{'unused_count': 15}, None, None]
+    mock_conn.fetchval.return_value = 20
+    mock_conn.fetchrow.side_effect = [{'solved_count': 5}, None, None]
     mock_connect.return_value = mock_conn
 
     result = await get_random_sentence(123)
@@ -123,6 +184,92 @@ async def test_get_random_sentence_no_sentences(mock_connect):
     assert mock_conn.fetchrow.call_count == 3
 
 
+@pytest.mark.asyncio
+@patch('src.database.asyncpg.connect')
+async def test_get_random_sentence_uses_random_key_probe(mock_connect):
+    """Test sampling seeks the random_key index instead of sorting by RANDOM()."""
+    mock_conn = AsyncMock()
+    mock_conn.fetchval.return_value = 20
+    mock_conn.fetchrow.side_effect = [{'solved_count': 10}, {'id': 7, 'sentence': 'Il gatto dorme'}]
+    mock_connect.return_value = mock_conn
+
+    result = await get_random_sentence(123)
+    assert result == (7, 'Il gatto dorme')
+    for call in mock_conn.fetchrow.call_args_list:
+        assert "ORDER BY RANDOM()" not in call[0][0]
+        assert "NOT IN" not in call[0][0]
+    sample_args = mock_conn.fetchrow.call_args_list[1][0]
+    assert "random_key >= $2" in sample_args[0]
+    assert sample_args[1] == 123
+    assert 0.0 <= sample_args[2] < 1.0
+
+
+@pytest.mark.asyncio
+@patch('src.database.sentences.sentence_replenishment', new_callable=AsyncMock)
+@patch('src.database.asyncpg.connect')
+async def test_get_random_sentence_replenishment_from_progress(mock_connect, mock_replenishment):
+    """Test the replenishment check uses the solved counter and the cached corpus size."""
+    mock_conn = AsyncMock()
+    mock_conn.fetchval.return_value = 20
+    mock_conn.fetchrow.side_effect = [
+        {'solved_count': 5}, {'id': 1, 'sentence': 'Uno due tre'},
+        {'solved_count': 15}, {'id': 2, 'sentence': 'Quattro cinque sei'}
+    ]
+    mock_connect.return_value = mock_conn
+
+    await get_random_sentence(123)
+    await asyncio.sleep(0)
+    mock_replenishment.assert_not_called()
+
+    await get_random_sentence(123)
+    await asyncio.sleep(0)
+    mock_replenishment.assert_called_once_with(123)
+
+    # Corpus size is counted once and reused
+    mock_conn.fetchval.assert_called_once()
+    progress_args = mock_conn.fetchrow.call_args_list[0][0]
+    assert "FROM user_progress" in progress_args[0]
+    assert progress_args[1:] == (123, 'sentence_ordering')
+
+
+@pytest.mark.asyncio
+async def test_corpus_size_cache_expires():
+    """Test the cached corpus size is counted again after CORPUS_SIZE_TTL, since other processes add sentences too."""
+    mock_conn = AsyncMock()
+    mock_conn.fetchval.side_effect = [20, 35]
+
+    with patch('src.database.sentences.time.monotonic', side_effect=[1000.0, 1010.0, 1400.0, 1400.0]):
+        assert await sentences.get_corpus_size(mock_conn) == 20
+        assert await sentences.get_corpus_size(mock_conn) == 20
+        assert await sentences.get_corpus_size(mock_conn) == 35
+
+    assert mock_conn.fetchval.call_count == 2
+
+
+@pytest.mark.asyncio
+@patch('src.database.sentences.sentence_replenishment', new_callable=AsyncMock)
+@patch('src.database.asyncpg.connect')
+async def test_get_unsolved_sentences_batch(mock_connect, mock_replenishment):
+    """Test a deck is fetched in one query and a short deck triggers replenishment."""
+    mock_conn = AsyncMock()
+    mock_conn.fetch.return_value = [{'id': 1, 'sentence': 'Uno due tre'}, {'id': 2, 'sentence': 'Quattro cinque sei'}]
+    mock_connect.return_value = mock_conn
+
+    result = await get_unsolved_sentences(123, 20, [5])
+    await asyncio.sleep(0)
+
+    assert result == [(1, 'Uno due tre'), (2, 'Quattro cinque sei')]
+    mock_conn.fetch.assert_called_once()
+    args = mock_conn.fetch.call_args[0]
+    # The results probe is bounded to attached partitions, older successes come from the archive
+    assert "r.timestamp >= results_live_since('italian_sentences_results')" in args[0]
+    assert "FROM results_archive" in args[0]
+    assert args[1] == 123
+    assert args[3] == 20
+    assert args[4] == [5]
+    mock_replenishment.assert_called_once_with(123)
+
+
 @pytest.mark.asyncio
 @patch('src.database.asyncpg.connect')
 async def test_store_sentence_result(mock_connect):
@@ -137,6 +284,10 @@ async def test_store_sentence_result(mock_connect):
     query = args[0]
     params = args[1:]
     assert "INSERT INTO italian_sentences_results" in query
+    assert "INSERT INTO daily_stats" in query
+    # Only the all-users rollup row is written, per-user numbers come from user_progress
+    assert "CROSS JOIN LATERAL" not in query
+    assert "INSERT INTO user_progress" in query
     assert params == (12345, 678, True)
 
 
@@ -219,16 +370,19 @@ async def test_get_stats_data(mock_connect):
     """Test getting statistics data"""
     mock_conn = AsyncMock()
     
-    # Setup mock fetchrow responses
-    mock_conn.fetchrow.side_effect = [
-        {'count': 10},  # total_users
-        {'count': 50},  # total_sentences
-        {'count': 100}, # total_attempts
-        {'total': 100, 'successes': 75},  # global success rate
-        {'total': 20, 'successes': 16},   # user success rate
-        {'total': 20, 'successes': 14},   # today global success rate
-        {'total': 4, 'successes': 3}      # today user success rate
-    ]
+    # Setup the single aggregate row
+    mock_conn.fetchrow.return_value = {
+        'total_users': 10,
+        'total_sentences': 50,
+        'total_attempts': 100,
+        'total_successes': 75,
+        'user_attempts': 20,
+        'user_successes': 16,
+        'today_global_attempts': 20,
+        'today_global_successes': 14,
+        'today_user_attempts': 4,
+        'today_user_successes': 3
+    }
     
     mock_connect.return_value = mock_conn
     
@@ -246,6 +400,14 @@ async def test_get_stats_data(mock_connect):
     assert stats['today_user_attempts'] == 4
     assert stats['today_user_success_rate'] == 75.0
     
+    # Verify global and personal numbers come from the rollup tables on one connection
+    assert mock_conn.fetchrow.call_count == 2
+    global_query = mock_conn.fetchrow.call_args_list[0][0][0]
+    user_query = mock_conn.fetchrow.call_args_list[1][0][0]
+    assert 'FROM daily_stats' in global_query
+    assert 'FROM user_progress' in user_query
+    assert 'italian_sentences_results' not in global_query + user_query
+    
     # Verify connection was closed
     mock_conn.close.assert_called_once()
 
@@ -256,16 +418,19 @@ async def test_get_stats_data_zero_attempts(mock_connect):
     """Test getting statistics data when there are no attempts"""
     mock_conn = AsyncMock()
     
-    # Setup mock fetchrow responses with zero attempts
-    mock_conn.fetchrow.side_effect = [
-        {'count': 5},   # total_users
-        {'count': 25},  # total_sentences
-        {'count': 0},   # total_attempts
-        {'total': 0, 'successes': 0},  # global success rate
-        {'total': 0, 'successes': 0},  # user success rate
-        {'total': 0, 'successes': 0},  # today global success rate
-        {'total': 0, 'successes': 0}   # today user success rate
-    ]
+    # Setup the aggregate row with zero attempts
+    mock_conn.fetchrow.return_value = {
+        'total_users': 5,
+        'total_sentences': 25,
+        'total_attempts': 0,
+        'total_successes': 0,
+        'user_attempts': 0,
+        'user_successes': 0,
+        'today_global_attempts': 0,
+        'today_global_successes': 0,
+        'today_user_attempts': 0,
+        'today_user_successes': 0
+    }
     
     mock_connect.return_value = mock_conn
     
@@ -283,6 +448,38 @@ async def test_get_stats_data_zero_attempts(mock_connect):
     assert stats['today_user_attempts'] == 0
     assert stats['today_user_success_rate'] == 0.0
 
+@pytest.mark.asyncio
+@patch('src.database.asyncpg.connect')
+async def test_get_stats_data_shares_global_stats(mock_connect):
+    """Test concurrent /stats calls share one global computation while the cache runs"""
+    mock_conn = AsyncMock()
+    global_row = {
+        'total_users': 10, 'total_sentences': 50, 'total_attempts': 100, 'total_successes': 75,
+        'today_global_attempts': 20, 'today_global_successes': 14
+    }
+    user_row = {'user_attempts': 20, 'user_successes': 16, 'today_user_attempts': 4, 'today_user_successes': 3}
+
+    async def fetchrow(query, *args):
+        await asyncio.sleep(0.01)
+        return user_row if 'FROM user_progress' in query else global_row
+
+    mock_conn.fetchrow.side_effect = fetchrow
+    mock_connect.return_value = mock_conn
+
+    connection.start_global_stats_cache(ttl=60)
+    try:
+        results = await asyncio.gather(*(get_stats_data(user_id) for user_id in range(5)))
+        await get_stats_data(99)
+    finally:
+        connection.stop_global_stats_cache()
+
+    assert all(stats['global_success_rate'] == 75.0 for stats in results)
+    assert all(stats['user_success_rate'] == 80.0 for stats in results)
+    queries = [call[0][0] for call in mock_conn.fetchrow.call_args_list]
+    assert sum('FROM daily_stats' in query for query in queries) == 1
+    assert sum('FROM user_progress' in query for query in queries) == 6
+
+
 @pytest.mark.asyncio
 @patch('src.database.asyncpg.connect')
 async def test_get_random_exercise_prompt(mock_connect):
@@ -307,4 +504,80 @@ async def test_get_random_exercise_prompt_fallback(mock_connect):
     result = await get_random_exercise_prompt()
     assert result == "Prossimo!"  # fallback
     mock_conn.fetchrow.assert_called_once_with("SELECT prompt FROM exercise_prompts ORDER BY RANDOM() LIMIT 1")
-    mock_conn.close.assert_called_once()
\ No newline at end of file
+    mock_conn.close.assert_called_once()
+
+
+@pytest.mark.asyncio
+@patch('src.database.connection.asyncpg.create_pool', new_callable=AsyncMock)
+async def test_init_and_close_pool(mock_create_pool):
+    """Test the shared pool is created once and closed on shutdown."""
+    mock_pool = AsyncMock()
+    mock_create_pool.return_value = mock_pool
+
+    pool = await connection.init_pool()
+    try:
+        assert pool is mock_pool
+        assert connection.get_pool() is mock_pool
+        # A second call reuses the existing pool
+        assert await connection.init_pool() is mock_pool
+        mock_create_pool.assert_called_once()
+        kwargs = mock_create_pool.call_args.kwargs
+        assert 'min_size' in kwargs
+        assert 'max_size' in kwargs
+        assert 'max_inactive_connection_lifetime' in kwargs
+        # Day boundaries follow the configured time zone on every pooled connection
+        assert 'TimeZone' in kwargs['server_settings']
+    finally:
+        await connection.close_pool()
+
+    mock_pool.close.assert_called_once()
+    assert connection.get_pool() is None
+
+
+@pytest.mark.asyncio
+@patch('src.database.asyncpg.connect')
+async def test_helpers_use_pool_when_initialized(mock_connect):
+    """Test database helpers acquire from the pool instead of opening connections."""
+    mock_conn = AsyncMock()
+    mock_conn.fetchrow.return_value = {'prompt': 'Vai:'}
+    acquire_cm = MagicMock()
+    acquire_cm.__aenter__ = AsyncMock(return_value=mock_conn)
+    acquire_cm.__aexit__ = AsyncMock(return_value=None)
+    mock_pool = MagicMock()
+    mock_pool.acquire.return_value = acquire_cm
+    mock_pool.close = AsyncMock()
+
+    with patch('src.database.connection.asyncpg.create_pool', new_callable=AsyncMock, return_value=mock_pool):
+        await connection.init_pool()
+    try:
+        result = await get_random_exercise_prompt()
+    finally:
+        await connection.close_pool()
+
+    assert result == 'Vai:'
+    mock_pool.acquire.assert_called_once()
+    assert 'timeout' in mock_pool.acquire.call_args.kwargs
+    mock_connect.assert_not_called()
+    mock_conn.close.assert_not_called()
+
+
+@pytest.mark.asyncio
+@patch('src.database.asyncpg.connect')
+async def test_get_startup_diagnostics_uses_estimates(mock_connect):
+    """Test startup diagnostics read pg_class estimates over a single connection."""
+    mock_conn = AsyncMock()
+    mock_conn.fetch.side_effect = [
+        [{'version': '001_initial', 'applied_at': '2025-01-01'}],
+        [{'relname': 'users', 'estimate': 42}, {'relname': 'italian_sentences_results', 'estimate': -1}]
+    ]
+    mock_connect.return_value = mock_conn
+
+    diagnostics = await connection.get_startup_diagnostics()
+
+    assert diagnostics['migrations'] == ['001_initial applied at 2025-01-01']
+    assert diagnostics['table_counts']['users'] == 42
+    # Never-analyzed tables are reported as unknown
+    assert diagnostics['table_counts']['italian_sentences_results'] is None
+    assert mock_connect.call_count == 1
+    assert 'pg_class' in mock_conn.fetch.call_args_list[1][0][0]
+    mock_conn.fetchval.assert_not_called()
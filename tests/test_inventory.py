@@ -0,0 +1,119 @@
+"""Unit tests for the sentence inventory worker (mocked asyncpg and coordinator, no live DB required)"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import asyncio
+from unittest.mock import AsyncMock, patch
+from src.database import sentences
+from src.database.inventory import InventoryWorker, INVENTORY_USER_ID
+from src.database.replenishment import ReplenishmentCoordinator
+
+
+pytestmark = pytest.mark.usefixtures('reset_corpus_size')
+
+
+def make_conn(corpus_size, active_users, max_solved):
+    """Mock connection answering the corpus size and demand queries."""
+    mock_conn = AsyncMock()
+    mock_conn.fetchval.return_value = corpus_size
+    mock_conn.fetchrow.return_value = {'active_users': active_users, 'max_solved': max_solved}
+    return mock_conn
+
+
+@pytest.mark.asyncio
+async def test_check_requests_batches_below_safety_stock(patch_acquire):
+    """Test a headroom deficit is turned into capped generation requests."""
+    generate = AsyncMock()
+    coordinator = ReplenishmentCoordinator(generate, max_concurrent=2)
+    worker = InventoryWorker(safety_stock=100, sentences_per_batch=30, max_batches=3)
+    mock_conn = make_conn(corpus_size=150, active_users=4, max_solved=110)
+
+    with patch_acquire('inventory', mock_conn), patch('src.database.inventory.get_replenishment_coordinator', return_value=coordinator):
+        batches = await worker.check()
+
+    # Headroom 40, deficit 60 -> 2 batches of 30
+    assert batches == 2
+    assert generate.await_count == 2
+    generate.assert_awaited_with(INVENTORY_USER_ID)
+    state = worker.state()
+    assert state['headroom'] == 40
+    assert state['target_headroom'] == 100
+    assert state['batches_requested'] == 2
+    assert state['running'] is False
+    demand_args = mock_conn.fetchrow.call_args[0]
+    assert "user_last_attempt" in demand_args[0]
+    assert demand_args[1] == 24 * 3600
+
+
+@pytest.mark.asyncio
+async def test_check_idles_with_enough_headroom_or_no_users(patch_acquire):
+    """Test nothing is generated when headroom is sufficient or nobody is active."""
+    worker = InventoryWorker(safety_stock=100)
+    for active_users, max_solved in [(3, 10), (0, 0)]:
+        mock_conn = make_conn(corpus_size=80 if active_users == 0 else 200,
+                              active_users=active_users, max_solved=max_solved)
+        with patch_acquire('inventory', mock_conn), patch('src.database.inventory.request_replenishment') as mock_request:
+            assert await worker.check() == 0
+            mock_request.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_solve_rate_raises_target():
+    """Test a fast solve rate adds the sentences expected to be solved during a generation."""
+    worker = InventoryWorker(safety_stock=10)
+    worker._lead_time = 3600.0
+    with patch('src.database.inventory.time.monotonic', side_effect=[0.0, 1800.0]):
+        assert worker._record_sample(100) == 0.0
+        # 50 solves in half an hour -> 100 per hour
+        assert worker._record_sample(150) == 100.0
+
+
+@pytest.mark.asyncio
+async def test_failed_check_is_reported_in_state():
+    """Test the background loop keeps running and exposes the last error."""
+    worker = InventoryWorker(interval=0.01)
+    with patch.object(worker, 'check', AsyncMock(side_effect=RuntimeError("db down"))):
+        worker.start()
+        await asyncio.sleep(0.02)
+        assert worker.state()['last_error'] == "db down"
+        assert worker.state()['running'] is True
+        await worker.stop()
+    assert worker.state()['running'] is False
+
+
+@pytest.mark.asyncio
+async def test_lead_time_is_one_batch_and_state_is_logged(patch_acquire, caplog):
+    """Test lead time measures a single generation and every check logs the worker's state."""
+    async def generate(user_id):
+        await asyncio.sleep(0.05)
+
+    coordinator = ReplenishmentCoordinator(generate, max_concurrent=1)
+    worker = InventoryWorker(safety_stock=100, sentences_per_batch=30, max_batches=3)
+    mock_conn = make_conn(corpus_size=100, active_users=1, max_solved=90)
+
+    with caplog.at_level('INFO'), patch_acquire('inventory', mock_conn), \
+         patch('src.database.inventory.get_replenishment_coordinator', return_value=coordinator):
+        assert await worker.check() == 3
+
+    # Three sequential generations of about 0.05 seconds each
+    assert 0.04 <= worker._lead_time < 0.1
+    assert any("Sentence inventory: corpus 100, headroom 10, target 100" in message for message in caplog.messages)
+
+
+@pytest.mark.asyncio
+async def test_check_counts_sentences_added_by_other_processes(patch_acquire):
+    """Test every check counts the corpus again instead of trusting a count cached before outside inserts."""
+    worker = InventoryWorker(safety_stock=100)
+    mock_conn = make_conn(corpus_size=150, active_users=1, max_solved=100)
+
+    with patch_acquire('inventory', mock_conn), patch('src.database.inventory.request_replenishment'):
+        await worker.check()
+        # A journal replay or backfill process inserted sentences, this process was never notified
+        mock_conn.fetchval.return_value = 250
+        await worker.check()
+
+    assert worker.state()['corpus_size'] == 250
+    assert sentences._corpus_size == 250
@@ -0,0 +1,154 @@
+"""Unit tests for the LLM generation journal and its replay (temporary files, mocked database)"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import threading
+import time
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.database import journal as journal_module
+from src.database.journal import GenerationJournal, main, replay_journal
+from src.database.sentences import parse_journal_entry, _completion_hooks
+
+PAIRS = {'sentences': [
+    {'italian': "Il gatto dorme sul divano.", 'russian': "Кот спит на диване."},
+    {'italian': "Oggi piove molto forte.", 'russian': "Сегодня идёт сильный дождь."},
+]}
+
+
+def completion_payload(arguments):
+    """Chat completion dump with a tool call carrying `arguments`."""
+    return {'choices': [{'message': {'content': None, 'tool_calls': [
+        {'function': {'name': 'SentenceTranslationList', 'arguments': json.dumps(arguments, ensure_ascii=False)}}
+    ]}}]}
+
+
+def test_entries_round_trip_and_skip_corrupt_lines(tmp_path):
+    """Test appended entries are read back and damaged lines are skipped."""
+    journal = GenerationJournal(str(tmp_path / 'logs' / 'journal.jsonl'))
+    first = journal.append('text', "Italian: Ciao a tutti voi | Russian: Привет всем вам", user_id=1, model='m')
+    second = journal.append('completion', completion_payload(PAIRS), user_id=2, model='m')
+    journal.flush()
+
+    with open(journal.path, encoding='utf-8') as journal_file:
+        lines = journal_file.readlines()
+    tampered = json.loads(lines[1])
+    tampered['response'] = 'changed'
+    with open(journal.path, 'a', encoding='utf-8') as journal_file:
+        journal_file.write(json.dumps(tampered) + '\n')
+        journal_file.write('{"id": "trunc')
+
+    assert [entry['id'] for entry in journal.entries()] == [first, second]
+    future = datetime.now(timezone.utc) + timedelta(minutes=1)
+    assert list(journal.entries(since=future)) == []
+
+
+def test_parse_journal_entry_formats():
+    """Test tool-call completions, JSON content and free text are all parsed."""
+    expected = [(pair['italian'], pair['russian']) for pair in PAIRS['sentences']]
+
+    entry = {'kind': 'completion', 'response': completion_payload(PAIRS)}
+    assert [(p['italian'], p['russian']) for p in parse_journal_entry(entry)] == expected
+
+    content = "```json\n" + json.dumps(PAIRS, ensure_ascii=False) + "\n```"
+    entry = {'kind': 'completion', 'response': {'choices': [{'message': {'content': content}}]}}
+    assert [(p['italian'], p['russian']) for p in parse_journal_entry(entry)] == expected
+
+    entry = {'kind': 'text', 'response': 'Italian: "Ciao a tutti voi" | Russian: "Привет всем вам"\nnoise'}
+    assert parse_journal_entry(entry) == [{'italian': 'Ciao a tutti voi', 'russian': 'Привет всем вам'}]
+
+
+def test_hooks_journal_raw_completion(tmp_path):
+    """Test the instructor hook writes the raw completion before parsing."""
+    journal = GenerationJournal(str(tmp_path / 'journal.jsonl'))
+    with patch.object(journal_module, '_journal', journal):
+        hooks = _completion_hooks(7, 'test-model')
+        completion = MagicMock()
+        completion.model_dump.return_value = completion_payload(PAIRS)
+        hooks.emit_completion_response(completion)
+    journal.flush()
+
+    entries = list(journal.entries())
+    assert len(entries) == 1
+    assert entries[0]['user_id'] == 7
+    assert entries[0]['model'] == 'test-model'
+    assert entries[0]['kind'] == 'completion'
+
+    with patch.object(journal_module, '_journal', None):
+        _completion_hooks(7, 'test-model').emit_completion_response(completion)
+    journal.flush()
+    assert len(list(journal.entries())) == 1
+
+
+@pytest.mark.asyncio
+async def test_replay_validates_and_inserts(tmp_path):
+    """Test replay re-runs validation and stores valid pairs, counting unparsable entries."""
+    journal = GenerationJournal(str(tmp_path / 'journal.jsonl'))
+    journal.append('completion', completion_payload(PAIRS), user_id=1)
+    journal.append('completion', completion_payload({'sentences': 'broken'}), user_id=1)
+    journal.flush()
+
+    with patch('src.database.sentences.store_sentence_pairs', new_callable=AsyncMock) as mock_store, \
+         patch('src.database.sentences._notify_new_sentences') as mock_notify:
+        mock_store.return_value = (1, 1)
+        totals = await replay_journal(journal)
+
+        assert totals == {'entries': 2, 'valid': 2, 'inserted': 1, 'duplicates': 1, 'failed': 1}
+        mock_store.assert_awaited_once()
+        mock_notify.assert_called_once()
+
+        mock_store.reset_mock()
+        totals = await replay_journal(journal, dry_run=True)
+        assert totals['valid'] == 2
+        mock_store.assert_not_called()
+
+
+def test_appends_are_written_off_the_caller_and_rotated(tmp_path):
+    """Test append() does not wait for fsync and full files are rotated but still replayed."""
+    journal = GenerationJournal(str(tmp_path / 'journal.jsonl'), max_bytes=1, backup_count=2)
+    release = threading.Event()
+    real_fsync = os.fsync
+
+    def slow_fsync(fd):
+        release.wait(5)
+        real_fsync(fd)
+
+    ids = []
+    with patch('src.database.journal.os.fsync', side_effect=slow_fsync):
+        started = time.monotonic()
+        ids.append(journal.append('text', "Italian: Frase numero uno | Russian: Фраза один"))
+        # The caller got the id back without waiting for the blocked fsync
+        assert time.monotonic() - started < 1
+        release.set()
+        journal.flush()
+    for i in range(3):
+        ids.append(journal.append('text', f"Italian: Frase numero {i} | Russian: Фраза {i}"))
+        journal.flush()
+    journal.close()
+
+    # Each write found a full file and rotated it; only two backups are kept besides the current file
+    assert len(journal.files()) == 3
+    assert [entry['id'] for entry in journal.entries()] == ids[1:]
+
+
+@pytest.mark.asyncio
+async def test_replay_command_reads_every_configured_backup(tmp_path, capsys):
+    """Test the replay command uses [Journal] BACKUP_COUNT, also beyond the default of five rotated files."""
+    path = str(tmp_path / 'journal.jsonl')
+    journal = GenerationJournal(path, max_bytes=1, backup_count=7)
+    for i in range(8):
+        journal.append('text', f"Italian: Frase numero {i} | Russian: Фраза {i}")
+        journal.flush()
+    journal.close()
+    assert len(journal.files()) == 8
+
+    config = MagicMock(path=path, max_bytes=1, backup_count=7)
+    with patch('sys.argv', ['journal', 'replay', '--dry-run']), \
+         patch('src.database.journal._journal_config', return_value=config):
+        await main()
+
+    assert capsys.readouterr().out.startswith("entries=8,")
@@ -0,0 +1,146 @@
+"""Unit tests for the LLM rate limiter and circuit breaker (patched clock, no API calls)"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from unittest.mock import AsyncMock, patch
+from src.database.base import execute_with_retry
+from src.database.llm_limits import TokenBucket, CircuitBreaker, CircuitOpenError, LLMCallGuard
+
+
+class FakeClock:
+    """Monotonic clock that only moves when asyncio.sleep is called."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    fake = FakeClock()
+    with patch('src.database.llm_limits.time.monotonic', fake.monotonic), \
+         patch('src.database.llm_limits.asyncio.sleep', fake.sleep):
+        yield fake
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_waits_for_refill(clock):
+    """Test a burst is served from capacity and the rest waits for the refill rate."""
+    bucket = TokenBucket(per_minute=60)
+    assert await bucket.acquire(60) == 0.0
+    assert await bucket.acquire(30) == pytest.approx(30.0)
+
+    # Reported usage above the estimate puts the bucket in debt
+    bucket.adjust(-10)
+    assert bucket.available() == pytest.approx(-10)
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_response_drains_buckets(clock):
+    """Test a 429 makes every following caller wait for a refill."""
+    guard = LLMCallGuard(requests_per_minute=6, tokens_per_minute=60000, estimated_tokens=1000)
+    with pytest.raises(RateLimitError):
+        async with guard.call():
+            raise RateLimitError()
+
+    assert guard.rate_limited == 1
+    async with guard.call() as usage:
+        pass
+    # One request per 10 seconds at 6 requests/minute
+    assert clock.sleeps[0] == pytest.approx(10.0)
+    assert guard.metrics()['calls'] == 2
+
+
+@pytest.mark.asyncio
+async def test_actual_usage_corrects_reservation(clock):
+    """Test the reserved estimate is replaced by the reported token usage."""
+    guard = LLMCallGuard(tokens_per_minute=10000, estimated_tokens=3000)
+    async with guard.call() as usage:
+        usage.record(type('Completion', (), {'usage': type('Usage', (), {'total_tokens': 500})()})())
+    assert guard.tokens.available() == pytest.approx(9500)
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_and_half_opens(clock):
+    """Test the breaker rejects calls after repeated failures and closes after a successful probe."""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now += 30
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one probe at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now += 30
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.times_opened == 2
+    assert breaker.rejected_calls == 2
+
+
+@pytest.mark.asyncio
+async def test_retry_stops_on_open_circuit():
+    """Test execute_with_retry does not keep retrying while the breaker is open."""
+    func = AsyncMock(side_effect=CircuitOpenError("open"))
+    with patch('src.database.base.asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
+        with pytest.raises(CircuitOpenError):
+            await execute_with_retry(func)
+    func.assert_awaited_once()
+    mock_sleep.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_rate_limits_inside_structured_retries_reach_guard(clock):
+    """Test a 429 retried inside instructor is still reported through the completion hooks."""
+    from src.database.sentences import _completion_hooks
+
+    guard = LLMCallGuard()
+    with patch('src.database.sentences.get_llm_call_guard', return_value=guard):
+        hooks = _completion_hooks(1, 'test-model')
+    hooks.emit_completion_error(RateLimitError())
+    hooks.emit_completion_error(ValueError("bad json"))
+
+    assert guard.rate_limited == 1
+    assert guard.requests.available() == 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_reported_by_hook_and_guard_counts_once(clock):
+    """Test a 429 seen by the completion hook and then raised out of the guarded call is counted once."""
+    from src.database.sentences import _completion_hooks
+
+    guard = LLMCallGuard(requests_per_minute=6, tokens_per_minute=60000, estimated_tokens=1000)
+    with patch('src.database.sentences.get_llm_call_guard', return_value=guard):
+        hooks = _completion_hooks(1, 'test-model')
+    error = RateLimitError()
+    with pytest.raises(RateLimitError):
+        async with guard.call():
+            # Instructor's last attempt fails: the hook reports it, then the error leaves the call
+            hooks.emit_completion_error(error)
+            raise error
+
+    assert guard.metrics()['rate_limited'] == 1
@@ -0,0 +1,201 @@
+"""Unit tests for the missing-word backfill (in-memory table, mocked LLM and database)"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.database.base import MissingWordResult
+from src.database.llm_limits import CircuitOpenError
+from src.database.missing_words import MissingWordBackfill, main, store_missing_words, validate_missing_word_data
+
+
+class FakeTable:
+    """italian_sentences rows and the checkpoint table, behind the module's query functions"""
+
+    def __init__(self, count):
+        self.rows = {i: {'sentence': f"Il gatto numero {i} dorme.", 'word_to_replace': ''} for i in range(1, count + 1)}
+        self.checkpoints = {}
+        self.updates = []
+        self.pages = []
+
+    async def fetch(self, after_id, limit):
+        self.pages.append(after_id)
+        ids = sorted(i for i, row in self.rows.items() if row['word_to_replace'] == '' and i > after_id)[:limit]
+        return [(i, self.rows[i]['sentence']) for i in ids]
+
+    async def fetch_by_ids(self, ids):
+        return [(i, self.rows[i]['sentence']) for i in sorted(ids) if self.rows[i]['word_to_replace'] == '']
+
+    async def store(self, results):
+        self.updates.append([sentence_id for sentence_id, _, _ in results])
+        for sentence_id, word, _ in results:
+            self.rows[sentence_id]['word_to_replace'] = word
+        return len(results)
+
+    async def load_checkpoint(self, name):
+        return self.checkpoints.get(name, (0, []))
+
+    async def save_checkpoint(self, name, last_id, failed_ids):
+        self.checkpoints[name] = (last_id, failed_ids)
+
+
+async def no_retry(func, max_retries=5):
+    return await func()
+
+
+def patched(table, generate):
+    return [
+        patch('src.database.missing_words.fetch_sentences_missing_words', side_effect=table.fetch),
+        patch('src.database.missing_words.fetch_sentences_by_ids', side_effect=table.fetch_by_ids),
+        patch('src.database.missing_words.store_missing_words', side_effect=table.store),
+        patch('src.database.missing_words.load_checkpoint', side_effect=table.load_checkpoint),
+        patch('src.database.missing_words.save_checkpoint', side_effect=table.save_checkpoint),
+        patch('src.database.missing_words.execute_with_retry', side_effect=no_retry),
+        patch('src.database.missing_words.generate_missing_word_data', side_effect=generate),
+    ]
+
+
+async def run_backfill(table, generate, **kwargs):
+    patches = patched(table, generate)
+    for p in patches:
+        p.start()
+    try:
+        job = MissingWordBackfill(**kwargs)
+        try:
+            totals = await job.run()
+        except CircuitOpenError:
+            totals = None
+        return job, totals
+    finally:
+        for p in patches:
+            p.stop()
+
+
+def test_validate_missing_word_data():
+    """Test the target must occur once and alternatives must be new, distinct Italian words."""
+    sentence = "L'acqua del lago è fredda."
+    assert validate_missing_word_data(sentence, "fredda", ["calda", "tiepida"])
+    assert validate_missing_word_data(sentence, "acqua", ["neve", "sabbia", "luce"])
+    assert not validate_missing_word_data(sentence, "mare", ["calda", "tiepida"])
+    assert not validate_missing_word_data(sentence, "fredda", ["calda"])
+    assert not validate_missing_word_data(sentence, "fredda", ["calda", "Calda"])
+    assert not validate_missing_word_data(sentence, "fredda", ["calda", "lago"])
+    assert not validate_missing_word_data(sentence, "fredda", ["calda", "холодная"])
+    assert not validate_missing_word_data("Il gatto e il cane.", "il", ["un", "lo"])
+
+
+@pytest.mark.asyncio
+async def test_backfill_updates_in_bulk_and_checkpoints():
+    """Test every row is processed with bounded concurrency, written in bulk and checkpointed."""
+    table = FakeTable(23)
+    in_flight, peak = 0, 0
+
+    async def generate(sentence, recent, model=None):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.001)
+        in_flight -= 1
+        number = sentence.split()[3]
+        if number == '7':
+            return MissingWordResult(word_to_replace="mare", word_suggestions=["a", "b"])
+        return MissingWordResult(word_to_replace="gatto", word_suggestions=["treno", "sedia"])
+
+    job, totals = await run_backfill(table, generate, concurrency=3, page_size=5, flush_size=4)
+
+    assert totals == {'processed': 23, 'valid': 22, 'invalid': 1, 'failed': 0, 'updated': 22}
+    assert peak == 3
+    assert all(len(update) <= 4 for update in table.updates)
+    assert sorted(i for update in table.updates for i in update) == [i for i in range(1, 24) if i != 7]
+    # The invalid row is behind the checkpoint as well; only --restart retries it
+    assert table.checkpoints['missing_words'] == (23, [])
+    assert table.rows[7]['word_to_replace'] == ''
+
+
+@pytest.mark.asyncio
+async def test_failed_rows_are_recorded_and_retried_in_their_own_pass():
+    """Test a failed row lets the checkpoint move on and is the only row the next run redoes."""
+    table = FakeTable(10)
+    calls, outage = [], [True]
+
+    async def flaky(sentence, recent, model=None):
+        calls.append(sentence)
+        if sentence.split()[3] == '4' and outage[0]:
+            raise RuntimeError("connection reset")
+        return MissingWordResult(word_to_replace="gatto", word_suggestions=["treno", "sedia"])
+
+    _, totals = await run_backfill(table, flaky, concurrency=2, page_size=4, flush_size=2)
+    assert totals['failed'] == 1 and totals['updated'] == 9
+    assert table.checkpoints['missing_words'] == (10, [4])
+
+    # Still failing: kept for the run after
+    calls.clear()
+    _, totals = await run_backfill(table, flaky, concurrency=2, page_size=4, flush_size=2)
+    assert calls == ["Il gatto numero 4 dorme."]
+    assert table.checkpoints['missing_words'] == (10, [4])
+
+    calls.clear()
+    outage[0] = False
+    table.rows[11] = {'sentence': "Il gatto numero 11 dorme.", 'word_to_replace': ''}
+    _, totals = await run_backfill(table, flaky, concurrency=2, page_size=4, flush_size=2)
+    assert calls == ["Il gatto numero 4 dorme.", "Il gatto numero 11 dorme."]
+    assert totals['updated'] == 2
+    assert table.checkpoints['missing_words'] == (11, [])
+    # Later runs page on from the checkpoint instead of rescanning from the failed row
+    assert table.pages == [0, 4, 8, 10, 10]
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_stops_and_keeps_finished_results():
+    """Test an open circuit breaker ends the run after writing what already finished."""
+    table = FakeTable(6)
+
+    async def generate(sentence, recent, model=None):
+        if sentence.split()[3] == '3':
+            raise CircuitOpenError("open")
+        return MissingWordResult(word_to_replace="gatto", word_suggestions=["treno", "sedia"])
+
+    job, totals = await run_backfill(table, generate, concurrency=1, page_size=10, flush_size=10)
+    assert totals is None
+    assert table.updates == [[1, 2]]
+    assert job.checkpoint == 2
+    assert table.checkpoints['missing_words'] == (2, [])
+
+
+@pytest.mark.asyncio
+async def test_store_missing_words_uses_one_guarded_update():
+    """Test results go out in one UPDATE ... FROM unnest that skips rows filled meanwhile."""
+    conn = AsyncMock()
+    conn.execute.return_value = "UPDATE 1"
+    acquire = MagicMock()
+    acquire.return_value.__aenter__ = AsyncMock(return_value=conn)
+    acquire.return_value.__aexit__ = AsyncMock(return_value=False)
+
+    with patch('src.database.missing_words.acquire_connection', acquire):
+        updated = await store_missing_words([(1, "gatto", "treno,sedia"), (2, "cane", "luna,sole")])
+
+    assert updated == 1
+    conn.execute.assert_awaited_once()
+    query, ids, words, suggestions = conn.execute.call_args.args
+    assert "FROM unnest($1::int[], $2::text[], $3::text[])" in query
+    assert "s.word_to_replace = ''" in query
+    assert ids == [1, 2] and words == ["gatto", "cane"] and suggestions == ["treno,sedia", "luna,sole"]
+
+
+@pytest.mark.asyncio
+async def test_lock_connection_is_closed_when_the_pool_fails():
+    """Test the advisory lock session is closed even if the pool cannot be created."""
+    lock_conn = AsyncMock()
+
+    with patch('sys.argv', ['missing_words', 'backfill']), \
+         patch('src.database.missing_words.open_connection', AsyncMock(return_value=lock_conn)), \
+         patch('src.database.missing_words.init_pool', AsyncMock(side_effect=OSError("connection refused"))), \
+         patch('src.database.missing_words.close_pool', AsyncMock()), \
+         patch('src.database.missing_words.close_llm_client', AsyncMock()):
+        with pytest.raises(OSError):
+            await main()
+
+    lock_conn.close.assert_awaited_once()
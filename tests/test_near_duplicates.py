@@ -0,0 +1,137 @@
+"""Unit tests for the near-duplicate sentence index (in-memory, mocked database)"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.database import near_duplicates
+from src.database.near_duplicates import NearDuplicateIndex, jaccard, load_near_duplicate_index, sentence_words
+from src.database.sentences import store_sentence_pairs
+
+CORPUS = [
+    (1, "Il gatto dorme sul divano rosso."),
+    (2, "La nonna prepara la cena per tutti."),
+    (3, "Marco legge un libro in giardino."),
+    (4, "Domani andiamo al mare con gli amici."),
+]
+
+
+def pair(italian):
+    return {'italian': italian, 'russian': "Перевод."}
+
+
+def test_matches_agree_with_brute_force():
+    """Test prefix filtering finds exactly the stored sentences a full scan finds."""
+    index = NearDuplicateIndex(threshold=0.7)
+    index.load(CORPUS)
+
+    probes = [
+        "Il gatto dorme sul divano blu.",          # one word changed
+        "il gatto dorme, sul divano rosso!",       # punctuation only
+        "Marco legge un bel libro in giardino.",   # one word added
+        "Il cane corre nel parco.",                # unrelated
+        "La cena è pronta.",                       # shares common words only
+    ]
+    for probe in probes:
+        expected = max(((jaccard(sentence_words(probe), sentence_words(sentence)), sentence_id)
+                        for sentence_id, sentence in CORPUS), default=(0.0, None))
+        match = index.find(probe)
+        if expected[0] >= 0.7:
+            assert match == (expected[1], pytest.approx(expected[0]))
+        else:
+            assert match is None
+
+
+def test_filter_rejects_stored_and_in_batch_near_duplicates():
+    """Test pairs similar to the corpus or to an earlier pair of the batch are rejected."""
+    index = NearDuplicateIndex(threshold=0.7)
+    index.load(CORPUS)
+    kept, rejected = index.filter_pairs([
+        pair("Il gatto dorme sul divano blu."),
+        pair("Oggi il treno parte molto presto."),
+        pair("Oggi il treno parte molto tardi."),
+    ])
+
+    assert [p['italian'] for p in kept] == ["Oggi il treno parte molto presto."]
+    assert [(p['italian'], matched_id) for p, matched_id, _ in rejected] == [
+        ("Il gatto dorme sul divano blu.", 1),
+        ("Oggi il treno parte molto tardi.", None),
+    ]
+    assert index.stats()['rejected'] == 2
+
+
+def test_lookups_do_not_grow_the_vocabulary():
+    """Test words seen only in checked or rejected sentences are not ranked, and still match correctly."""
+    index = NearDuplicateIndex(threshold=0.7)
+    index.load(CORPUS)
+    words = index.stats()['words']
+
+    assert index.find("Il gatto dorme sul divano blu.") == (1, pytest.approx(5 / 7))
+    assert index.find("Una zebra mangia erba fresca.") is None
+    kept, rejected = index.filter_pairs([pair("Il gatto dorme sul divano verde."), pair("Il lupo ulula alla luna.")])
+    assert index.stats()['words'] == words
+    assert [p['italian'] for p, _, _ in rejected] == ["Il gatto dorme sul divano verde."]
+
+    # Only sentences actually added get their words ranked
+    index.add(5, kept[0]['italian'])
+    assert index.stats()['words'] == words + 4
+    assert index.find("Il lupo ulula alla luna piena.") == (5, pytest.approx(5 / 6))
+
+
+def test_sentences_added_while_loading_are_indexed():
+    """Test add() before the corpus is installed is applied afterwards, and new words are matched."""
+    index = NearDuplicateIndex(threshold=0.7)
+    index.add(10, "Zio Pasquale suona la fisarmonica stasera.")
+    assert index.filter_pairs([pair("Zio Pasquale suona la fisarmonica oggi.")])[1] == []
+
+    index.load(CORPUS)
+    assert len(index) == 5
+    assert index.find("Zio Pasquale suona la fisarmonica oggi.")[0] == 10
+
+
+@pytest.mark.asyncio
+async def test_load_pages_through_corpus():
+    """Test the corpus is read with keyset pagination."""
+    conn = AsyncMock()
+    conn.fetch.side_effect = [
+        [{'id': sentence_id, 'sentence': sentence} for sentence_id, sentence in CORPUS[:2]],
+        [{'id': sentence_id, 'sentence': sentence} for sentence_id, sentence in CORPUS[2:]],
+        [],
+    ]
+    acquire = MagicMock()
+    acquire.return_value.__aenter__ = AsyncMock(return_value=conn)
+    acquire.return_value.__aexit__ = AsyncMock(return_value=False)
+
+    index = NearDuplicateIndex()
+    with patch('src.database.near_duplicates.acquire_connection', acquire), \
+         patch('src.database.near_duplicates.LOAD_BATCH_SIZE', 2):
+        await load_near_duplicate_index(index)
+
+    assert index.ready and len(index) == 4
+    assert [call.args[1:] for call in conn.fetch.call_args_list] == [(0, 2), (2, 2), (4, 2)]
+
+
+@pytest.mark.asyncio
+async def test_store_skips_near_duplicates_and_indexes_inserted():
+    """Test store_sentence_pairs only inserts novel pairs and adds them to the index."""
+    index = NearDuplicateIndex(threshold=0.7)
+    index.load(CORPUS)
+    conn = AsyncMock()
+    conn.fetch.return_value = [{'id': 5, 'sentence': "Oggi il treno parte molto presto."}]
+    acquire = MagicMock()
+    acquire.return_value.__aenter__ = AsyncMock(return_value=conn)
+    acquire.return_value.__aexit__ = AsyncMock(return_value=False)
+
+    with patch.object(near_duplicates, '_index', index), \
+         patch('src.database.sentences.acquire_connection', acquire):
+        assert await store_sentence_pairs([pair("Il gatto dorme sul divano blu.")]) == (0, 1)
+        conn.fetch.assert_not_called()
+
+        inserted = await store_sentence_pairs([pair("Il gatto dorme sul divano blu."),
+                                               pair("Oggi il treno parte molto presto.")])
+
+    assert inserted == (1, 1)
+    assert conn.fetch.call_args.args[1] == ["Oggi il treno parte molto presto."]
+    assert index.find("Oggi il treno parte molto tardi.")[0] == 5
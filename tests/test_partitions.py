@@ -0,0 +1,99 @@
+"""Unit tests for results partition maintenance (mocked asyncpg, no live DB required)"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from datetime import date
+from unittest.mock import AsyncMock, patch
+from src.database import partitions
+from src.database.partitions import (
+    _add_months,
+    _parse_partition_month,
+    archive_partition,
+    maintain_results_partitions
+)
+
+
+def test_add_months_wraps_years():
+    """Test month arithmetic across year boundaries."""
+    assert _add_months(date(2025, 11, 1), 3) == date(2026, 2, 1)
+    assert _add_months(date(2025, 1, 1), -1) == date(2024, 12, 1)
+
+
+def test_parse_partition_month():
+    """Test only monthly partitions of the given table are recognized."""
+    assert _parse_partition_month('italian_sentences_results', 'italian_sentences_results_y2025m03') == date(2025, 3, 1)
+    assert _parse_partition_month('italian_sentences_results', 'italian_sentences_results_default') is None
+    assert _parse_partition_month('italian_sentences_results', 'missing_word_results_y2025m03') is None
+
+
+@pytest.mark.asyncio
+async def test_archive_partition_rejects_unknown_names():
+    """Test archival refuses names outside the partition naming scheme."""
+    with pytest.raises(ValueError):
+        await archive_partition(AsyncMock(), 'italian_sentences_results', 'users; DROP TABLE users')
+
+
+@pytest.mark.asyncio
+@patch('src.database.partitions._current_month', return_value=date(2025, 6, 1))
+async def test_maintenance_archives_only_expired_partitions(mock_current_month, patch_acquire):
+    """Test partitions older than the retention period are summarized, then detached."""
+    mock_conn = AsyncMock()
+    mock_conn.fetchval.return_value = 'partition'
+
+    async def fetch(query, table):
+        months = ['2025m02', '2025m03', '2025m04', '2025m05', '2025m06']
+        return [{'relname': f'{table}_y{month}'} for month in months] + [{'relname': f'{table}_default'}]
+
+    mock_conn.fetch.side_effect = fetch
+    with patch_acquire('partitions', mock_conn):
+        report = await maintain_results_partitions(months_ahead=2, retention_months=3, keep_detached=True)
+
+    # Current month plus two ahead, for both tables
+    assert mock_conn.fetchval.call_count == 6
+    assert report['archived'] == [
+        'italian_sentences_results_y2025m02', 'italian_sentences_results_y2025m03',
+        'missing_word_results_y2025m02', 'missing_word_results_y2025m03'
+    ]
+    statements = [call[0][0] for call in mock_conn.execute.call_args_list]
+    assert any('INSERT INTO results_archive' in statement for statement in statements)
+    assert any('DETACH PARTITION italian_sentences_results_y2025m02' in statement for statement in statements)
+    assert any('SET SCHEMA archive' in statement for statement in statements)
+    assert not any('DROP TABLE' in statement for statement in statements)
+    # Results probes are bounded to the months still attached
+    retention_args = [call[0] for call in mock_conn.execute.call_args_list if 'results_retention' in call[0][0]]
+    assert retention_args[-1][1:] == ('missing_word_results', date(2025, 4, 1))
+
+
+@pytest.mark.asyncio
+async def test_maintenance_keeps_everything_without_retention(patch_acquire):
+    """Test no partition is archived when retention is disabled."""
+    mock_conn = AsyncMock()
+    with patch_acquire('partitions', mock_conn):
+        report = await maintain_results_partitions(months_ahead=1, retention_months=0)
+
+    assert report['archived'] == []
+    mock_conn.fetch.assert_not_called()
+    mock_conn.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+@patch('src.database.partitions._current_month', return_value=date(2025, 6, 1))
+async def test_failed_partition_does_not_stop_maintenance(mock_current_month, patch_acquire):
+    """Test a month that cannot be created is logged and skipped."""
+    mock_conn = AsyncMock()
+
+    async def ensure(query, table, month):
+        if table == 'italian_sentences_results' and month == date(2025, 7, 1):
+            raise RuntimeError("updated partition constraint for default partition would be violated")
+        return f"{table}_y{month:%Ym%m}"
+
+    mock_conn.fetchval.side_effect = ensure
+    with patch_acquire('partitions', mock_conn):
+        report = await maintain_results_partitions(months_ahead=1, retention_months=0)
+
+    assert report['ensured'] == [
+        'italian_sentences_results_y2025m06', 'missing_word_results_y2025m06', 'missing_word_results_y2025m07'
+    ]
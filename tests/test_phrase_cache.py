@@ -0,0 +1,102 @@
+"""Unit tests for the in-memory phrase cache (mocked asyncpg, no live DB required)"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import asyncio
+from unittest.mock import AsyncMock, patch
+from src.database import (
+    get_random_encouraging_phrase,
+    get_random_error_phrase,
+    get_random_exercise_prompt
+)
+from src.database import phrases
+from src.database.phrases import PhraseCache, NOTIFY_CHANNEL
+
+
+def make_conn(tables):
+    """Mock connection whose fetch returns the rows of the queried table."""
+    mock_conn = AsyncMock()
+
+    async def fetch(query):
+        table = next(name for name, q in phrases.PHRASE_QUERIES.items() if q == query)
+        return [(value,) for value in tables.get(table, [])]
+
+    mock_conn.fetch.side_effect = fetch
+    return mock_conn
+
+
+@pytest.mark.asyncio
+async def test_load_and_choice(patch_acquire):
+    """Test phrases are loaded once and served from memory."""
+    mock_conn = make_conn({'encouraging_phrases': ['Bravissimo!', 'Ottimo!']})
+    with patch_acquire('phrases', mock_conn):
+        cache = PhraseCache(ttl=60)
+        await cache.load()
+
+    assert mock_conn.fetch.call_count == len(phrases.PHRASE_QUERIES)
+    for _ in range(10):
+        assert cache.choice('encouraging_phrases') in ('Bravissimo!', 'Ottimo!')
+    assert cache.choice('error_phrases') is None
+    assert mock_conn.fetch.call_count == len(phrases.PHRASE_QUERIES)
+
+
+@pytest.mark.asyncio
+async def test_notification_triggers_reload(patch_acquire):
+    """Test a phrases_changed notification reloads the cache and listener is closed on stop."""
+    tables = {'error_phrases': ['Quasi giusto']}
+    mock_conn = make_conn(tables)
+    listener_conn = AsyncMock()
+    with patch_acquire('phrases', mock_conn), \
+         patch('src.database.phrases.open_connection', AsyncMock(return_value=listener_conn)):
+        cache = await phrases.start_phrase_cache(ttl=60)
+        try:
+            listener_conn.add_listener.assert_called_once_with(NOTIFY_CHANNEL, cache._on_notification)
+            assert cache.choice('error_phrases') == 'Quasi giusto'
+
+            tables['error_phrases'] = ['Riprova']
+            cache._on_notification(listener_conn, 1, NOTIFY_CHANNEL, 'error_phrases')
+            await asyncio.sleep(0.01)
+            assert cache.choice('error_phrases') == 'Riprova'
+        finally:
+            await phrases.stop_phrase_cache()
+
+    listener_conn.close.assert_called_once()
+    assert phrases.get_phrase_cache() is None
+
+
+@pytest.mark.asyncio
+async def test_stale_cache_reloads_in_background(patch_acquire):
+    """Test an expired TTL serves the old phrases while reloading."""
+    tables = {'exercise_prompts': ['Vai!']}
+    mock_conn = make_conn(tables)
+    with patch_acquire('phrases', mock_conn):
+        cache = PhraseCache(ttl=60)
+        await cache.load()
+        cache._loaded_at -= 120
+        tables['exercise_prompts'] = ['Avanti!']
+
+        assert cache.choice('exercise_prompts') == 'Vai!'
+        await asyncio.sleep(0.01)
+        assert cache.choice('exercise_prompts') == 'Avanti!'
+
+
+@pytest.mark.asyncio
+async def test_sentence_helpers_use_cache(patch_acquire):
+    """Test phrase helpers read the running cache instead of querying the database."""
+    mock_conn = make_conn({'encouraging_phrases': ['Perfetto!'], 'exercise_prompts': ['Ancora!']})
+    listener_conn = AsyncMock()
+    with patch_acquire('phrases', mock_conn), \
+         patch('src.database.phrases.open_connection', AsyncMock(return_value=listener_conn)):
+        await phrases.start_phrase_cache(ttl=60)
+        try:
+            with patch('src.database.sentences.acquire_connection') as mock_acquire:
+                assert await get_random_encouraging_phrase() == 'Perfetto!'
+                assert await get_random_exercise_prompt() == 'Ancora!'
+                # Empty table falls back to the default phrase
+                assert await get_random_error_phrase() == 'Quasi!'
+                mock_acquire.assert_not_called()
+        finally:
+            await phrases.stop_phrase_cache()
@@ -0,0 +1,105 @@
+"""Unit tests for the sentence replenishment coordinator (mocked generation, no LLM required)"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import asyncio
+from unittest.mock import patch
+from src.database import replenishment
+from src.database.replenishment import ReplenishmentCoordinator
+from src.database.sentences import request_replenishment
+
+
+def make_generate(release: asyncio.Event, calls: list, running: list):
+    """Generation that records its caller and blocks until `release` is set."""
+    async def generate(user_id):
+        calls.append(user_id)
+        running.append(user_id)
+        try:
+            await release.wait()
+        finally:
+            running.remove(user_id)
+    return generate
+
+
+@pytest.mark.asyncio
+async def test_requests_from_all_users_share_one_generation():
+    """Test concurrent requests attach to the generation in flight."""
+    release, calls, running = asyncio.Event(), [], []
+    coordinator = ReplenishmentCoordinator(make_generate(release, calls, running))
+
+    tasks = [coordinator.request(user_id) for user_id in (1, 2, 3, 1)]
+    await asyncio.sleep(0)
+
+    assert len({id(task) for task in tasks}) == 1
+    assert calls == [1]
+    assert coordinator.coalesced == 3
+
+    release.set()
+    await tasks[0]
+
+    # A request after the generation finished starts a new one
+    await coordinator.request(4)
+    assert calls == [1, 4]
+    assert coordinator.generations == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_generations_are_capped():
+    """Test uncoalesced generations wait for a free slot."""
+    release, calls, running = asyncio.Event(), [], []
+    coordinator = ReplenishmentCoordinator(make_generate(release, calls, running), max_concurrent=2)
+
+    tasks = [coordinator.request(user_id, coalesce=False) for user_id in (1, 2, 3)]
+    await asyncio.sleep(0)
+
+    assert running == [1, 2]
+    assert coordinator.in_flight() == 3
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert calls == [1, 2, 3]
+    assert coordinator.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_generation():
+    """Test a waiter that is cancelled leaves the shared generation running."""
+    release, calls, running = asyncio.Event(), [], []
+    coordinator = ReplenishmentCoordinator(make_generate(release, calls, running))
+
+    waiter = asyncio.create_task(coordinator.wait(1))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.sleep(0)
+
+    assert running == [1]
+    release.set()
+    await coordinator.close()
+
+
+@pytest.mark.asyncio
+async def test_generation_errors_are_logged():
+    """Test a failing generation does not raise into the requester."""
+    async def failing(user_id):
+        raise RuntimeError("429 Too Many Requests")
+
+    coordinator = ReplenishmentCoordinator(failing)
+    await coordinator.request(1)
+    assert coordinator.generations == 1
+
+
+@pytest.mark.asyncio
+async def test_request_replenishment_uses_coordinator():
+    """Test request_replenishment goes through the shared coordinator when it is running."""
+    release, calls, running = asyncio.Event(), [], []
+    coordinator = ReplenishmentCoordinator(make_generate(release, calls, running))
+    with patch.object(replenishment, '_coordinator', coordinator):
+        request_replenishment(1)
+        request_replenishment(2)
+        await asyncio.sleep(0)
+        assert calls == [1]
+        release.set()
+        await coordinator.close()
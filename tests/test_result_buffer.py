@@ -0,0 +1,161 @@
+"""Unit tests for the exercise result write-behind buffer (mocked asyncpg, no live DB required)"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import asyncio
+import asyncpg
+from unittest.mock import AsyncMock, patch
+from src.database import store_sentence_result
+from src.database.results import ResultWriteBuffer, start_result_buffer, stop_result_buffer, RESULT_COLUMNS
+
+
+@pytest.mark.asyncio
+async def test_flush_on_batch_size(patch_acquire):
+    """Test a full batch is copied in one COPY call."""
+    mock_conn = AsyncMock()
+    with patch_acquire('results', mock_conn):
+        buffer = ResultWriteBuffer(batch_size=3, flush_interval=60)
+        buffer.start()
+        for sentence_id in range(3):
+            await buffer.put(1, sentence_id, True)
+        await asyncio.sleep(0.05)
+
+        mock_conn.copy_records_to_table.assert_called_once()
+        args, kwargs = mock_conn.copy_records_to_table.call_args
+        assert args[0] == 'italian_sentences_results'
+        assert kwargs['columns'] == RESULT_COLUMNS
+        assert [record[1] for record in kwargs['records']] == [0, 1, 2]
+        await buffer.stop()
+    assert buffer.flushed_rows == 3
+
+
+@pytest.mark.asyncio
+async def test_flush_on_interval(patch_acquire):
+    """Test a partial batch is flushed once the interval elapses."""
+    mock_conn = AsyncMock()
+    with patch_acquire('results', mock_conn):
+        buffer = ResultWriteBuffer(batch_size=100, flush_interval=0.05)
+        buffer.start()
+        await buffer.put(1, 10, False)
+        await asyncio.sleep(0.2)
+
+        mock_conn.copy_records_to_table.assert_called_once()
+        await buffer.stop()
+
+
+@pytest.mark.asyncio
+async def test_stop_flushes_pending_rows(patch_acquire):
+    """Test shutdown writes every queued row before returning."""
+    mock_conn = AsyncMock()
+    with patch_acquire('results', mock_conn):
+        buffer = ResultWriteBuffer(batch_size=100, flush_interval=60)
+        buffer.start()
+        await buffer.put(1, 10, True)
+        await buffer.put(2, 11, False)
+        await buffer.stop()
+
+    mock_conn.copy_records_to_table.assert_called_once()
+    records = mock_conn.copy_records_to_table.call_args.kwargs['records']
+    assert [(r[0], r[1], r[2]) for r in records] == [(1, 10, True), (2, 11, False)]
+    with pytest.raises(RuntimeError):
+        await buffer.put(3, 12, True)
+
+
+@pytest.mark.asyncio
+async def test_integrity_error_skips_only_bad_rows(patch_acquire):
+    """Test a constraint violation falls back to row-by-row writes."""
+    mock_conn = AsyncMock()
+    calls = []
+
+    async def copy(table, records, columns):
+        calls.append(list(records))
+        if len(records) > 1 or records[0][1] == 99:
+            raise asyncpg.ForeignKeyViolationError("missing sentence")
+
+    mock_conn.copy_records_to_table.side_effect = copy
+    with patch_acquire('results', mock_conn):
+        buffer = ResultWriteBuffer(batch_size=100, flush_interval=60)
+        buffer.start()
+        await buffer.put(1, 10, True)
+        await buffer.put(1, 99, True)
+        await buffer.stop()
+
+    assert buffer.flushed_rows == 1
+    assert buffer.dropped_rows == 1
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+@patch('src.database.asyncpg.connect')
+async def test_store_sentence_result_uses_buffer(mock_connect, patch_acquire):
+    """Test store_sentence_result queues instead of inserting when the buffer runs."""
+    mock_conn = AsyncMock()
+    with patch_acquire('results', mock_conn):
+        start_result_buffer(batch_size=100, flush_interval=60)
+        try:
+            await store_sentence_result(12345, 678, True)
+            mock_connect.assert_not_called()
+            mock_conn.copy_records_to_table.assert_not_called()
+        finally:
+            await stop_result_buffer()
+
+    mock_conn.copy_records_to_table.assert_called_once()
+    record = mock_conn.copy_records_to_table.call_args.kwargs['records'][0]
+    assert record[:3] == (12345, 678, True)
+
+
+@pytest.mark.asyncio
+async def test_flush_updates_rollups_in_transaction(patch_acquire):
+    """Test each flushed batch updates user_progress, daily_stats and user_last_attempt inside the COPY transaction."""
+    mock_conn = AsyncMock()
+    with patch_acquire('results', mock_conn):
+        buffer = ResultWriteBuffer(batch_size=100, flush_interval=60)
+        buffer.start()
+        await buffer.put(1, 10, True)
+        await buffer.put(2, 11, False)
+        await buffer.stop()
+
+    mock_conn.transaction.assert_called_once()
+    assert mock_conn.execute.call_count == 3
+    progress_args, daily_args, last_attempt_args = [call[0] for call in mock_conn.execute.call_args_list]
+    assert "INSERT INTO user_progress" in progress_args[0]
+    assert progress_args[1:5] == ('sentence_ordering', [1, 2], [10, 11], [True, False])
+    assert "INSERT INTO daily_stats" in daily_args[0]
+    assert daily_args[1:4] == ('sentence_ordering', [1, 2], [True, False])
+    assert "INSERT INTO user_last_attempt" in last_attempt_args[0]
+    assert last_attempt_args[1:4] == ('sentence_ordering', [1, 2], [10, 11])
+
+
+@pytest.mark.asyncio
+async def test_connection_error_during_fallback_is_retried(patch_acquire):
+    """Test a dropped connection while writing rows one by one neither kills the flusher nor rewrites rows."""
+    mock_conn = AsyncMock()
+    written = []
+    outage = [True]
+
+    async def copy(table, records, columns):
+        if len(records) > 1:
+            raise asyncpg.ForeignKeyViolationError("missing sentence")
+        if records[0][1] == 11 and outage[0]:
+            outage[0] = False
+            raise ConnectionError("connection lost")
+        written.append(records[0][1])
+
+    mock_conn.copy_records_to_table.side_effect = copy
+    with patch_acquire('results', mock_conn):
+        buffer = ResultWriteBuffer(batch_size=3, flush_interval=0.01, max_pending=3)
+        buffer.start()
+        for sentence_id in (10, 11, 12):
+            await buffer.put(1, sentence_id, True)
+        # Later results still drain once the queue has filled up
+        for sentence_id in range(20, 26):
+            await asyncio.wait_for(buffer.put(1, sentence_id, True), 1)
+        await buffer.stop()
+
+    assert written[:3] == [10, 11, 12]
+    assert sorted(written) == [10, 11, 12] + list(range(20, 26))
+    assert buffer.flushed_rows == 9
+    assert buffer.dropped_rows == 0
@@ -148,3 +148,70 @@ async def test_rus_command_user_creation(mock_get_last, mock_get_or_create):
     
     # Verify user creation is called
     mock_get_or_create.assert_called_once_with(mock_message.from_user)
+
+
+@pytest.mark.asyncio
+@patch('src.exercises.sentence_ordering.get_sentence_translation')
+@patch('src.exercises.sentence_ordering.get_last_attempted_sentence')
+@patch('src.bot_commands.rus.get_or_create_user')
+@patch('src.bot_commands.rus.get_last_attempted_sentence')
+async def test_rus_command_uses_exercise_memory(mock_get_last, mock_get_or_create,
+                                                mock_exercise_get_last, mock_get_translation):
+    """Test /rus answers from the exercise's in-memory last attempt without a results lookup"""
+    mock_get_or_create.return_value = None
+    mock_get_translation.return_value = {'italian': 'Il gatto dorme', 'russian': 'Кот спит'}
+
+    from src.state.learning_state import LearningState
+    from src.exercises.sentence_ordering import SentenceOrderingExercise
+    learning_state = LearningState()
+    exercise = SentenceOrderingExercise(learning_state, sentence_deck=MagicMock())
+    exercise._record_attempt(12345, 7, 'Il gatto dorme')
+
+    mock_message = AsyncMock(spec=Message)
+    mock_message.from_user = User(id=12345, first_name="Test", is_bot=False, language_code="en")
+    mock_message.answer = AsyncMock()
+
+    handler = create_rus_command_handler(learning_state, AsyncMock(), exercise)
+    await handler(mock_message)
+    await handler(mock_message)
+
+    mock_get_last.assert_not_called()
+    mock_exercise_get_last.assert_not_called()
+    # The translation is looked up by sentence ID once, then served from memory
+    mock_get_translation.assert_called_once_with(7)
+    message_text = mock_message.answer.call_args[0][0]
+    assert "Il gatto dorme" in message_text
+    assert "Кот спит" in message_text
+
+
+@pytest.mark.asyncio
+@patch('src.exercises.sentence_ordering.get_last_attempted_sentence')
+async def test_last_attempt_falls_back_to_persisted_pointer(mock_exercise_get_last):
+    """Test users without an in-memory attempt are answered from the persisted pointer"""
+    mock_exercise_get_last.return_value = {'italian': 'Ciao', 'russian': 'Привет'}
+
+    from src.state.learning_state import LearningState
+    from src.exercises.sentence_ordering import SentenceOrderingExercise
+    exercise = SentenceOrderingExercise(LearningState(), sentence_deck=MagicMock())
+
+    assert await exercise.get_last_attempted_sentence(12345) == {'italian': 'Ciao', 'russian': 'Привет'}
+    mock_exercise_get_last.assert_called_once_with(12345)
+
+
+@pytest.mark.asyncio
+@patch('src.exercises.sentence_ordering.get_last_attempted_sentence')
+async def test_last_attempt_memory_is_bounded(mock_exercise_get_last):
+    """Test only the most recent users' attempts stay in memory and older ones use the persisted pointer"""
+    mock_exercise_get_last.return_value = {'italian': 'Ciao', 'russian': 'Привет'}
+
+    from src.state.learning_state import LearningState
+    from src.exercises.sentence_ordering import SentenceOrderingExercise
+    exercise = SentenceOrderingExercise(LearningState(), sentence_deck=MagicMock(), max_cached_users=2)
+    exercise._record_attempt(1, 10, 'Uno')
+    exercise._record_attempt(2, 20, 'Due')
+    exercise._record_attempt(1, 11, 'Uno di nuovo')
+    exercise._record_attempt(3, 30, 'Tre')
+
+    assert list(exercise._last_attempted) == [1, 3]
+    assert await exercise.get_last_attempted_sentence(2) == {'italian': 'Ciao', 'russian': 'Привет'}
+    mock_exercise_get_last.assert_called_once_with(2)
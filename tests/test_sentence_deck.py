@@ -0,0 +1,115 @@
+"""Unit tests for the prefetched sentence deck (mocked database, no live DB required)"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import asyncio
+from unittest.mock import AsyncMock, patch
+from src.state.sentence_deck import SentenceDeck
+
+
+def make_sentences(start: int, count: int):
+    return [(i, f"Frase numero {i}") for i in range(start, start + count)]
+
+
+@pytest.mark.asyncio
+@patch('src.state.sentence_deck.get_random_sentence', new_callable=AsyncMock)
+@patch('src.state.sentence_deck.get_unsolved_sentences', new_callable=AsyncMock)
+async def test_next_sentence_pops_from_batched_fetch(mock_unsolved, mock_random):
+    """Test the first pop fetches a whole deck and later pops stay in memory."""
+    mock_unsolved.return_value = make_sentences(1, 5)
+    deck = SentenceDeck(deck_size=5, low_water_mark=0)
+
+    assert await deck.next_sentence(42) == (1, "Frase numero 1")
+    assert await deck.next_sentence(42) == (2, "Frase numero 2")
+    assert deck.remaining(42) == 3
+    mock_unsolved.assert_called_once_with(42, 5, [])
+    mock_random.assert_not_called()
+
+
+@pytest.mark.asyncio
+@patch('src.state.sentence_deck.get_unsolved_sentences', new_callable=AsyncMock)
+async def test_low_water_mark_triggers_background_refill(mock_unsolved):
+    """Test dropping below the low-water mark refills without re-fetching held ids."""
+    mock_unsolved.side_effect = [make_sentences(1, 3), make_sentences(10, 1)]
+    deck = SentenceDeck(deck_size=3, low_water_mark=3)
+
+    assert await deck.next_sentence(42) == (1, "Frase numero 1")
+    # Let the background refill run
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    assert mock_unsolved.call_count == 2
+    user_id, limit, held = mock_unsolved.call_args_list[1][0]
+    assert user_id == 42
+    assert limit == 1
+    assert set(held) == {1, 2, 3}
+    assert deck.remaining(42) == 3
+
+
+@pytest.mark.asyncio
+@patch('src.state.sentence_deck.get_unsolved_sentences', new_callable=AsyncMock)
+async def test_invalidate_drops_prefetched_sentences(mock_unsolved):
+    """Test invalidation forces a fresh fetch on the next pop."""
+    mock_unsolved.side_effect = [make_sentences(1, 3), make_sentences(20, 3)]
+    deck = SentenceDeck(deck_size=3, low_water_mark=0)
+
+    await deck.next_sentence(42)
+    deck.invalidate()
+    assert deck.remaining(42) == 0
+
+    assert await deck.next_sentence(42) == (20, "Frase numero 20")
+    assert mock_unsolved.call_count == 2
+
+
+@pytest.mark.asyncio
+@patch('src.state.sentence_deck.get_random_sentence', new_callable=AsyncMock)
+@patch('src.state.sentence_deck.get_unsolved_sentences', new_callable=AsyncMock)
+async def test_empty_deck_falls_back_to_random_sentence(mock_unsolved, mock_random):
+    """Test a user with no unsolved sentences still gets an exercise."""
+    mock_unsolved.return_value = []
+    mock_random.return_value = (7, "Ciao come stai")
+    deck = SentenceDeck(deck_size=5, low_water_mark=1)
+
+    assert await deck.next_sentence(42) == (7, "Ciao come stai")
+    mock_random.assert_called_once_with(42)
+
+
+@pytest.mark.asyncio
+@patch('src.state.sentence_deck.get_unsolved_sentences', new_callable=AsyncMock)
+async def test_refresh_waiting_refills_only_running_out_decks(mock_unsolved):
+    """Test new sentences reach users with an empty deck without refetching full decks."""
+    mock_unsolved.side_effect = [make_sentences(1, 3), [], make_sentences(30, 2)]
+    deck = SentenceDeck(deck_size=3, low_water_mark=1)
+
+    await deck._refill(1)   # full deck
+    await deck._refill(2)   # user who ran out of sentences
+    deck.refresh_waiting()
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    assert mock_unsolved.call_count == 3
+    assert mock_unsolved.call_args[0][0] == 2
+    assert deck.remaining(1) == 3
+    assert deck.remaining(2) == 2
+
+
+@pytest.mark.asyncio
+@patch('src.state.sentence_deck.get_unsolved_sentences', new_callable=AsyncMock)
+async def test_least_recently_active_users_are_forgotten(mock_unsolved):
+    """Test only the most recently active users keep a deck in memory."""
+    mock_unsolved.side_effect = lambda user_id, limit, held: make_sentences(user_id * 10, limit)
+    deck = SentenceDeck(deck_size=3, low_water_mark=0, max_users=2)
+
+    await deck.next_sentence(1)
+    await deck.next_sentence(2)
+    await deck.next_sentence(1)
+    await deck.next_sentence(3)
+
+    assert deck.remaining(1) == 1
+    assert deck.remaining(2) == 0
+    assert deck.remaining(3) == 2
+    assert set(deck._decks) == {1, 3}
+    assert set(deck._last_served) == {1, 3}
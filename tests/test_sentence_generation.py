@@ -6,9 +6,11 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import pytest
 import asyncio
+from contextlib import asynccontextmanager
 from unittest.mock import AsyncMock, patch, MagicMock
-from src.database.sentences import sentence_replenishment
+from src.database.sentences import sentence_replenishment, store_sentence_pairs
 from src.database.base import SentenceList
+from src.database.llm_limits import LLMCallGuard
 
 @pytest.fixture(scope="session")
 def event_loop():
@@ -18,13 +20,14 @@ def event_loop():
 
 @pytest.mark.asyncio
 @patch('src.database.sentences.get_llm_config')
-@patch('src.database.sentences.get_database_config')
-@patch('src.database.sentences.execute_with_retry_sync')
+@patch('src.database.connection.get_database_config')
+@patch('src.database.sentences.execute_with_retry')
 @patch('src.database.sentences.asyncpg.connect')
 async def test_sentence_replenishment_success(mock_llm_config, mock_db_config, mock_retry, mock_connect):
     """Test successful sentence replenishment"""
     # Setup mocks
     mock_llm_config.return_value.api_key = "test-key"
+    mock_llm_config.return_value.streaming = False
     mock_llm_config.return_value.model_name = "test-model"
     mock_llm_config.return_value.api_url = "https://test.api"
     
@@ -64,14 +67,15 @@ async def test_sentence_replenishment_no_api_key(mock_llm_config):
 
 @pytest.mark.asyncio
 @patch('src.database.sentences.get_llm_config')
-@patch('src.database.sentences.get_database_config')
-@patch('src.database.sentences.execute_with_retry_sync')
+@patch('src.database.connection.get_database_config')
+@patch('src.database.sentences.execute_with_retry')
 @patch('src.database.sentences.asyncpg.connect')
 @patch('src.database.base.get_validation_config')
 async def test_sentence_replenishment_with_duplicates(mock_validation_config, mock_connect, mock_retry, mock_db_config, mock_llm_config):
     """Test sentence replenishment with duplicate sentences"""
     # Setup mocks
     mock_llm_config.return_value.api_key = "test-key"
+    mock_llm_config.return_value.streaming = False
     mock_llm_config.return_value.model_name = "test-model"
     mock_llm_config.return_value.api_url = "https://test.api"
     
@@ -92,30 +96,35 @@ async def test_sentence_replenishment_with_duplicates(mock_validation_config, mo
         type('SentenceWithTranslation', (), {'italian': "Terza frase di esempio.", 'russian': "Третье примерное предложение."})
     ]
     
-    # Mock database connection - first sentence exists, others don't
+    # Mock database connection - first sentence exists, so only two ids are returned
     mock_conn = AsyncMock()
-    mock_conn.fetchrow.side_effect = [
-        {'id': 1},  # First sentence exists
-        None,       # Second sentence doesn't exist
-        None        # Third sentence doesn't exist
-    ]
+    mock_conn.fetch.return_value = [{'id': 2}, {'id': 3}]
     mock_connect.return_value = mock_conn
     
     # Test
     user_id = 12345
-    await sentence_replenishment(user_id)
+    with patch('src.database.sentences._notify_new_sentences') as mock_notify:
+        await sentence_replenishment(user_id)
     
-    # Verify - should only insert the non-duplicate sentences
-    assert mock_conn.execute.call_count == 2  # Only for non-existing sentences
+    # Verify - all pairs go to the database in one deduplicating insert
+    mock_conn.fetch.assert_called_once()
+    args = mock_conn.fetch.call_args[0]
+    assert "ON CONFLICT (sentence_hash) DO NOTHING" in args[0]
+    assert len(args[1]) == 3
+    assert len(args[2]) == 3
+    mock_conn.fetchrow.assert_not_called()
+    mock_conn.execute.assert_not_called()
+    mock_notify.assert_called_once()
     mock_conn.close.assert_called_once()
 
 @pytest.mark.asyncio
 @patch('src.database.sentences.get_llm_config')
-@patch('src.database.sentences.get_database_config')
-@patch('src.database.sentences.execute_with_retry_sync')
+@patch('src.database.connection.get_database_config')
+@patch('src.database.sentences.execute_with_retry')
 async def test_sentence_replenishment_llm_error(mock_retry, mock_db_config, mock_llm_config):
     """Test sentence replenishment when LLM generation fails"""
     mock_llm_config.return_value.api_key = "test-key"
+    mock_llm_config.return_value.streaming = False
     mock_llm_config.return_value.model_name = "test-model"
     mock_llm_config.return_value.api_url = "https://test.api"
     
@@ -130,4 +139,305 @@ async def test_sentence_replenishment_llm_error(mock_retry, mock_db_config, mock
     
     user_id = 12345
     # Should not raise exception, just log the error
-    await sentence_replenishment(user_id)
\ No newline at end of file
+    await sentence_replenishment(user_id)
+@pytest.mark.asyncio
+@patch('src.database.sentences.asyncpg.connect')
+async def test_store_sentence_pairs_reports_duplicates(mock_connect):
+    """Test the bulk insert reports inserted and duplicate counts"""
+    mock_conn = AsyncMock()
+    mock_conn.fetch.return_value = [{'id': 7}]
+    mock_connect.return_value = mock_conn
+
+    pairs = [
+        {'italian': 'Il gatto dorme', 'russian': 'Кот спит'},
+        {'italian': 'il  gatto dorme', 'russian': 'Кот спит'}
+    ]
+    inserted, duplicates = await store_sentence_pairs(pairs)
+
+    assert (inserted, duplicates) == (1, 1)
+    args = mock_conn.fetch.call_args[0]
+    assert "unnest($1::text[], $2::text[])" in args[0]
+    assert args[1] == ['Il gatto dorme', 'il  gatto dorme']
+    assert args[2] == ['Кот спит', 'Кот спит']
+
+
+@pytest.mark.asyncio
+async def test_store_sentence_pairs_empty():
+    """Test an empty batch does not touch the database"""
+    with patch('src.database.sentences.acquire_connection') as mock_acquire:
+        assert await store_sentence_pairs([]) == (0, 0)
+        mock_acquire.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_llm_client_is_shared():
+    """Test the LLM client is created once, reused, and closed on shutdown"""
+    from src.database import base
+
+    with patch('src.database.base.get_llm_config') as mock_llm_config:
+        mock_llm_config.return_value.api_key = "test-key"
+        mock_llm_config.return_value.api_url = "https://test.api"
+        mock_llm_config.return_value.max_connections = 4
+        mock_llm_config.return_value.keepalive_expiry = 30.0
+        mock_llm_config.return_value.request_timeout = 60.0
+        mock_llm_config.return_value.http2 = False
+
+        client = base.get_llm_client()
+        try:
+            assert base.get_llm_client() is client
+            assert client.http2 is False
+            assert client.openai.max_retries == 0
+            mock_llm_config.assert_called_once()
+        finally:
+            await base.close_llm_client()
+        assert base._llm_client is None
+
+
+@pytest.mark.asyncio
+@patch('src.database.sentences.get_llm_client')
+async def test_sentence_replenishment_awaits_async_client(mock_get_client):
+    """Test generation awaits the shared async client instead of running in a thread"""
+    client = MagicMock()
+    completion = MagicMock()
+    completion.usage.total_tokens = 1200
+    client.instructor.chat.completions.create_with_completion = AsyncMock(return_value=(type(
+        'SentenceTranslationList', (), {'sentences': []}), completion))
+    mock_get_client.return_value = client
+    guard = LLMCallGuard(estimated_tokens=3000)
+
+    with patch('src.database.sentences.get_llm_config') as mock_llm_config, \
+         patch('src.database.sentences.get_llm_call_guard', return_value=guard):
+        mock_llm_config.return_value.api_key = "test-key"
+        mock_llm_config.return_value.streaming = False
+        await sentence_replenishment(12345)
+
+    client.instructor.chat.completions.create_with_completion.assert_awaited_once()
+    # The call went through the shared guard and its reservation was corrected to the actual usage
+    assert guard.calls == 1
+    assert guard.tokens.capacity - guard.tokens.available() < 1300
+
+
+@pytest.mark.asyncio
+@patch('src.database.sentences.store_sentence_pairs', new_callable=AsyncMock)
+@patch('src.database.sentences.get_llm_client')
+async def test_sentence_replenishment_manual_parsing_fallback(mock_get_client, mock_store):
+    """Test free-text lines are stored when the structured call fails"""
+    client = MagicMock()
+    client.instructor.chat.completions.create_with_completion = AsyncMock(side_effect=ValueError("bad tool call"))
+    raw_response = MagicMock()
+    raw_response.choices[0].message.content = (
+        "Italian: Il gatto dorme sul divano. | Russian: Кот спит на диване.\n"
+        "Italian: Oggi piove molto forte. | Russian: Сегодня идёт сильный дождь."
+    )
+    client.openai.chat.completions.create = AsyncMock(return_value=raw_response)
+    mock_get_client.return_value = client
+    mock_store.return_value = (2, 0)
+
+    with patch('src.database.sentences.get_llm_config') as mock_llm_config, \
+         patch('src.database.sentences.get_llm_call_guard', return_value=LLMCallGuard()), \
+         patch('src.database.sentences._notify_new_sentences'):
+        mock_llm_config.return_value.api_key = "test-key"
+        mock_llm_config.return_value.streaming = False
+        await sentence_replenishment(12345)
+
+    mock_store.assert_awaited_once()
+    stored = mock_store.call_args[0][0]
+    assert stored[0] == {'italian': "Il gatto dorme sul divano.", 'russian': "Кот спит на диване."}
+    assert len(stored) == 2
+
+
+def stream_chunk(content=None, total_tokens=None):
+    """Streamed chat completion chunk with a content delta, or the final usage-only chunk"""
+    chunk = MagicMock()
+    if content is None:
+        chunk.choices = []
+        chunk.usage.total_tokens = total_tokens
+    else:
+        chunk.choices[0].delta.content = content
+        chunk.usage = None
+    return chunk
+
+
+class FakeStream:
+    """Async iterator over chunks that records how far the consumer has read"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.consumed = 0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        # Hand control back to the event loop between chunks, like waiting on the network
+        await asyncio.sleep(0)
+        if self.consumed == len(self.chunks):
+            raise StopAsyncIteration
+        self.consumed += 1
+        return self.chunks[self.consumed - 1]
+
+
+@pytest.mark.asyncio
+@patch('src.database.sentences.get_llm_client')
+async def test_streaming_stores_each_line_before_the_response_ends(mock_get_client):
+    """Test streamed pairs are validated, stored and announced as soon as their line is complete"""
+    stream = FakeStream([
+        stream_chunk("Italian: Il gatto dorme "),
+        stream_chunk("sul divano. | Russian: Кот спит на диване.\nItalian: Ciao"),
+        stream_chunk(" | Russian: Привет\nItalian: Oggi piove molto forte. | Russian: Сегодня идёт сильный дождь."),
+        stream_chunk(total_tokens=400),
+    ])
+    client = MagicMock()
+    client.openai.chat.completions.create = AsyncMock(return_value=stream)
+    mock_get_client.return_value = client
+    guard = LLMCallGuard(estimated_tokens=3000)
+    progress = []
+
+    async def store(pairs):
+        progress.append((stream.consumed, [pair['italian'] for pair in pairs]))
+        return len(pairs), 0
+
+    with patch('src.database.sentences.get_llm_config') as mock_llm_config, \
+         patch('src.database.sentences.get_llm_call_guard', return_value=guard), \
+         patch('src.database.sentences.store_sentence_pairs', side_effect=store), \
+         patch('src.database.sentences._journal_response') as mock_journal, \
+         patch('src.database.sentences._notify_new_sentences') as mock_notify:
+        mock_llm_config.return_value.api_key = "test-key"
+        mock_llm_config.return_value.streaming = True
+        await sentence_replenishment(12345)
+
+    # The first pair was stored after the second chunk, the invalid "Ciao" line never reached the database
+    assert progress == [(2, ["Il gatto dorme sul divano."]), (4, ["Oggi piove molto forte."])]
+    assert mock_notify.call_count == 2
+    assert client.openai.chat.completions.create.call_args.kwargs['stream'] is True
+    client.instructor.chat.completions.create_with_completion.assert_not_called()
+    # Completed lines are journaled as they arrive, and the actual usage corrected the reservation
+    journaled = [call.args for call in mock_journal.call_args_list]
+    assert [kind for kind, *_ in journaled] == ['text', 'text', 'text']
+    assert journaled[0][1] == "Italian: Il gatto dorme sul divano. | Russian: Кот спит на диване."
+    assert ''.join(text for _, text, *_ in journaled).count('Italian:') == 3
+    assert guard.tokens.capacity - guard.tokens.available() < 500
+
+
+@pytest.mark.asyncio
+@patch('src.database.sentences.get_llm_client')
+async def test_streaming_stores_outside_the_guarded_call(mock_get_client):
+    """Test a slow database insert neither stalls the stream nor keeps the guarded LLM call open"""
+    stream = FakeStream([
+        stream_chunk("Italian: Il gatto dorme sul divano. | Russian: Кот спит на диване.\n"),
+        stream_chunk("Italian: Oggi piove molto forte. | Russian: Сегодня идёт сильный дождь.\n"),
+        stream_chunk(total_tokens=400),
+    ])
+    client = MagicMock()
+    client.openai.chat.completions.create = AsyncMock(return_value=stream)
+    mock_get_client.return_value = client
+    guard = LLMCallGuard(estimated_tokens=3000)
+    call_finished = asyncio.Event()
+    guarded_call = guard.call
+
+    @asynccontextmanager
+    async def tracked_call(*args, **kwargs):
+        async with guarded_call(*args, **kwargs) as usage:
+            yield usage
+        call_finished.set()
+
+    async def store(pairs):
+        # Only returns once the guarded call is over, which deadlocks if inserts run inside it
+        await call_finished.wait()
+        return len(pairs), 0
+
+    guard.call = tracked_call
+    with patch('src.database.sentences.get_llm_config') as mock_llm_config, \
+         patch('src.database.sentences.get_llm_call_guard', return_value=guard), \
+         patch('src.database.sentences.store_sentence_pairs', side_effect=store) as mock_store, \
+         patch('src.database.sentences._notify_new_sentences'):
+        mock_llm_config.return_value.api_key = "test-key"
+        mock_llm_config.return_value.streaming = True
+        await asyncio.wait_for(sentence_replenishment(12345), timeout=2)
+
+    assert mock_store.await_count == 2
+    client.instructor.chat.completions.create_with_completion.assert_not_called()
+
+
+class BrokenStream(FakeStream):
+    """FakeStream whose connection drops once its chunks are used up"""
+
+    async def __anext__(self):
+        if self.consumed == len(self.chunks):
+            raise ConnectionError("stream disconnected")
+        return await super().__anext__()
+
+
+@pytest.mark.asyncio
+@patch('src.database.sentences.get_llm_client')
+async def test_streaming_failure_after_stored_pairs_keeps_them(mock_get_client):
+    """Test a stream dropped after some sentences were stored does not pay for a full response as well"""
+    stream = BrokenStream([
+        stream_chunk("Italian: Il gatto dorme sul divano. | Russian: Кот спит на диване.\n"),
+        stream_chunk("Italian: Oggi piove molto forte. | Russian: Сегодня идёт сильный дождь.\nItalian: Il c"),
+    ])
+    client = MagicMock()
+    client.openai.chat.completions.create = AsyncMock(return_value=stream)
+    mock_get_client.return_value = client
+
+    with patch('src.database.sentences.get_llm_config') as mock_llm_config, \
+         patch('src.database.sentences.get_llm_call_guard', return_value=LLMCallGuard()), \
+         patch('src.database.sentences.store_sentence_pairs', AsyncMock(return_value=(1, 0))) as mock_store, \
+         patch('src.database.sentences._journal_response'), \
+         patch('src.database.sentences._notify_new_sentences'), \
+         patch('src.database.sentences.execute_with_retry') as mock_retry:
+        mock_llm_config.return_value.api_key = "test-key"
+        mock_llm_config.return_value.streaming = True
+        await sentence_replenishment(12345)
+
+    assert mock_store.await_count == 2
+    mock_retry.assert_not_called()
+    client.instructor.chat.completions.create_with_completion.assert_not_called()
+
+
+@pytest.mark.asyncio
+@patch('src.database.sentences.get_llm_client')
+async def test_streaming_without_valid_pairs_falls_back_to_full_response(mock_get_client):
+    """Test a stream that ignored the line format is retried as a structured request"""
+    stream = FakeStream([
+        stream_chunk('{"sentences": [{"italian": "Il gatto dorme sul divano.", '),
+        stream_chunk('"russian": "Кот спит на диване."}]}'),
+        stream_chunk(total_tokens=400),
+    ])
+    client = MagicMock()
+    client.openai.chat.completions.create = AsyncMock(return_value=stream)
+    client.instructor.chat.completions.create_with_completion = AsyncMock(return_value=(type(
+        'SentenceTranslationList', (), {'sentences': []}), MagicMock()))
+    mock_get_client.return_value = client
+
+    with patch('src.database.sentences.get_llm_config') as mock_llm_config, \
+         patch('src.database.sentences.get_llm_call_guard', return_value=LLMCallGuard()), \
+         patch('src.database.sentences.store_sentence_pairs') as mock_store, \
+         patch('src.database.sentences._journal_response') as mock_journal:
+        mock_llm_config.return_value.api_key = "test-key"
+        mock_llm_config.return_value.streaming = True
+        await sentence_replenishment(12345)
+
+    mock_store.assert_not_called()
+    # The unparseable stream is still journaled before the structured request
+    assert mock_journal.call_args_list[0].args[0] == 'text'
+    client.instructor.chat.completions.create_with_completion.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+@patch('src.database.sentences.get_llm_client')
+async def test_streaming_failure_falls_back_to_full_response(mock_get_client):
+    """Test a provider without streaming support still gets the structured request"""
+    client = MagicMock()
+    client.openai.chat.completions.create = AsyncMock(side_effect=ValueError("stream not supported"))
+    client.instructor.chat.completions.create_with_completion = AsyncMock(return_value=(type(
+        'SentenceTranslationList', (), {'sentences': []}), MagicMock()))
+    mock_get_client.return_value = client
+
+    with patch('src.database.sentences.get_llm_config') as mock_llm_config, \
+         patch('src.database.sentences.get_llm_call_guard', return_value=LLMCallGuard()):
+        mock_llm_config.return_value.api_key = "test-key"
+        mock_llm_config.return_value.streaming = True
+        await sentence_replenishment(12345)
+
+    client.instructor.chat.completions.create_with_completion.assert_awaited_once()
@@ -34,7 +34,11 @@ async def test_sentence_replenishment_does_not_block():
             main_loop_blocked = True
     
     # Mock the LLM API call to simulate a slow response
-    with patch('src.database.sentences.execute_with_retry_sync') as mock_retry:
+    with patch('src.database.sentences.get_llm_config') as mock_llm_config, \
+         patch('src.database.sentences.execute_with_retry') as mock_retry:
+        mock_llm_config.return_value.api_key = "test-key"
+        mock_llm_config.return_value.streaming = False
+        
         # Mock the generate_sentences function to simulate a slow API call
         def slow_generate_sentences():
             time.sleep(0.3)  # Simulate 300ms API call
@@ -65,11 +69,12 @@ async def test_sentence_replenishment_with_mock_llm():
     Test sentence_replenishment with mocked LLM to ensure it works correctly.
     """
     with patch('src.database.sentences.get_llm_config') as mock_llm_config, \
-         patch('src.database.sentences.execute_with_retry_sync') as mock_retry, \
+         patch('src.database.sentences.execute_with_retry') as mock_retry, \
          patch('src.database.sentences.asyncpg.connect') as mock_connect:
         
         # Setup mocks
         mock_llm_config.return_value.api_key = "test-key"
+        mock_llm_config.return_value.streaming = False
         
         def mock_generate_sentences():
             return ["Ciao come stai", "Buongiorno", "Come ti chiami"]
@@ -0,0 +1,74 @@
+"""Unit tests for the compiled sentence validator"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import MagicMock, patch
+from src.database.validation import SentenceValidator, get_sentence_validator
+
+ITALIAN = set("abcdefghiklmnopqrstuvzàèéìíîòóùú .,;:!?'-—")
+RUSSIAN = set("абвгдеёжзийклмнопрстуфхцчшщъыьэюя .,;:!?'-—")
+
+
+def test_batch_reports_reasons_per_rule():
+    """Test every rejected pair lists the rules it broke and the batch counts them."""
+    validator = SentenceValidator(ITALIAN, RUSSIAN)
+    result = validator.validate_batch([
+        {'italian': "  Il gatto   dorme sul divano. ", 'russian': "Кот спит на диване."},
+        {'italian': "Ciao", 'russian': "Привет"},
+        {'italian': "Hello world questo non va", 'russian': "Hello"},
+        {'italian': "Ciao come stai CIAO", 'russian': "Привет как дела"},
+        type('Pair', (), {'italian': "Uno due tre quattro cinque sei sette otto nove dieci undici", 'russian': "Числа"})(),
+        "not a pair",
+    ])
+
+    assert result.valid == [{'italian': "Il gatto dorme sul divano.", 'russian': "Кот спит на диване."}]
+    assert [(position, reasons) for position, _, _, reasons in result.rejected] == [
+        (2, ['italian_too_few_words']),
+        (3, ['italian_invalid_characters', 'russian_invalid_characters']),
+        (4, ['italian_duplicate_words']),
+        (5, ['italian_too_many_words']),
+        (6, ['malformed_pair']),
+    ]
+    assert result.summary() == {
+        'valid': 1,
+        'rejected': 5,
+        'reasons': {
+            'italian_too_few_words': 1, 'italian_invalid_characters': 1, 'russian_invalid_characters': 1,
+            'italian_duplicate_words': 1, 'italian_too_many_words': 1, 'malformed_pair': 1,
+        },
+    }
+
+
+def test_regex_metacharacters_in_character_set():
+    """Test characters such as '-', ']' and '\\' are matched literally in the compiled class."""
+    validator = SentenceValidator(set("abc -]\\^"), set("а"))
+    assert validator.italian_errors("a-b c]a ^\\") == []
+    assert validator.italian_errors("a-b c]a ^d") == ['invalid_characters']
+
+
+def test_validator_recompiled_only_when_config_changes():
+    """Test the shared validator is reused until the configured character sets change."""
+    config = MagicMock(italian_characters=ITALIAN, russian_characters=RUSSIAN)
+    with patch('src.database.base.get_validation_config', return_value=config) as mock_get_config:
+        first = get_sentence_validator()
+        assert get_sentence_validator() is first
+
+        mock_get_config.return_value = MagicMock(italian_characters=ITALIAN, russian_characters=RUSSIAN | set('abc'))
+        second = get_sentence_validator()
+        assert second is not first
+        assert second.russian_errors("abc") == []
+
+
+def test_validator_reused_for_equal_configs():
+    """Test a fresh config object with the same characters (the fallback without config.ini) does not recompile."""
+    from src.database.base import MockConfig
+
+    with patch('src.database.validation._validator', None), \
+         patch('src.database.base.get_validation_config', side_effect=lambda: MockConfig().validation), \
+         patch('src.database.validation.SentenceValidator.from_config', wraps=SentenceValidator.from_config) as mock_build:
+        first = get_sentence_validator()
+        assert get_sentence_validator() is first
+        assert get_sentence_validator() is first
+    assert mock_build.call_count == 1